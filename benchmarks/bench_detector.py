@@ -0,0 +1,172 @@
+"""Detektor benchmarki: ``parse_payment_message`` va end-to-end ``handle_payment_message``.
+
+Sintetik korpus (benchmarks/corpus.py) bo'yicha:
+ - parse: har bir kategoriya uchun p50/p99 (mikrosekund), xabar/s va kutilgan natija bilan
+   nomuvofiqliklar soni (parse regressiyasi)
+ - e2e: vaqtinchalik SQLite bazaga har bir to'lov xabari uchun pending to'lov ekiladi,
+   keyin parse -> match -> claim to'liq zanjiri o'lchanadi
+
+Natijalar baseline fayli bilan solishtiriladi (``--baseline``); ``--save-baseline`` joriy
+natijani yozadi. ``--check`` bilan nomuvofiqlik yoki baseline'dan ``--max-regression`` dan
+ko'p p50 sekinlashuvi bo'lsa chiqish kodi 1.
+
+Ishga tushirish:
+    python benchmarks/bench_detector.py --messages 20000
+    python benchmarks/bench_detector.py --save-baseline
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'handlers'), os.path.dirname(os.path.abspath(__file__))]
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline_detector.json')
+
+
+def _import_app(db_path: str):
+    # config.py deploy paytida yaratiladi; benchmark uchun faqat DATABASE_PATH kerak
+    try:
+        import config  # noqa: F401
+    except ImportError:
+        sys.modules['config'] = types.SimpleNamespace(DATABASE_PATH=db_path)
+    from database.database import Database
+    from database.models import Payment
+    from handlers.payment_detector import PaymentDetector
+    return Database, Payment, PaymentDetector
+
+
+def _percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def _summarize(latencies) -> dict:
+    values = sorted(latencies)
+    total = sum(values)
+    return {
+        'count': len(values),
+        'p50_us': round(_percentile(values, 50) * 1e6, 2),
+        'p99_us': round(_percentile(values, 99) * 1e6, 2),
+        'msgs_per_sec': round(len(values) / total) if total else 0,
+    }
+
+
+def _time_each(fn, texts):
+    out = []
+    results = []
+    perf = time.perf_counter
+    for text in texts:
+        started = perf()
+        results.append(fn(text))
+        out.append(perf() - started)
+    return out, results
+
+
+def run(messages: int, seed: int) -> dict:
+    from corpus import CATEGORIES, generate
+
+    corpus = generate(messages, seed)
+    report = {'messages': messages, 'seed': seed, 'parse': {}, 'e2e': {}}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        Database, Payment, PaymentDetector = _import_app(db_path)
+        db = Database(db_path)
+        for i, (_, _, expected) in enumerate(corpus):
+            if expected:
+                db.add_payment(Payment(user_id=1, bukmeker='1xBet', player_id=str(i),
+                                       amount=expected[0], payment_id=f"B{i}", card_last4=expected[1]))
+        detector = PaymentDetector(db)
+        # Isitish (regex/kesh, allocator) - birinchi kategoriya o'lchoviga ta'sir qilmasin
+        for _, text, _ in corpus[:500]:
+            detector.parse_payment_message(text)
+
+        # Parse: kategoriya bo'yicha
+        mismatches = 0
+        all_parse = []
+        for category in CATEGORIES:
+            entries = [(t, e) for c, t, e in corpus if c == category]
+            latencies, results = _time_each(detector.parse_payment_message, [t for t, _ in entries])
+            for (_, expected), parsed in zip(entries, results):
+                got = (parsed['amount'], parsed['card_last4']) if parsed else None
+                # chatter uchun faqat "to'lov sifatida tanilmadi" tekshiriladi
+                if expected is None:
+                    mismatches += got is not None and category == 'chatter'
+                else:
+                    mismatches += got != expected
+            report['parse'][category] = _summarize(latencies)
+            all_parse.extend(latencies)
+        report['parse']['all'] = _summarize(all_parse)
+        report['parse_mismatches'] = mismatches
+
+        # End-to-end: parse -> indeks -> atomik claim
+        texts = [t for _, t, _ in corpus]
+        latencies, results = _time_each(detector.handle_payment_message, texts)
+        report['e2e']['all'] = _summarize(latencies)
+        report['e2e_matched'] = sum(1 for r in results if r is not None)
+        report['e2e_expected'] = sum(1 for _, _, e in corpus if e)
+    return report
+
+
+def _compare(report: dict, baseline: dict, max_regression: float) -> list:
+    regressions = []
+    for section in ('parse', 'e2e'):
+        for name, current in report[section].items():
+            base = baseline.get(section, {}).get(name)
+            if not base or not base.get('msgs_per_sec'):
+                continue
+            delta = (current['msgs_per_sec'] - base['msgs_per_sec']) / base['msgs_per_sec'] * 100
+            p50_delta = (current['p50_us'] - base['p50_us']) / base['p50_us'] * 100 if base['p50_us'] else 0.0
+            p99_delta = (current['p99_us'] - base['p99_us']) / base['p99_us'] * 100 if base['p99_us'] else 0.0
+            print(f"  {section:>5}/{name:<9} msgs/s {delta:+7.1f}%   p50 {p50_delta:+7.1f}%   p99 {p99_delta:+7.1f}%")
+            # msgs/s GC pauzalariga sezgir - regressiya p50 bo'yicha aniqlanadi
+            if p50_delta > max_regression:
+                regressions.append(f"{section}/{name}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=20_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true')
+    parser.add_argument('--max-regression', type=float, default=30.0, help='p50 bo\'yicha, foizda')
+    args = parser.parse_args()
+
+    report = run(args.messages, args.seed)
+
+    print(f"{'section':>5}/{'category':<9} {'p50 us':>9} {'p99 us':>9} {'msgs/s':>12}")
+    for section in ('parse', 'e2e'):
+        for name, s in report[section].items():
+            print(f"{section:>5}/{name:<9} {s['p50_us']:9.2f} {s['p99_us']:9.2f} {s['msgs_per_sec']:12,}")
+    print(f"parse mismatches: {report['parse_mismatches']}   "
+          f"e2e matched: {report['e2e_matched']}/{report['e2e_expected']}")
+
+    failed = report['parse_mismatches'] > 0 or report['e2e_matched'] != report['e2e_expected']
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Baseline saved: {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"vs baseline ({args.baseline}):")
+        failed = bool(_compare(report, baseline, args.max_regression)) or failed
+
+    if args.check and failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Model yuklash benchmarki: validatsiyali konstruktor vs ``Payment.from_row``.
+
+Vaqtinchalik SQLite bazaga N ta payment yoziladi, keyin ikki usulda o'qiladi:
+ - legacy: ``Payment(...)`` + atributlarni qo'lda o'rnatish (__post_init__ validatsiya,
+   2x ``datetime.now()``)
+ - from_row: ishonchli qatordan to'g'ridan-to'g'ri slotted obyekt
+
+Har biri uchun vaqt (soniya, qator/s) va tracemalloc peak xotira chiqariladi.
+
+Ishga tushirish:
+    python benchmarks/bench_models.py --rows 1000000
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'handlers')]
+
+from database.models import Payment  # noqa: E402
+
+
+def _seed(path: str, rows: int) -> None:
+    with sqlite3.connect(path) as conn:
+        conn.execute('''
+            CREATE TABLE payments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER, bukmeker TEXT, player_id TEXT, amount REAL,
+                payment_id TEXT UNIQUE, card_last4 TEXT, status TEXT DEFAULT 'pending',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                payment_chat_id INTEGER, payment_message_id INTEGER, amount_tiyin INTEGER
+            )
+        ''')
+        conn.executemany(
+            'INSERT INTO payments (user_id, bukmeker, player_id, amount, payment_id, card_last4, status, '
+            'payment_chat_id, payment_message_id, amount_tiyin) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            ((100000 + i % 5000, '1xBet', str(300000000 + i), 50000 + i % 125,
+              f"P{i}", f"{i % 10000:04d}", 'completed', 100000 + i % 5000, i, (50000 + i % 125) * 100)
+             for i in range(rows))
+        )
+        conn.commit()
+
+
+def _legacy(row) -> Payment:
+    # database.py dagi eski o'qish yo'li
+    payment = Payment(row[1], row[2], row[3], row[12], row[5], row[6])
+    payment.status = row[7]
+    payment.created_at = row[8]
+    payment.updated_at = row[9]
+    payment.payment_chat_id = row[10]
+    payment.payment_message_id = row[11]
+    return payment
+
+
+def _run(path: str, build) -> tuple:
+    tracemalloc.start()
+    started = time.perf_counter()
+    with sqlite3.connect(path) as conn:
+        cursor = conn.execute('SELECT * FROM payments')
+        loaded = [build(row) for row in cursor]
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = len(loaded)
+    del loaded
+    return count, elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        print(f"Seeding {args.rows:,} payments...")
+        _seed(path, args.rows)
+
+        for name, build in (('legacy', _legacy), ('from_row', Payment.from_row)):
+            count, elapsed, peak = _run(path, build)
+            print(f"{name:>9}: {count:,} rows  {elapsed:7.2f}s  "
+                  f"{count / elapsed:12,.0f} rows/s  peak {peak / 2**20:8.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Summa hold'i qayta ishga tushishdan keyin ham saqlanishini tekshirish (regressiya).
+
+Bank qatorlarida tranzaksiya ID yo'q: yopilgan to'lovning (karta, summa) kaliti dedupe TTL'i
+ichida boshqa mijozga berilsa, uning PAYMENT matni oldingisiniki bilan bir xil bo'lib tashlanadi.
+Dedupe fingerprint'lari DB'dan qaytadi, shuning uchun hold ham qaytishi kerak:
+
+    allocate -> add_payment -> claim -> remember/flush -> yangi Database + rebuild_pending_index
+             -> kalit band (is_reserved), oynaning qolgan 124 ta summasi tarqatiladi, u emas
+
+Vaqtinchalik SQLite bazada ishlaydi; updated_at bo'lgan va bo'lmagan (eski) baza uchun.
+
+Ishga tushirish:
+    python benchmarks/check_amount_hold.py
+"""
+
+import os
+import sys
+import tempfile
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'handlers')]
+
+BASE_SOM = 50_000
+CARD = '8012'
+
+
+def _import_app(db_path: str):
+    # config.py deploy paytida yaratiladi; bor bo'lsa ham baza vaqtinchalik faylga yo'naltiriladi
+    try:
+        import config
+        config.DATABASE_PATH = db_path
+    except ImportError:
+        sys.modules['config'] = types.SimpleNamespace(DATABASE_PATH=db_path, ADMIN_ID=0)
+    from database.database import Database
+    from database.models import Payment
+    from handlers.payment_dedupe import PaymentDedupe
+    from utils.money import to_tiyin
+    return Database, Payment, PaymentDedupe, to_tiyin
+
+
+def check(db_path: str, legacy: bool) -> list:
+    """Xatolar ro'yxati (bo'sh - o'tdi)"""
+    Database, Payment, PaymentDedupe, to_tiyin = _import_app(db_path)
+    errors = []
+
+    db = Database(db_path)
+    db.rebuild_pending_index()
+    card, som = db.amounts.allocate('p-1', BASE_SOM, [CARD])
+    db.add_payment(Payment(user_id=1, bukmeker='test', player_id='1', amount=to_tiyin(som),
+                           payment_id='p-1', card_last4=card))
+    if not db.claim_payment('p-1'):
+        return ['claim_payment muvaffaqiyatsiz']
+    dedupe = PaymentDedupe(db)
+    dedupe.remember([f"t:-100:{som}"])
+    dedupe.flush()
+
+    # Qayta ishga tushish: xotiradagi hold yo'q, fingerprint DB'da
+    restarted = Database(db_path)
+    if legacy:
+        restarted.has_updated_at = False
+    restarted.rebuild_pending_index()
+    if not restarted.amounts.is_reserved(card, som):
+        errors.append(f"({card}, {som}) qayta ishga tushishdan keyin bo'sh")
+    given = []
+    while True:
+        got = restarted.amounts.allocate(f"n-{len(given)}", BASE_SOM, [CARD])
+        if got is None:
+            break
+        given.append(got[1])
+    if som in given:
+        errors.append(f"{som} so'm hold TTL ichida qayta berildi")
+    if len(given) != restarted.amounts.max_offset - restarted.amounts.min_offset:
+        errors.append(f"oynadan {len(given)} ta summa berildi")
+    return errors
+
+
+def main() -> int:
+    failed = False
+    for legacy in (False, True):
+        with tempfile.TemporaryDirectory() as tmp:
+            errors = check(os.path.join(tmp, 'hold.db'), legacy)
+        label = 'updated_at yo\'q' if legacy else 'updated_at'
+        print(f"{label:>16}: {'OK' if not errors else '; '.join(errors)}")
+        failed = failed or bool(errors)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
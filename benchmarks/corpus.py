@@ -0,0 +1,81 @@
+"""Detektor/parser benchmarklari uchun sintetik xabar korpusi.
+
+Har bir yozuv ``(kategoriya, matn, kutilgan)``; kutilgan - ``(amount_tiyin, card_last4)`` yoki
+``None`` (to'lov emas). To'lov xabarlari uchun (karta, summa) kalitlari korpus ichida yagona -
+shuning uchun ular bo'yicha DB'ga pending to'lovlar ekilib, end-to-end o'lchash mumkin.
+
+Kategoriyalar:
+ - pipe:        PAYMENT|50017|8012, "To'lov: PAYMENT|3613.50| **** 8012"
+ - unicode:     PAYMENT｜50017｜8012 (fullwidth/broken bar/double bar, NBSP)
+ - labeled:     "Summa: 50,017 so'm" / "Karta: **** **** **** 8012"
+ - cyrillic:    "Сумма: 50 017,00 сум" / "Карта: *8012"
+ - noisy:       uzun bank bildirishnomasi, PAYMENT satri o'rtada
+ - chatter:     guruhdagi oddiy xabarlar (to'lov emas)
+"""
+
+import random
+from typing import List, Optional, Tuple
+
+CATEGORIES = ('pipe', 'unicode', 'labeled', 'cyrillic', 'noisy', 'chatter')
+
+Entry = Tuple[str, str, Optional[Tuple[int, str]]]
+
+_PIPES = ('｜', '¦', '‖')
+_CHATTER = (
+    "Salom, balans qancha?", "ok", "Rahmat!", "Kechirasiz, xato yubordim",
+    "Bugun to'lovlar kechikyaptimi?", "Добрый день, всё пришло", "👍",
+)
+_NOISE_WORDS = (
+    "Operatsiya", "muvaffaqiyatli", "bajarildi", "Hisob", "qoldig'i", "komissiya",
+    "Операция", "выполнена", "Баланс", "Terminal", "UZCARD", "HUMO", "P2P",
+)
+
+
+def _som_text(tiyin: int) -> str:
+    whole, rest = divmod(tiyin, 100)
+    return f"{whole}.{rest:02d}" if rest else str(whole)
+
+
+def _noise(rnd: random.Random, words: int) -> str:
+    return ' '.join(rnd.choice(_NOISE_WORDS) for _ in range(words))
+
+
+def generate(size: int, seed: int = 42) -> List[Entry]:
+    """Deterministik korpus; kategoriyalar navbat bilan aralashtiriladi."""
+    rnd = random.Random(seed)
+    out: List[Entry] = []
+    used = set()
+    for i in range(size):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        if category == 'chatter':
+            out.append((category, rnd.choice(_CHATTER), None))
+            continue
+
+        while True:
+            card = f"{rnd.randint(0, 9999):04d}"
+            som = rnd.randint(10_000, 5_000_000)
+            frac = rnd.choice((0, 0, 0, 50)) if category == 'pipe' else 0
+            key = (som * 100 + frac, card)
+            if key not in used:
+                used.add(key)
+                break
+        amount = key[0]
+
+        if category == 'pipe':
+            text = rnd.choice((
+                f"PAYMENT|{_som_text(amount)}|{card}",
+                f"To'lov: PAYMENT|{_som_text(amount)}| **** {card}",
+                f"payment| {_som_text(amount)} |{card}",
+            ))
+        elif category == 'unicode':
+            p = rnd.choice(_PIPES)
+            text = f"PAYMENT{p}{som}{p} {card}"
+        elif category == 'labeled':
+            text = f"Summa: {som:,} so'm\nKarta: **** **** **** {card}\nVaqt: {rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}"
+        elif category == 'cyrillic':
+            text = f"Пополнение\nСумма: {som:,}".replace(',', ' ') + f",00 сум\nКарта: *{card}"
+        else:  # noisy
+            text = (f"{_noise(rnd, 40)}\nPAYMENT|{som}|{card}\n{_noise(rnd, 120)}\n"
+                    + ('=' * 200))
+        out.append((category, text, key))
+    return out
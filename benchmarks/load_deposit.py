@@ -0,0 +1,292 @@
+"""Depozit oqimi uchun end-to-end yuklama testi (lokal bukmeker stub bilan).
+
+Real bukmeker API'lari o'rniga ``tools/bookmaker_stub.py`` ishga tushiriladi (yoki ``--stub-url``
+bilan tashqi stub), ``api.*`` modullari stub klientlarga almashtiriladi va vaqtinchalik SQLite
+bazada N ta parallel foydalanuvchi to'liq zanjirni bajaradi:
+
+    check_player -> process_deposit -> detektor (PAYMENT xabari, claim + deposit_jobs)
+                 -> DepositQueue (bukmekerga depozit) -> yakuniy holat
+
+Har bosqich uchun p50/p95/p99/max (ms), end-to-end kechikish, o'tkazuvchanlik (oqim/s),
+yakuniy holatlar (done/failed/uncertain/...), stub kreditlari (ikki marta kredit tekshiruvi),
+executor/breaker/rate limiter/singleflight/kesh metrikalari chiqariladi. Telegram bot o'rniga
+xabarlarni yozib oluvchi FakeBot (``--bot-latency-ms`` bilan Telegram kechikishi).
+
+Ishga tushirish:
+    python benchmarks/load_deposit.py --users 20 --flows 200
+    python benchmarks/load_deposit.py --users 50 --flows 1000 --latency-ms 150 --jitter-ms 100 \\
+        --error-rate 0.02 --timeout-rate 0.01 --hang-seconds 20 --json report.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'handlers'), os.path.join(ROOT, 'tools')]
+
+from bookmaker_stub import add_profile_arguments, install_api_modules, stub_from_args  # noqa: E402
+
+STAGES = ('check_player', 'process_deposit', 'detect', 'execute', 'e2e')
+CARDS = ('8600123412348012', '8600123412345521', '9860123412340417', '5614123412349903')
+
+
+def _import_app(db_path: str, stub_url: str):
+    # config.py deploy paytida yaratiladi; bor bo'lsa ham baza vaqtinchalik faylga yo'naltiriladi
+    try:
+        import config
+        config.DATABASE_PATH = db_path
+    except ImportError:
+        sys.modules['config'] = types.SimpleNamespace(DATABASE_PATH=db_path, MIN_DEPOSIT=1000,
+                                                      MAX_DEPOSIT=10_000_000, ADMIN_ID=0)
+    # Real bukmeker API'lariga hech qachon bormaslik uchun - handlers'dan oldin
+    install_api_modules(stub_url)
+    from database.database import db
+    from database.models import Card
+    from handlers import deposit
+    from handlers.deposit_queue import DepositQueue
+    from handlers.payment_detector import PaymentDetector
+    return db, Card, deposit, DepositQueue, PaymentDetector
+
+
+class FakeBot:
+    """Telegram bot o'rnini bosuvchi: yuborilgan xabarlarni sanaydi"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.sent = 0
+
+    def send_message(self, chat_id, text, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self._next_id += 1
+            self.sent += 1
+            message_id = self._next_id
+        return types.SimpleNamespace(message_id=message_id, chat=types.SimpleNamespace(id=chat_id), text=text)
+
+    def delete_message(self, chat_id, message_id):
+        return True
+
+    def edit_message_text(self, *args, **kwargs):
+        return True
+
+    def edit_message_reply_markup(self, *args, **kwargs):
+        return True
+
+
+def _percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))]
+
+
+def _summarize(latencies) -> dict:
+    values = sorted(latencies)
+    return {
+        'count': len(values),
+        'p50_ms': round(_percentile(values, 50) * 1000, 2),
+        'p95_ms': round(_percentile(values, 95) * 1000, 2),
+        'p99_ms': round(_percentile(values, 99) * 1000, 2),
+        'max_ms': round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+
+def run(args) -> dict:
+    stub = None
+    stub_url = args.stub_url
+    if not stub_url:
+        stub = stub_from_args(args)
+        stub_url = stub.start()
+
+    tmp = tempfile.TemporaryDirectory()
+    db, Card, deposit, DepositQueue, PaymentDetector = _import_app(os.path.join(tmp.name, 'load.db'), stub_url)
+    from utils.circuit_breaker import breaker_states
+    from utils.deadline import hedge_metrics
+    from utils.money import tiyin_to_som
+    from utils.rate_limiter import limiter_metrics
+    from utils.singleflight import singleflight_metrics
+    from utils.task_executor import executor_metrics
+
+    for number in CARDS[:args.cards]:
+        db.add_card(Card(card_number=number, card_name='Load test'))
+
+    latencies = {stage: [] for stage in STAGES}
+    outcomes = {}
+    lock = threading.Lock()
+    waiters = {}
+
+    def on_done(job, status, detail):
+        with lock:
+            waiter = waiters.get(job.payment_id)
+        if waiter:
+            waiter[1] = status
+            waiter[0].set()
+
+    queue = DepositQueue(db, on_done=on_done, workers=args.workers, per_provider=args.per_provider,
+                         max_attempts=args.max_attempts, base_delay=args.retry_delay,
+                         max_delay=args.retry_delay * 8, poll_seconds=1.0)
+    queue.start()
+    detector = PaymentDetector(db, enqueue_source='load')
+    bot = FakeBot(args.bot_latency_ms / 1000)
+    bukmekers = args.bukmekers.split(',')
+    rnd = random.Random(args.seed)
+    counter = iter(range(args.flows))
+    counter_lock = threading.Lock()
+
+    def record(stage, seconds=None, outcome=None):
+        with lock:
+            if seconds is not None:
+                latencies[stage].append(seconds)
+            if outcome:
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    def flow(user_id: int, bukmeker: str, player_id: str, amount: int) -> None:
+        perf = time.perf_counter
+        started = perf()
+        player_info = deposit.check_player(bukmeker, player_id)
+        t1 = perf()
+        record('check_player', t1 - started)
+        if not player_info.get('Success'):
+            record(None, outcome='player_not_found')
+            return
+
+        deposit.process_deposit(bot, user_id, bukmeker, player_id, amount, player_info)
+        t2 = perf()
+        record('process_deposit', t2 - t1)
+        payment = next((p for p in db.get_user_payments(user_id, 5) if p.status == 'pending'), None)
+        if payment is None:
+            record(None, outcome='not_allocated')
+            return
+
+        waiter = [threading.Event(), None]
+        with lock:
+            waiters[payment.payment_id] = waiter
+        # Bank guruhidan keladigan PAYMENT xabari
+        matched = detector.handle_payment_message(f"PAYMENT|{tiyin_to_som(payment.amount)}|{payment.card_last4}")
+        t3 = perf()
+        record('detect', t3 - t2)
+        if matched is None:
+            record(None, outcome='not_matched')
+            return
+        queue.wake()
+
+        if not waiter[0].wait(args.flow_timeout):
+            record(None, outcome='timeout')
+            return
+        t4 = perf()
+        record('execute', t4 - t3)
+        record('e2e', t4 - started, outcome=waiter[1])
+
+    def user(user_id: int) -> None:
+        # Har foydalanuvchining o'z o'yinchi ID'si (kesh real holatdagidek isiydi)
+        player_id = str(100_000_000 + user_id)
+        while True:
+            with counter_lock:
+                if next(counter, None) is None:
+                    return
+                bukmeker = rnd.choice(bukmekers)
+                amount = rnd.randrange(args.min_amount, args.max_amount + 1, 1000)
+                if args.fresh_players:
+                    player_id = str(rnd.randrange(100_000_000, 999_999_999))
+            try:
+                flow(user_id, bukmeker, player_id, amount)
+            except Exception as e:
+                record(None, outcome=f"error:{e.__class__.__name__}")
+
+    wall_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        for i in range(args.users):
+            pool.submit(user, 1_000_000 + i)
+    wall = time.perf_counter() - wall_started
+
+    stub_stats = stub.stats() if stub else None
+    credited = sum(c['count'] for c in stub_stats['credits'].values()) if stub_stats else None
+    report = {
+        'users': args.users,
+        'flows': args.flows,
+        'wall_s': round(wall, 2),
+        'throughput_flows_per_s': round(len(latencies['e2e']) / wall, 2) if wall else 0.0,
+        'stages': {stage: _summarize(values) for stage, values in latencies.items()},
+        'outcomes': outcomes,
+        'jobs': db.count_deposit_jobs(),
+        'stub_credits': credited,
+        'bot_messages': bot.sent,
+        'player_cache': deposit.player_cache.stats(),
+        'hedge': hedge_metrics(),
+        'breakers': breaker_states(),
+        'executors': executor_metrics(),
+        'rate_limits': limiter_metrics(),
+        'singleflight': singleflight_metrics(),
+        'stub': stub_stats,
+    }
+    if stub:
+        stub.stop()
+    tmp.cleanup()
+    return report
+
+
+def _print(report: dict) -> None:
+    print(f"users={report['users']} flows={report['flows']} wall={report['wall_s']} s "
+          f"throughput={report['throughput_flows_per_s']} flows/s")
+    print(f"  {'stage':<16}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for stage, s in report['stages'].items():
+        print(f"  {stage:<16}{s['count']:>7}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}{s['max_ms']:>10}")
+    print(f"  outcomes: {report['outcomes']}")
+    print(f"  deposit_jobs: {report['jobs']}  stub credits: {report['stub_credits']}")
+    done = report['outcomes'].get('done', 0)
+    if report['stub_credits'] is not None and report['stub_credits'] > done + report['outcomes'].get('uncertain', 0):
+        print("  ⚠️ stub credits > done + uncertain - possible double credit")
+    cache = report['player_cache']
+    print(f"  player_cache: hit_rate={cache.get('hit_rate')}  hedge: {report['hedge']}")
+    for name, b in report['breakers'].items():
+        print(f"  breaker {name}: {b['state']} failure_rate={b['failure_rate']} rejected={b['rejected']}")
+    flights = report['singleflight'].values()
+    print(f"  singleflight: collapsed={sum(m['shared'] for m in flights)} of {sum(m['calls'] for m in flights)} reads")
+    for name, m in report['rate_limits'].items():
+        print(f"  limiter {name}: utilization={m['utilization']} queued_peak={m['queued_peak']} "
+              f"waited={m['waited']} avg_wait={m['avg_wait_ms']} ms timeouts={m['timeouts']}")
+    for name, m in report['executors'].items():
+        print(f"  executor {name}: peak={m['queue_peak']} caller_ran={m['caller_ran']} "
+              f"rejected={m['rejected']} avg_wait={m['avg_wait_ms']} ms")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=20, help="parallel foydalanuvchilar")
+    parser.add_argument('--flows', type=int, default=200, help="jami depozit oqimlari")
+    parser.add_argument('--bukmekers', default='1xBet,Melbet,Betwiner,WinWinBet,Mostbet')
+    parser.add_argument('--min-amount', type=int, default=10_000)
+    parser.add_argument('--max-amount', type=int, default=500_000)
+    parser.add_argument('--cards', type=int, default=len(CARDS), choices=range(1, len(CARDS) + 1))
+    parser.add_argument('--fresh-players', action='store_true', help="har oqimda yangi o'yinchi ID (kesh sovuq)")
+    parser.add_argument('--workers', type=int, default=8, help="DepositQueue workers")
+    parser.add_argument('--per-provider', type=int, default=4)
+    parser.add_argument('--max-attempts', type=int, default=3)
+    parser.add_argument('--retry-delay', type=float, default=0.5, help="DepositQueue base backoff (s)")
+    parser.add_argument('--flow-timeout', type=float, default=60.0)
+    parser.add_argument('--bot-latency-ms', type=float, default=0.0)
+    parser.add_argument('--stub-url', help="tashqi stub (tools/bookmaker_stub.py); berilmasa ichki stub")
+    parser.add_argument('--json', help="hisobotni JSON faylga yozish")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    _print(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
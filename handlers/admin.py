@@ -2,24 +2,43 @@ import telebot
 from telebot.types import Message, CallbackQuery
 from database.database import db
 from database.models import Card
+from database.export import export_table, EXPORT_TABLES, EXPORT_FORMATS
 from utils.keyboards import (get_admin_menu_keyboard, get_main_menu_keyboard_admin,
                            get_card_management_keyboard, get_balance_keyboard, get_back_keyboard,
                            get_bookmakers_keyboard, get_admin_manual_deposit_confirm_keyboard)
-from utils.helpers import create_balance_message, create_stats_message, log_manual_deposit
-from utils.bot_helpers import safe_send_message  # resilient send wrapper
+from utils.helpers import create_balance_message, create_breaker_status_message, create_stats_message, log_manual_deposit
+from utils.bot_helpers import safe_edit_text, safe_send_message  # resilient send wrapper
 from utils.validators import validate_card_number, validate_amount, validate_player_id
-from api.xbet_api import xbet_api
-from api.mobcash_api import melbet_api, betwiner_api, winwin_api
-from concurrent.futures import ThreadPoolExecutor, wait
-from threading import Thread
-import time
+from utils.money import format_som
+from handlers.providers import admin_balance_providers
+from handlers.balance_service import balance_service
+from utils.circuit_breaker import breaker_states
+from utils.deadline import deadline
+from utils.rate_limiter import limiter_metrics
+from utils.singleflight import singleflight_metrics
+from utils.task_executor import executor_metrics, submit
+from datetime import datetime, timedelta
+import os
 from handlers.deposit import execute_deposit_detailed
-from handlers.deposit import check_player
+from handlers.deposit import check_player, player_cache
+from handlers.withdrawal import payout_cache
 from config import ADMIN_ID
 import config
 
 admin_states = {}
 
+def render_balances() -> str:
+    """Admin balans ekrani: oxirgi snapshot'lar + yangilanish vaqti + API holati"""
+    snaps = balance_service.snapshots(admin_balance_providers())
+    message = create_balance_message({name: snap.data for name, snap in snaps.items()})
+    ages = [snap.age() for snap in snaps.values() if snap.age() is not None]
+    if ages:
+        message += f"🕒 Yangilangan: {int(max(ages))} s oldin\n"
+    stale = [name for name, snap in snaps.items() if snap.error and snap.data.get('Success')]
+    if stale:
+        message += f"⚠️ Eski qiymat (yangilashda xato): {', '.join(stale)}\n"
+    return message + "\n" + create_breaker_status_message(breaker_states())
+
 def register_admin_handlers(bot: telebot.TeleBot):
     
     # Admin panel tugmasi
@@ -56,6 +75,23 @@ def register_admin_handlers(bot: telebot.TeleBot):
     def show_stats(message: Message):
         users_count = db.get_users_count()
         stats_message = create_stats_message(users_count, 0, 0)  # TODO: implement daily stats
+        cache = player_cache.stats()
+        stats_message += (f"\n\n🔎 O'yinchi keshi: {cache['entries']} ta, "
+                          f"hit {cache['hit_rate'] * 100:.0f}% (stale: {cache['stale_hits']})")
+        payouts = payout_cache.stats()
+        stats_message += f"\n💸 Payout keshi: {payouts['entries']} ta, takroriy kodlar {payouts['hits']}"
+        for name, m in executor_metrics().items():
+            stats_message += (f"\n⚙️ {name}: navbat {m['queue_depth']} (max {m['queue_peak']}), "
+                              f"faol {m['active']}/{m['workers']}, kutish {m['avg_wait_ms']:.0f} ms, "
+                              f"rad etildi {m['rejected']}")
+        for name, m in limiter_metrics().items():
+            stats_message += (f"\n🚦 {name}: kvota {m['utilization'] * 100:.0f}% ({m['rate']:g}/s), "
+                              f"navbat {m['queued']} (max {m['queued_peak']}), "
+                              f"kutish {m['avg_wait_ms']:.0f} ms, timeout {m['timeouts']}")
+        flights = singleflight_metrics().values()
+        collapsed, calls = sum(m['shared'] for m in flights), sum(m['calls'] for m in flights)
+        if calls:
+            stats_message += f"\n🔀 Birlashtirilgan so'rovlar: {collapsed}/{calls} ({collapsed / calls * 100:.0f}%)"
         
         bot.send_message(ADMIN_ID, stats_message)
     
@@ -70,6 +106,20 @@ def register_admin_handlers(bot: telebot.TeleBot):
             reply_markup=get_back_keyboard()
         )
     
+    # Eksport (moliya uchun to'lov/yechishlar fayli)
+    @bot.message_handler(func=lambda message: message.from_user.id == ADMIN_ID and message.text == "📤 Eksport")
+    def export_start(message: Message):
+        admin_states[ADMIN_ID] = {'action': 'export'}
+        
+        bot.send_message(
+            ADMIN_ID,
+            "📤 Eksport parametrlarini kiriting:\n\n"
+            "<jadval> <boshlanish> <tugash> [csv|jsonl]\n\n"
+            "💡 Misol: payments 2025-01-01 2025-01-31 csv\n"
+            "Jadval: payments yoki withdrawals",
+            reply_markup=get_back_keyboard()
+        )
+    
     # Bot o'chirish/yoqish
     @bot.message_handler(func=lambda message: message.from_user.id == ADMIN_ID and message.text == "🔧 Bot o'chirish")
     def toggle_bot(message: Message):
@@ -87,164 +137,20 @@ def register_admin_handlers(bot: telebot.TeleBot):
             reply_markup=get_card_management_keyboard()
         )
     
-    # Balans ko'rish
+    # Balans ko'rish - fon servisi snapshot'idan (API chaqiruvisiz, darhol)
     @bot.message_handler(func=lambda message: message.from_user.id == ADMIN_ID and message.text == "💰 Kasa balansi")
     def show_balance(message: Message):
-        # Simple in-memory cache to avoid repeated slow balance fetches
-        # Cache key is static (admin view). TTL controlled by config.BALANCE_CACHE_SECONDS
-        cache_key = 'admin_balances'
-        now = time.time()
-        try:
-            last = getattr(register_admin_handlers, '_last_balances_ts', 0)
-            cached = getattr(register_admin_handlers, '_last_balances', None)
-        except Exception:
-            last = 0
-            cached = None
-
-        if cached and (now - last) < getattr(config, 'BALANCE_CACHE_SECONDS', 5):
-            # Serve cached immediately
-            try:
-                bot.send_message(ADMIN_ID, cached, reply_markup=get_balance_keyboard())
-                return
-            except Exception:
-                # if sending cached fails, proceed to fresh fetch
-                pass
-
-        # Fetch balances concurrently for speed and robustness, but don't block the bot worker.
-        providers = {
-            '1xBet': lambda: xbet_api.get_balance() if xbet_api else {'Success': False},
-            'Melbet': lambda: melbet_api.get_balance() if melbet_api else {'Success': False},
-            'Betwiner': lambda: betwiner_api.get_balance() if betwiner_api else {'Success': False},
-            'WinWinBet': lambda: winwin_api.get_balance() if winwin_api else {'Success': False},
-        }
-
-        def fetch_and_update(message_id: int):
-            balances = {}
-            with ThreadPoolExecutor(max_workers=4) as ex:
-                future_map = {ex.submit(func): name for name, func in providers.items()}
-                try:
-                    # 10 soniya timeout - barcha API chaqiruvlari uchun yetarli
-                    done, not_done = wait(future_map.keys(), timeout=10)
-                except Exception:
-                    done = set()
-                    not_done = set(future_map.keys())
-
-                for fut in done:
-                    name = future_map.get(fut)
-                    try:
-                        res = fut.result(timeout=0.5)
-                    except Exception as e:
-                        res = {'Success': False, 'Error': 'Server javob bermadi'}
-                    balances[name] = res
-
-                for fut in not_done:
-                    name = future_map.get(fut)
-                    try:
-                        fut.cancel()
-                    except Exception:
-                        pass
-                    balances[name] = {'Success': False, 'Error': 'Server javob bermadi'}
-            # (logging removed for performance)
-
-            balance_message = create_balance_message(balances)
-            # cache the rendered message
-            try:
-                register_admin_handlers._last_balances = balance_message
-                register_admin_handlers._last_balances_ts = time.time()
-            except Exception:
-                pass
-            # Always send the final balance message (editing can sometimes silently fail
-            # due to message id mismatches). After sending, try to remove the loading message
-            # to keep chat tidy.
-            try:
-                bot.send_message(ADMIN_ID, balance_message, reply_markup=get_balance_keyboard())
-            except Exception:
-                pass  # (logging removed)
-
-            # Try to remove the loading message if we have its id
-            if message_id:
-                try:
-                    try:
-                        bot.delete_message(ADMIN_ID, message_id)
-                    except Exception:
-                        # best-effort - ignore failures
-                        pass
-                except Exception:
-                    pass
-
-        # Send immediate acknowledgement so buttons stay responsive
-        try:
-            status_msg = bot.send_message(ADMIN_ID, "🔄 Balans olinmoqda... Iltimos kuting.", reply_markup=get_balance_keyboard())
-            # Run the slow work in a daemon thread so the handler returns immediately
-            t = Thread(target=fetch_and_update, args=(status_msg.message_id,), daemon=True)
-            t.start()
-        except Exception:
-            # If sending the status message fails, fall back to synchronous behaviour but still protect the handler
-            # (this is a last resort; should be rare)
-            fetch_and_update(None)
+        safe_send_message(bot, ADMIN_ID, render_balances(), reply_markup=get_balance_keyboard())
     
-    # Balans yangilash
+    # Balans yangilash - fonda yangilanadi, tugagach yangi xabar yuboriladi
     @bot.message_handler(func=lambda message: message.from_user.id == ADMIN_ID and message.text == "🔄 Yangilash")
     def refresh_balance(message: Message):
-        # Cache'ni tozalash - yangi balans olinadi
-        try:
-            register_admin_handlers._last_balances_ts = 0
-        except Exception:
-            pass
+        def _refresh_and_send():
+            balance_service.refresh_and_wait(admin_balance_providers())
+            safe_send_message(bot, ADMIN_ID, render_balances(), reply_markup=get_balance_keyboard())
         
-        # Fetch balances
-        providers = {
-            '1xBet': lambda: xbet_api.get_balance() if xbet_api else {'Success': False},
-            'Melbet': lambda: melbet_api.get_balance() if melbet_api else {'Success': False},
-            'Betwiner': lambda: betwiner_api.get_balance() if betwiner_api else {'Success': False},
-            'WinWinBet': lambda: winwin_api.get_balance() if winwin_api else {'Success': False},
-        }
-
-        def fetch_and_send():
-            balances = {}
-            with ThreadPoolExecutor(max_workers=4) as ex:
-                future_map = {ex.submit(func): name for name, func in providers.items()}
-                try:
-                    done, not_done = wait(future_map.keys(), timeout=10)
-                except Exception:
-                    done = set()
-                    not_done = set(future_map.keys())
-
-                for fut in done:
-                    name = future_map.get(fut)
-                    try:
-                        res = fut.result(timeout=0.5)
-                    except Exception as e:
-                        res = {'Success': False, 'Error': 'Server javob bermadi'}
-                    balances[name] = res
-
-                for fut in not_done:
-                    name = future_map.get(fut)
-                    try:
-                        fut.cancel()
-                    except Exception:
-                        pass
-                    balances[name] = {'Success': False, 'Error': 'Server javob bermadi'}
-
-            balance_message = create_balance_message(balances)
-            # Cache yangilash
-            try:
-                register_admin_handlers._last_balances = balance_message
-                register_admin_handlers._last_balances_ts = time.time()
-            except Exception:
-                pass
-            
-            try:
-                bot.send_message(ADMIN_ID, balance_message, reply_markup=get_balance_keyboard())
-            except Exception:
-                pass
-
-        # Background thread
-        Thread(target=fetch_and_send, daemon=True).start()
-        try:
-            bot.send_message(ADMIN_ID, "🔄 Yangilanmoqda...", reply_markup=get_balance_keyboard())
-        except Exception:
-            pass
+        submit('provider_io', _refresh_and_send)
+        safe_send_message(bot, ADMIN_ID, "🔄 Yangilanmoqda...", reply_markup=get_balance_keyboard())
     
     # Admin state handler - TEXT
     @bot.message_handler(func=lambda message: message.from_user.id == ADMIN_ID and ADMIN_ID in admin_states, content_types=['text'])
@@ -255,7 +161,8 @@ def register_admin_handlers(bot: telebot.TeleBot):
             "👨‍💼 Admin panel", "👤 Foydalanuvchi menyu", "✋ Qo'lda to'ldirish",
             "📊 Statistika", "📢 Xabar yuborish", "🔧 Bot o'chirish",
             "💳 Karta qo'shish", "💰 Kasa balansi", "🔄 Yangilash",
-            "➕ Karta qo'shish", "📋 Kartalar ro'yxati", "❌ Karta o'chirish"
+            "➕ Karta qo'shish", "📋 Kartalar ro'yxati", "❌ Karta o'chirish",
+            "📤 Eksport", "📋 Yechish arizalari"
         ]
         
         if message.text in menu_buttons:
@@ -277,6 +184,8 @@ def register_admin_handlers(bot: telebot.TeleBot):
             handle_delete_card(bot, message)
         elif action == 'broadcast':
             handle_broadcast(bot, message)
+        elif action == 'export':
+            handle_export(bot, message)
         else:
             bot.send_message(ADMIN_ID, "❌ Ushbu amal hozircha qo'llab-quvvatlanmaydi.")
 
@@ -364,7 +273,7 @@ def register_admin_handlers(bot: telebot.TeleBot):
                 f"❌ Bekor qilindi\n\n"
                 f"Bukmeker: {bukmeker}\n"
                 f"ID: {player_id}\n"
-                f"Summa: {amount:,.0f} so'm"
+                f"Summa: {format_som(amount)} so'm"
             )
             
             safe_send_message(bot, ADMIN_ID, cancel_msg)
@@ -395,107 +304,121 @@ def register_admin_handlers(bot: telebot.TeleBot):
         except Exception:
             pass
         
-        # DARHOL deposit - background emas!
-        result = None
-        try:
-            result = execute_deposit_detailed(bukmeker, player_id, amount, player_info)
-        except Exception as e:
-            result = {'Success': False, 'Error': str(e)}
+        # State darhol olinadi - ikki marta bosish ikki depozit bermaydi, admin esa keyingi
+        # to'ldirishni kutmasdan boshlashi mumkin (bir nechta to'ldirish parallel bajariladi)
+        if admin_states.pop(ADMIN_ID, None) is not state:
+            return
         
-        # Log
-        try:
-            log_manual_deposit({'bukmeker': bukmeker, 'player_id': player_id, 'amount': amount, 'result': result})
-        except Exception:
-            pass
+        # Depozit fonda (provider_io) - telebot oqimi bukmeker javobini kutib band bo'lmaydi;
+        # holat shu tasdiqlash xabarining o'zida yangilanadi
+        message_id = call.message.message_id
+        safe_edit_text(bot, ADMIN_ID, message_id,
+                       f"⏳ Depozit yuborilmoqda...\n\n{_manual_deposit_head(bukmeker, player_id, amount)}")
+        submit('provider_io', _run_manual_deposit, bot, message_id, bukmeker, player_id, amount, player_info)
         
-        succ = result.get('Success')
-        if succ:
-            # Balans olish - to'g'ri funksiya
-            balance_info = {'Balance': 0, 'Limit': 0}
-            try:
-                from handlers.deposit import get_balance
-                balance_result = get_balance(bukmeker, player_id)
-                if balance_result and balance_result.get('Success'):
-                    balance_info['Balance'] = balance_result.get('Balance', 0)
-                    balance_info['Limit'] = balance_result.get('Limit', 0)
-            except Exception:
-                pass
-            
-            # Admin'ga muvaffaqiyatli xabar - to'lov oynasini yopish
-            player_name = player_info.get('Name') or player_info.get('name') or '—'
-            
-            # Avvalgi to'ldirish oynasini o'chirish
-            try:
-                bot.delete_message(ADMIN_ID, call.message.message_id)
-            except Exception:
-                pass
-            
-            # Yangi muvaffaqiyatli xabar yuborish
-            success_msg = (
-                "✅ Operatsiya muvaffaqiyatli o'tdi!\n\n"
-                f"Bukmeker: {bukmeker}\n"
-                f"ID: {player_id}\n"
-                f"Summa: {amount:,.0f} so'm\n"
-                f"To'lov tizimi komissiyasi: 0%\n\n"
-                f"Kassa holati:\n"
-                f"  Balans: {balance_info['Balance']:,.0f} so'm\n"
-                f"  Limit: {balance_info['Limit']:,.0f} so'm"
+        # Admin panel qaytarish
+        safe_send_message(bot, ADMIN_ID, "👨‍💼 Admin panel:", reply_markup=get_admin_menu_keyboard())
+
+def _manual_deposit_head(bukmeker: str, player_id: str, amount: float) -> str:
+    return f"Bukmeker: {bukmeker}\nID: {player_id}\nSumma: {format_som(amount)} so'm"
+
+def _run_manual_deposit(bot: telebot.TeleBot, message_id: int, bukmeker: str, player_id: str,
+                        amount: float, player_info: dict):
+    """Qo'lda to'ldirishni bajarish (fon vazifasi): depozit -> kassa balansi -> kanal xabari"""
+    head = _manual_deposit_head(bukmeker, player_id, amount)
+
+    def finish(text: str):
+        # Yakuniy natija - tahrirlab bo'lmasa yangi xabar (natija yo'qolmasin)
+        if not safe_edit_text(bot, ADMIN_ID, message_id, text):
+            safe_send_message(bot, ADMIN_ID, text)
+
+    try:
+        result = execute_deposit_detailed(bukmeker, player_id, amount, player_info)
+    except Exception as e:
+        result = {'Success': False, 'Error': str(e)}
+    
+    # Log
+    try:
+        log_manual_deposit({'bukmeker': bukmeker, 'player_id': player_id, 'amount': amount, 'result': result})
+    except Exception:
+        pass
+    
+    if not result.get('Success'):
+        err = result.get('Error') or result.get('error') or result.get('Message') or 'Noma\'lum xatolik'
+        finish(f"❌ To'lov muvaffaqiyatsiz!\n\n{head}\n\nSabab: {err}")
+        return
+    
+    safe_edit_text(bot, ADMIN_ID, message_id, f"✅ Depozit o'tdi\n\n{head}\n\n⏳ Kassa balansi yangilanmoqda...")
+    
+    # Depozitdan keyin kassa o'zgardi - yangi balans shu vazifaning o'zida olinadi
+    # (provider_io ichidan shu pool'ga topshirib kutish - band paytda o'zini kutib qolardi)
+    balance_info = {'Balance': 0, 'Limit': 0}
+    try:
+        balance_result = balance_service.fetch_now(bukmeker)
+        if balance_result and balance_result.get('Success'):
+            balance_info['Balance'] = balance_result.get('Balance', 0)
+            balance_info['Limit'] = balance_result.get('Limit', 0)
+    except Exception:
+        pass
+    
+    finish(
+        "✅ Operatsiya muvaffaqiyatli o'tdi!\n\n"
+        f"{head}\n"
+        f"To'lov tizimi komissiyasi: 0%\n\n"
+        f"Kassa holati:\n"
+        f"  Balans: {format_som(balance_info['Balance'])} so'm\n"
+        f"  Limit: {format_som(balance_info['Limit'])} so'm"
+    )
+    
+    # KANAL XABARI - QO'LDA TO'LDIRISH (sodda format)
+    try:
+        if getattr(config, 'NOTIFICATION_CHANNEL_ID', None):
+            channel_msg = (
+                f"✅ Operatsiya muvaffaqiyatli o'tdi!\n\n"
+                f"{head}\n\n"
+                f"Kassa:\n"
+                f"  Balans: {format_som(balance_info['Balance'])} so'm\n"
+                f"  Limit: {format_som(balance_info['Limit'])} so'm\n\n"
+                f"(Qo'lda to'ldirildi)"
             )
-            
-            safe_send_message(bot, ADMIN_ID, success_msg)
-            
-            # KANAL XABARI - QO'LDA TO'LDIRISH (sodda format)
-            try:
-                if getattr(config, 'NOTIFICATION_CHANNEL_ID', None):
-                    channel_msg = (
-                        f"✅ Operatsiya muvaffaqiyatli o'tdi!\n\n"
-                        f"Bukmeker: {bukmeker}\n"
-                        f"ID: {player_id}\n"
-                        f"Summa: {amount:,.0f} so'm\n\n"
-                        f"Kassa:\n"
-                        f"  Balans: {balance_info['Balance']:,.0f} so'm\n"
-                        f"  Limit: {balance_info['Limit']:,.0f} so'm\n\n"
-                        f"(Qo'lda to'ldirildi)"
-                    )
-                    safe_send_message(
-                        bot,
-                        config.NOTIFICATION_CHANNEL_ID,
-                        channel_msg
-                    )
-            except Exception as e:
-                # Xatoni log qilish
-                try:
-                    print(f"[ADMIN] Kanal xabari yuborishda xato: {e}")
-                except Exception:
-                    pass
-        else:
-            # Muvaffaqiyatsiz - oynani o'chirish va xabar yuborish
-            err = result.get('Error') or result.get('error') or result.get('Message') or 'Noma\'lum xatolik'
-            
-            # Avvalgi oynani o'chirish
-            try:
-                bot.delete_message(ADMIN_ID, call.message.message_id)
-            except Exception:
-                pass
-            
-            error_msg = (
-                f"❌ To'lov muvaffaqiyatsiz!\n\n"
-                f"Bukmeker: {bukmeker}\n"
-                f"ID: {player_id}\n"
-                f"Summa: {amount:,.0f} so'm\n\n"
-                f"Sabab: {err}"
+            safe_send_message(
+                bot,
+                config.NOTIFICATION_CHANNEL_ID,
+                channel_msg
             )
-            
-            safe_send_message(bot, ADMIN_ID, error_msg)
-        
-        # State tozalash
+    except Exception as e:
+        # Xatoni log qilish
         try:
-            del admin_states[ADMIN_ID]
+            print(f"[ADMIN] Kanal xabari yuborishda xato: {e}")
         except Exception:
             pass
-        
-        # Admin panel qaytarish
-        safe_send_message(bot, ADMIN_ID, "👨‍💼 Admin panel:", reply_markup=get_admin_menu_keyboard())
+
+def _check_manual_player(bot: telebot.TeleBot, state: dict, player_id: str, check_msg):
+    """Qo'lda to'ldirish: ID tekshirish (fon vazifasi); natija tekshirish xabarida"""
+    bukmeker = state['bukmeker']
+    try:
+        player_info = check_player(bukmeker, player_id)
+    except Exception as e:
+        player_info = {'Success': False, 'Error': str(e)}
+    
+    # Admin shu orada bekor qilgan yoki boshqa amalga o'tgan
+    if admin_states.get(ADMIN_ID) is not state:
+        return
+    
+    if not player_info.get('Success'):
+        state['step'] = 'player_id'
+        error_msg = player_info.get('Error') or player_info.get('error') or player_info.get('Message') or 'Topilmadi'
+        text = f"❌ {bukmeker} da bunday ID topilmadi!\nXato: {error_msg}\n\nQaytadan kiriting:"
+    else:
+        state['player_id'] = player_id
+        state['player_info'] = player_info
+        state['step'] = 'amount'
+        player_name = player_info.get('Name') or player_info.get('name') or ''
+        suffix = f" (👤 {player_name})" if player_name else ''
+        text = f"✅ {bukmeker}: {player_id}{suffix}\n\n💰 Summani kiriting (so'm):"
+    
+    if not check_msg or not safe_edit_text(bot, ADMIN_ID, check_msg.message_id, text):
+        safe_send_message(bot, ADMIN_ID, text, reply_markup=get_back_keyboard())
 
 def handle_manual_deposit(bot: telebot.TeleBot, message: Message):
     """Qo'lda to'ldirish (tasdiqlash bosqichi bilan)"""
@@ -531,18 +454,14 @@ def handle_manual_deposit(bot: telebot.TeleBot, message: Message):
             safe_send_message(bot, ADMIN_ID, "❌ Noto'g'ri ID format! Qaytadan kiriting:")
             return
         bukmeker = state['bukmeker']
-        player_info = check_player(bukmeker, player_id)
-        if not player_info.get('Success'):
-            error_msg = player_info.get('Error') or player_info.get('Message') or 'Topilmadi'
-            safe_send_message(bot, ADMIN_ID, f"❌ {bukmeker} da bunday ID topilmadi!\nXato: {error_msg}\n\nQaytadan kiriting:")
-            return
-        state['player_id'] = player_id
-        state['player_info'] = player_info
-        state['step'] = 'amount'
-        player_name = player_info.get('Name') or player_info.get('name') or ''
-        suffix = f" (👤 {player_name})" if player_name else ''
-        # Use safe_send_message with retries to avoid ConnectionResetError (WinError 10054) crashing the polling thread
-        safe_send_message(bot, ADMIN_ID, f"💰 Summani kiriting (so'm){suffix}:", reply_markup=get_back_keyboard())
+        # Tekshirish fonda (deadline bilan) - natija shu xabarda, keyin summa so'raladi
+        state['step'] = 'checking'
+        checking_msg = safe_send_message(bot, ADMIN_ID, f"🔎 {bukmeker}: {player_id} tekshirilmoqda...")
+        with deadline(getattr(config, 'PLAYER_CHECK_DEADLINE_SECONDS', 8)):
+            submit('provider_io', _check_manual_player, bot, state, player_id, checking_msg)
+
+    elif step == 'checking':
+        safe_send_message(bot, ADMIN_ID, "⏳ ID tekshirilmoqda, biroz kuting...")
 
     elif step == 'amount':
         is_valid, amount = validate_amount(message.text, 1000, 50000000)
@@ -560,7 +479,7 @@ def handle_manual_deposit(bot: telebot.TeleBot, message: Message):
             f"🏷 Bukmeker: {bukmeker}\n"
             f"🆔 ID: {player_id}\n"
             f"👤 Player: {player_name}\n"
-            f"💰 Summa: {amount:,.0f} so'm\n\n"
+            f"💰 Summa: {format_som(amount)} so'm\n\n"
             "✅ Tasdiqlash tugmasini bosing yoki ❌ Bekor qiling"
         )
         try:
@@ -639,6 +558,58 @@ def handle_delete_card(bot: telebot.TeleBot, message: Message):
     
     del admin_states[ADMIN_ID]
 
+def handle_export(bot: telebot.TeleBot, message: Message):
+    """Eksport parametrlarini qabul qilish va faylni fonda tayyorlab yuborish"""
+    if message.text == "🔙 Orqaga":
+        del admin_states[ADMIN_ID]
+        bot.send_message(ADMIN_ID, "👨‍💼 Admin panel:", reply_markup=get_admin_menu_keyboard())
+        return
+    
+    parts = (message.text or '').split()
+    try:
+        table = parts[0].lower()
+        since = datetime.strptime(parts[1], '%Y-%m-%d')
+        # tugash sanasi kiradi - keyingi kun boshigacha
+        until = datetime.strptime(parts[2], '%Y-%m-%d') + timedelta(days=1)
+        fmt = parts[3].lower() if len(parts) > 3 else 'csv'
+        if table not in EXPORT_TABLES or fmt not in EXPORT_FORMATS or since >= until:
+            raise ValueError
+    except (IndexError, ValueError):
+        bot.send_message(
+            ADMIN_ID,
+            "❌ Noto'g'ri format!\n\n💡 Misol: payments 2025-01-01 2025-01-31 csv\n\nQaytadan kiriting:"
+        )
+        return
+    
+    del admin_states[ADMIN_ID]
+    status_msg = safe_send_message(bot, ADMIN_ID, "⏳ Eksport tayyorlanmoqda...", reply_markup=get_admin_menu_keyboard())
+    
+    def _run_export():
+        path = None
+        try:
+            path, count = export_table(db.db_path, table, since, until, fmt)
+            with open(path, 'rb') as f:
+                bot.send_document(
+                    ADMIN_ID,
+                    f,
+                    caption=f"📤 {table}: {parts[1]} — {parts[2]}\n📄 Qatorlar: {count}"
+                )
+        except Exception as e:
+            safe_send_message(bot, ADMIN_ID, f"❌ Eksport xatosi: {e}")
+        finally:
+            if path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            if status_msg:
+                try:
+                    bot.delete_message(ADMIN_ID, status_msg.message_id)
+                except Exception:
+                    pass
+    
+    submit('db', _run_export)
+
 def handle_broadcast(bot: telebot.TeleBot, message: Message):
     """Barcha foydalanuvchilarga xabar yuborish (matn/rasm/video)"""
     if message.text == "🔙 Orqaga":
@@ -0,0 +1,188 @@
+"""
+Bukmeker kassa balanslari - doim "issiq" snapshot (stale-while-revalidate)
+
+Avval admin "💰 Kasa balansi" / "🔄 Yangilash" har bosishda yangi ThreadPoolExecutor ochib
+barcha provayderlarga so'rov yuborardi, har bir depozit bildirishnomasi esa get_balance ni
+sinxron chaqirardi. Endi:
+
+- Fon oqimi har ``interval`` soniyada barcha provayder balanslarini yangilaydi
+  (``balance`` executor'ida parallel, har biri deadline bilan - provider_io vazifalari
+  refresh_and_wait qilganda o'z pool'i bo'shashini kutib qolmaydi)
+- O'quvchilar (admin ekranlari, kanal bildirishnomalari) faqat oxirgi snapshot'ni o'qiydi -
+  hech qanday bloklovchi chaqiruv yo'q
+- Snapshot ``interval`` dan eski bo'lsa o'qish fonda qayta yangilashni boshlaydi (bitta
+  provayder uchun bir vaqtda bittadan ortiq emas)
+- Yangilash xato bo'lsa oxirgi muvaffaqiyatli qiymat saqlanadi, xato alohida yoziladi
+- Depozitdan keyin ``invalidate(bukmeker)`` - o'sha provayder balansini fonda yangilash
+
+Sozlamalar (config, ixtiyoriy): BALANCE_REFRESH_SECONDS (30), BALANCE_DEADLINE_SECONDS (10).
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import config
+from handlers.providers import PROVIDERS
+from utils.deadline import deadline
+from utils.task_executor import submit
+
+_EMPTY = {'Success': False, 'Balance': 0, 'Limit': 0, 'Error': "Balans hali olinmadi"}
+
+
+class BalanceSnapshot:
+    """
+    Bitta provayderning oxirgi balansi
+
+    Attributes:
+        data: oxirgi muvaffaqiyatli javob (yoki hali olinmagan/xato bo'lsa oxirgi javob)
+        fetched_at: data olingan vaqt (time.time(); hech olinmagan bo'lsa 0)
+        error: oxirgi yangilash xatosi (muvaffaqiyatli bo'lsa None)
+    """
+
+    __slots__ = ('data', 'fetched_at', 'error', 'refreshing')
+
+    def __init__(self):
+        self.data = dict(_EMPTY)
+        self.fetched_at = 0.0
+        self.error: Optional[str] = None
+        self.refreshing = False
+
+    def age(self, now: Optional[float] = None) -> Optional[float]:
+        return None if not self.fetched_at else (now or time.time()) - self.fetched_at
+
+
+class BalanceService:
+    """
+    Attributes:
+        interval: davriy yangilash oralig'i va snapshot "yangi" hisoblanadigan muddat (soniya)
+        fetch_deadline: bitta provayder yangilashi uchun deadline (soniya)
+    """
+
+    def __init__(self, providers: Optional[Dict] = None, interval: float = 30.0, fetch_deadline: float = 10.0):
+        self.providers = PROVIDERS if providers is None else providers
+        self.interval = interval
+        self.fetch_deadline = fetch_deadline
+        self._lock = threading.Lock()
+        self._snapshots: Dict[str, BalanceSnapshot] = {name: BalanceSnapshot() for name in self.providers}
+        for name, provider in self.providers.items():
+            if not provider.available:
+                self._snapshots[name].data = dict(_EMPTY, Error=f"{name} API mavjud emas")
+        self._waiters: List[threading.Event] = []
+        self._thread: Optional[threading.Thread] = None
+
+    def _fetch(self, name: str) -> None:
+        provider = self.providers[name]
+        try:
+            with deadline(self.fetch_deadline):
+                result = provider.balance()
+            error = None if result.get('Success') else str(result.get('Error') or result.get('error') or 'Xatolik')
+        except Exception as e:
+            result, error = None, str(e) or e.__class__.__name__
+        now = time.time()
+        with self._lock:
+            snap = self._snapshots[name]
+            snap.refreshing = False
+            snap.error = error
+            # Xato bo'lsa oxirgi muvaffaqiyatli balans saqlanadi
+            if error is None:
+                snap.data, snap.fetched_at = result, now
+            elif not snap.data.get('Success'):
+                snap.data = dict(_EMPTY, Error=error) if result is None else result
+            waiters = list(self._waiters)
+        for event in waiters:
+            event.set()
+
+    def refresh(self, names: Optional[Iterable[str]] = None) -> List[str]:
+        """Fonda yangilashni boshlash (allaqachon yangilanayotganlar o'tkazib yuboriladi)"""
+        started = []
+        with self._lock:
+            for name in (self.providers if names is None else names):
+                snap = self._snapshots.get(name)
+                if snap is None or snap.refreshing or not self.providers[name].available:
+                    continue
+                snap.refreshing = True
+                started.append(name)
+        for name in started:
+            if submit('balance', self._fetch, name) is None:
+                with self._lock:
+                    self._snapshots[name].refreshing = False
+        return started
+
+    def refresh_and_wait(self, names: Optional[Iterable[str]] = None, timeout: Optional[float] = None) -> None:
+        """Yangilash tugashini kutish (faqat fon vazifalari ichida - handlerlarda emas)"""
+        event = threading.Event()
+        with self._lock:
+            self._waiters.append(event)
+        try:
+            self.refresh(names)
+            deadline_at = time.monotonic() + (self.fetch_deadline + 1 if timeout is None else timeout)
+            wanted = list(self.providers if names is None else names)
+            while True:
+                with self._lock:
+                    busy = any(self._snapshots[n].refreshing for n in wanted if n in self._snapshots)
+                left = deadline_at - time.monotonic()
+                if not busy or left <= 0:
+                    return
+                event.wait(left)
+                event.clear()
+        finally:
+            with self._lock:
+                self._waiters.remove(event)
+
+    def fetch_now(self, name: str) -> dict:
+        """Balansni chaqiruvchi oqimda (deadline bilan) olib snapshot'ni yangilash - executor'ga
+        topshirmaydi, shuning uchun band pool ichidagi vazifadan ham xavfsiz"""
+        provider = self.providers.get(name)
+        if provider is not None and provider.available:
+            self._fetch(name)
+        return self.get(name)
+
+    def invalidate(self, name: str) -> None:
+        """Balans o'zgardi (depozit) - fonda yangilash"""
+        self.refresh([name])
+
+    def get(self, name: str) -> dict:
+        """Oxirgi balans (bloklamaydi); eskirgan bo'lsa fonda yangilash boshlanadi"""
+        with self._lock:
+            snap = self._snapshots.get(name)
+            if snap is None:
+                return dict(_EMPTY, Error="Noma'lum bukmeker")
+            data = dict(snap.data)
+            stale = snap.age() is None or snap.age() > self.interval
+        if stale:
+            self.refresh([name])
+        return data
+
+    def snapshots(self, names: Optional[Iterable[str]] = None) -> Dict[str, BalanceSnapshot]:
+        """Snapshot nusxalari (ekranni chizish uchun)"""
+        out = {}
+        with self._lock:
+            for name in (self.providers if names is None else names):
+                snap = self._snapshots.get(name)
+                if snap is None:
+                    continue
+                copy = BalanceSnapshot()
+                copy.data, copy.fetched_at, copy.error, copy.refreshing = dict(snap.data), snap.fetched_at, snap.error, snap.refreshing
+                out[name] = copy
+        return out
+
+    def start(self) -> threading.Thread:
+        """Davriy yangilash oqimi"""
+        def _loop():
+            while True:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Balance refresh error: {e}")
+                time.sleep(self.interval)
+
+        self._thread = threading.Thread(target=_loop, name='balance-refresh', daemon=True)
+        self._thread.start()
+        return self._thread
+
+
+balance_service = BalanceService(
+    interval=getattr(config, 'BALANCE_REFRESH_SECONDS', 30),
+    fetch_deadline=getattr(config, 'BALANCE_DEADLINE_SECONDS', 10),
+)
@@ -0,0 +1,230 @@
+"""
+Karta bo'yicha yakuniy summa taqsimlovchi - pending oynalar hech qachon bir xil (karta, summa) olmaydi
+
+process_deposit foydalanuvchi summasiga 1..125 so'm qo'shadi. Bu modul shu qo'shimchani
+tasodifiy emas, band bo'lmagan qiymatlardan tanlaydi:
+- Har bir card_last4 uchun bandlik bitmap'i: so'm summa -> bit (128 bitli bloklar, int)
+- Bo'sh offset tanlash: ikki blokdan 125 bitli oyna, bo'sh bitlar orasidan tasodifiy biri
+- Karta to'lgan bo'lsa keyingi kartaga o'tiladi (kartalar tasodifiy tartibda)
+- Bo'shatish: to'lov pending holatdan chiqqanda (claim, status, expiry) Database chaqiradi;
+  bo'shagan kalit yana ``hold_seconds`` band turadi - bank qatorlarida tranzaksiya ID yo'q, shu
+  oynada boshqa mijozga berilsa uning PAYMENT matni oldingisiniki bilan bir xil bo'lib dedupe'da
+  tashlanardi (PAYMENT_DEDUPE_TTL_SECONDS bilan bir xil)
+- Dedupe PAYMENT matnini eslab qolganda ``hold()`` shu kalitni yana ``hold_seconds`` ushlaydi -
+  fingerprint bo'shatishdan keyin yozilsa ham kalit undan oldin bo'shamaydi
+- Qayta ishga tushishda ``rebuild(pending, recent)`` - yaqinda pending'dan chiqqan to'lovlar ham
+  band qilinadi (dedupe fingerprint'lari DB'dan qaytadi, hold esa xotirada edi)
+
+Shunday qilib kelgan har bir PAYMENT (karta, summa) kaliti ko'pi bilan bitta pending oynaga mos keladi.
+"""
+
+import heapq
+import random
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.money import TIYIN_PER_SOM
+
+BLOCK_BITS = 128
+BLOCK_MASK = (1 << BLOCK_BITS) - 1
+
+# generate_random_amount() bilan bir xil diapazon
+MIN_OFFSET = 1
+MAX_OFFSET = 125
+
+
+def _whole_som_key(card_last4: Optional[str], amount_tiyin: Optional[int]) -> Optional[Tuple[str, int]]:
+    """(karta, so'm) kaliti; kasr so'mli yoki to'liq bo'lmagan summa - None"""
+    if not card_last4 or amount_tiyin is None:
+        return None
+    som, rest = divmod(amount_tiyin, TIYIN_PER_SOM)
+    return None if rest else (card_last4, som)
+
+
+class AmountAllocator:
+    """
+    Thread-safe (card_last4, yakuniy so'm) band qilish
+
+    Attributes:
+        _bitmaps: card_last4 -> {blok raqami: bandlik bitlari}
+        _owners: payment_id -> (card_last4, yakuniy so'm)
+        _owned: (karta, so'm) -> pending egalar soni (rebuild'da legacy to'lovlar bir nechta bo'lishi mumkin)
+        _held: bo'shatilgan/eslab qolingan, hali band turgan kalitlar -> muddat (time.monotonic)
+        _held_heap: [(muddat, kalit), ...] - muddati o'tganlarni tartib bilan chiqarish uchun
+        hold_seconds: bo'shatilgan kalitning band turish muddati
+    """
+
+    def __init__(self, min_offset: int = MIN_OFFSET, max_offset: int = MAX_OFFSET, hold_seconds: float = 0):
+        self.min_offset = min_offset
+        self.max_offset = max_offset
+        self.hold_seconds = hold_seconds
+        self._span = max_offset - min_offset + 1
+        self._lock = threading.Lock()
+        self._bitmaps: Dict[str, Dict[int, int]] = {}
+        self._owners: Dict[str, Tuple[str, int]] = {}
+        self._owned: Dict[Tuple[str, int], int] = {}
+        self._held: Dict[Tuple[str, int], float] = {}
+        self._held_heap: List[Tuple[float, Tuple[str, int]]] = []
+        self._rand = random.SystemRandom()
+
+    def __len__(self) -> int:
+        return len(self._owners)
+
+    def _window_locked(self, card_last4: str, start: int) -> int:
+        """[start, start + span) oralig'idagi band bitlar (start - 0-bit)"""
+        blocks = self._bitmaps.get(card_last4)
+        if not blocks:
+            return 0
+        block, shift = divmod(start, BLOCK_BITS)
+        bits = blocks.get(block, 0) | (blocks.get(block + 1, 0) << BLOCK_BITS)
+        return (bits >> shift) & ((1 << self._span) - 1)
+
+    def _set_locked(self, card_last4: str, amount: int) -> None:
+        block, bit = divmod(amount, BLOCK_BITS)
+        blocks = self._bitmaps.setdefault(card_last4, {})
+        blocks[block] = blocks.get(block, 0) | (1 << bit)
+
+    def _clear_locked(self, card_last4: str, amount: int) -> None:
+        blocks = self._bitmaps.get(card_last4)
+        if not blocks:
+            return
+        block, bit = divmod(amount, BLOCK_BITS)
+        value = blocks.get(block, 0) & ~(1 << bit) & BLOCK_MASK
+        if value:
+            blocks[block] = value
+        else:
+            blocks.pop(block, None)
+            if not blocks:
+                del self._bitmaps[card_last4]
+
+    def _hold_locked(self, key: Tuple[str, int], until: float) -> None:
+        if until > self._held.get(key, 0.0):
+            self._held[key] = until
+            heapq.heappush(self._held_heap, (until, key))
+
+    def _expire_held_locked(self, now: float) -> None:
+        heap = self._held_heap
+        while heap and heap[0][0] <= now:
+            until, key = heapq.heappop(heap)
+            # Uzaytirilgan hold'ning eski yozuvi - o'tkazib yuboriladi
+            if self._held.get(key) != until:
+                continue
+            del self._held[key]
+            if key not in self._owned:
+                self._clear_locked(*key)
+
+    def allocate(self, payment_id: str, base_amount: int, cards: Sequence[str]) -> Optional[Tuple[str, int]]:
+        """
+        Bo'sh (karta, yakuniy summa) juftligini band qilish
+
+        Args:
+            payment_id: band qiluvchi to'lov ID
+            base_amount: foydalanuvchi kiritgan summa (so'm, int)
+            cards: tanlanishi mumkin bo'lgan card_last4 lar
+
+        Returns:
+            (card_last4, yakuniy so'm) yoki None (barcha kartalarda oyna to'la)
+        """
+        order = list(dict.fromkeys(cards))
+        self._rand.shuffle(order)
+        start = base_amount + self.min_offset
+        full = (1 << self._span) - 1
+        with self._lock:
+            self._expire_held_locked(time.monotonic())
+            for card_last4 in order:
+                free = ~self._window_locked(card_last4, start) & full
+                if not free:
+                    continue
+                # Bo'sh bitlar orasidan tasodifiy k-chisi
+                k = self._rand.randrange(bin(free).count('1'))
+                for _ in range(k):
+                    free &= free - 1
+                offset = (free & -free).bit_length() - 1
+                amount = start + offset
+                self._set_locked(card_last4, amount)
+                self._owners[payment_id] = (card_last4, amount)
+                self._owned[(card_last4, amount)] = 1
+                return card_last4, amount
+        return None
+
+    def is_reserved(self, card_last4: str, amount: int) -> bool:
+        """(karta, yakuniy so'm) band qilinganmi - O(1)"""
+        block, bit = divmod(amount, BLOCK_BITS)
+        with self._lock:
+            self._expire_held_locked(time.monotonic())
+            return bool(self._bitmaps.get(card_last4, {}).get(block, 0) >> bit & 1)
+
+    def release(self, payment_id: str, hold: bool = True) -> bool:
+        """To'lov oynasini bo'shatish (hold=False - summa foydalanuvchiga ko'rsatilmagan, darhol)"""
+        with self._lock:
+            owner = self._owners.pop(payment_id, None)
+            if owner is None:
+                return False
+            count = self._owned.get(owner, 0)
+            if count > 1:
+                # Kalit hali boshqa pending to'lovda - bit qoladi
+                self._owned[owner] = count - 1
+                return True
+            self._owned.pop(owner, None)
+            if hold and self.hold_seconds > 0:
+                self._hold_locked(owner, time.monotonic() + self.hold_seconds)
+            elif owner not in self._held:
+                self._clear_locked(*owner)
+            return True
+
+    def release_many(self, payment_ids: Iterable[str]) -> int:
+        return sum(1 for pid in payment_ids if self.release(pid))
+
+    def hold(self, card_last4: Optional[str], amount_tiyin: Optional[int]) -> bool:
+        """
+        (karta, summa) kalitini ``hold_seconds`` band qilish/uzaytirish - dedupe PAYMENT matnini
+        eslab qolganda chaqiriladi (faqat butun so'mli summalar)
+
+        Returns:
+            True - kalit band qilindi
+        """
+        key = _whole_som_key(card_last4, amount_tiyin)
+        if key is None or self.hold_seconds <= 0:
+            return False
+        with self._lock:
+            self._set_locked(*key)
+            self._hold_locked(key, time.monotonic() + self.hold_seconds)
+        return True
+
+    def rebuild(self, payments: Iterable, recent: Iterable = ()) -> int:
+        """
+        DB'dagi to'lovlardan bandlikni tiklash (faqat butun so'mli summalar)
+
+        Args:
+            payments: pending to'lovlar
+            recent: ``hold_seconds`` ichida pending'dan chiqqan to'lovlar - yana ``hold_seconds`` ushlanadi
+        """
+        with self._lock:
+            self._bitmaps.clear()
+            self._owners.clear()
+            self._owned.clear()
+            self._held.clear()
+            self._held_heap.clear()
+            for payment in payments:
+                key = _whole_som_key(payment.card_last4, payment.amount)
+                if key is None:
+                    continue
+                self._set_locked(*key)
+                self._owned[key] = self._owned.get(key, 0) + 1
+                self._owners[payment.payment_id] = key
+            until = time.monotonic() + self.hold_seconds
+            for payment in recent:
+                key = _whole_som_key(payment.card_last4, payment.amount)
+                if key is None or self.hold_seconds <= 0:
+                    continue
+                self._set_locked(*key)
+                self._hold_locked(key, until)
+            return len(self._owners)
+
+    def occupancy(self) -> List[Tuple[str, int]]:
+        """Karta bo'yicha band oynalar soni (admin/debug uchun)"""
+        with self._lock:
+            self._expire_held_locked(time.monotonic())
+            return [(card, sum(bin(v).count('1') for v in blocks.values()))
+                    for card, blocks in self._bitmaps.items()]
@@ -6,6 +6,7 @@ Tables:
 - payments: To'lovlar (depozitlar)
 - withdrawals: Pul yechish arizalari
 - cards: Karta ma'lumotlari
+- deposit_jobs: Bukmekerga depozit navbati (payment_id - idempotentlik kaliti)
 
 Features:
 - Thread-safe operatsiyalar (threading.Lock)
@@ -14,11 +15,41 @@ Features:
 """
 
 import sqlite3
-from typing import List, Optional
-from datetime import datetime, timedelta
-from .models import User, Payment, Withdrawal, Card
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from datetime import datetime, timedelta, timezone
+from .models import User, Payment, Withdrawal, Card, DepositJob
+from .pending_index import PendingPaymentIndex
+from .amount_allocator import AmountAllocator
+from utils.money import tiyin_to_som
 from config import DATABASE_PATH
+import config
 import threading
+import time
+
+# Payment.from_row kutadigan ustunlar tartibi. Legacy DB'larda ALTER TABLE bilan qo'shilgan
+# ustunlar jadval oxirida turadi, shuning uchun SELECT * o'rniga aniq tartib ishlatiladi.
+PAYMENT_COLUMNS = (
+    'id', 'user_id', 'bukmeker', 'player_id', 'amount', 'payment_id', 'card_last4', 'status',
+    'created_at', 'updated_at', 'payment_chat_id', 'payment_message_id', 'amount_tiyin',
+)
+
+DEPOSIT_JOB_COLUMNS = (
+    'payment_id, bukmeker, player_id, amount_tiyin, user_id, source, status, attempts, '
+    'next_run_at, last_error, created_at, updated_at'
+)
+
+# Claim bilan bitta tranzaksiyada depozit vazifasini yaratish (to'lov qatoridan)
+_ENQUEUE_FROM_PAYMENT = '''
+    INSERT OR IGNORE INTO deposit_jobs (payment_id, bukmeker, player_id, amount_tiyin, user_id,
+                                        source, status, attempts, next_run_at, created_at, updated_at)
+    SELECT payment_id, bukmeker, player_id, amount_tiyin, user_id, ?, 'queued', 0, ?, ?, ?
+    FROM payments WHERE payment_id = ?
+'''
+
+def _utc_str(dt: datetime) -> str:
+    """created_at (CURRENT_TIMESTAMP - UTC) bilan solishtirish uchun vaqt satri.
+    Naive datetime lokal vaqt deb qabul qilinadi."""
+    return dt.astimezone(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
 
 class Database:
     """
@@ -29,14 +60,20 @@ class Database:
         lock: Thread-safe operatsiyalar uchun Lock
         has_updated_at: payments jadvalida updated_at ustuni mavjudligi
         has_message_columns: payment message id ustunlari mavjudligi
+        payment_columns: PAYMENT_COLUMNS tartibidagi SELECT ro'yxati (yo'q ustunlar NULL)
+        pending: pending to'lovlarning xotiradagi indeksi (detektor uchun)
+        amounts: pending oynalar uchun (karta, yakuniy summa) taqsimlovchisi
     """
     
-    def __init__(self):
-        self.db_path = DATABASE_PATH
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or DATABASE_PATH
         self.lock = threading.Lock()
         # Keep a runtime flag whether the payments table contains updated_at column
         self.has_updated_at = False
         self.init_database()
+        self.pending = PendingPaymentIndex()
+        self.amounts = AmountAllocator(hold_seconds=getattr(config, 'PAYMENT_DEDUPE_TTL_SECONDS', 600))
+        self.rebuild_pending_index()
     
     def init_database(self):
         """Database va jadvallarni yaratish"""
@@ -70,17 +107,11 @@ class Database:
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     payment_chat_id INTEGER,
                     payment_message_id INTEGER,
+                    amount_tiyin INTEGER,
                     FOREIGN KEY (user_id) REFERENCES users (user_id)
                 )
             ''')
             
-            # Indexlar - tez qidiruv uchun
-            try:
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_payments_status ON payments(status)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_payments_card_amount ON payments(card_last4, amount, status)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_payments_created ON payments(created_at)')
-            except Exception:
-                pass
             cursor.execute("PRAGMA table_info(payments)")
             cols = [r[1] for r in cursor.fetchall()]
             # updated_at column
@@ -107,6 +138,29 @@ class Database:
                 except Exception:
                     # ignore if ALTER TABLE not supported on older DB file
                     self.has_message_columns = False
+
+            # amount_tiyin: aniq butun sonli summa (utils.money). Eski REAL qiymatlardan to'ldiriladi
+            if 'amount_tiyin' not in cols:
+                cursor.execute("ALTER TABLE payments ADD COLUMN amount_tiyin INTEGER")
+            cursor.execute('''
+                UPDATE payments SET amount_tiyin = CAST(ROUND(amount * 100) AS INTEGER)
+                WHERE amount_tiyin IS NULL AND amount IS NOT NULL
+            ''')
+
+            cursor.execute("PRAGMA table_info(payments)")
+            present = {r[1] for r in cursor.fetchall()}
+            self.payment_columns = ', '.join(
+                c if c in present else f"NULL AS {c}" for c in PAYMENT_COLUMNS
+            )
+
+            # Indexlar - tez qidiruv uchun
+            try:
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_payments_status ON payments(status)')
+                cursor.execute('DROP INDEX IF EXISTS idx_payments_card_amount')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_payments_card_tiyin ON payments(card_last4, amount_tiyin, status)')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_payments_created ON payments(created_at)')
+            except Exception:
+                pass
             
             # Withdrawals jadvali
             cursor.execute('''
@@ -120,9 +174,21 @@ class Database:
                     amount REAL,
                     status TEXT DEFAULT 'pending',
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    amount_tiyin INTEGER,
                     FOREIGN KEY (user_id) REFERENCES users (user_id)
                 )
             ''')
+            cursor.execute("PRAGMA table_info(withdrawals)")
+            if 'amount_tiyin' not in [r[1] for r in cursor.fetchall()]:
+                cursor.execute("ALTER TABLE withdrawals ADD COLUMN amount_tiyin INTEGER")
+            cursor.execute('''
+                UPDATE withdrawals SET amount_tiyin = CAST(ROUND(ABS(amount) * 100) AS INTEGER)
+                WHERE amount_tiyin IS NULL AND amount IS NOT NULL
+            ''')
+            # Admin navbati: pending arizalar id bo'yicha sahifalanadi
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_withdrawals_status ON withdrawals(status, id)')
+            # Eksport: created_at oralig'i bo'yicha skan
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_withdrawals_created ON withdrawals(created_at)')
             
             # Cards jadvali
             cursor.execute('''
@@ -135,6 +201,33 @@ class Database:
                 )
             ''')
             
+            # PAYMENT xabarlari fingerprint'lari (dublikatlarni restart'dan keyin ham tashlash uchun)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS payment_fingerprints (
+                    fingerprint TEXT PRIMARY KEY,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            
+            # Depozit navbati - restart'dan keyin ham saqlanadi; payment_id bo'yicha bittadan ortiq yo'q
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS deposit_jobs (
+                    payment_id TEXT PRIMARY KEY,
+                    bukmeker TEXT NOT NULL,
+                    player_id TEXT NOT NULL,
+                    amount_tiyin INTEGER NOT NULL,
+                    user_id INTEGER,
+                    source TEXT,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_run_at REAL NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    created_at REAL,
+                    updated_at REAL
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_deposit_jobs_due ON deposit_jobs(status, next_run_at)')
+            
             conn.commit()
     
     # ==================== USER METHODS ====================
@@ -164,7 +257,7 @@ class Database:
                 cursor.execute('SELECT * FROM users WHERE user_id = ?', (user_id,))
                 row = cursor.fetchone()
                 if row:
-                    return User(row[0], row[1], row[2], row[3], row[4])
+                    return User.from_row(row)
                 return None
         except Exception:
             return None
@@ -189,11 +282,7 @@ class Database:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT * FROM users')
-                rows = cursor.fetchall()
-                users = []
-                for row in rows:
-                    users.append(User(row[0], row[1], row[2], row[3], row[4]))
-                return users
+                return [User.from_row(row) for row in cursor.fetchall()]
         except Exception:
             return []
     
@@ -219,48 +308,37 @@ class Database:
                     if getattr(self, 'has_message_columns', False):
                         cursor.execute('''
                             INSERT INTO payments 
-                            (user_id, bukmeker, player_id, amount, payment_id, card_last4, status, payment_chat_id, payment_message_id)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                            (user_id, bukmeker, player_id, amount, payment_id, card_last4, status, payment_chat_id, payment_message_id, amount_tiyin)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                         ''', (payment.user_id, payment.bukmeker, payment.player_id,
-                             payment.amount, payment.payment_id, payment.card_last4, 
-                             payment.status, payment.payment_chat_id, payment.payment_message_id))
+                             tiyin_to_som(payment.amount), payment.payment_id, payment.card_last4, 
+                             payment.status, payment.payment_chat_id, payment.payment_message_id,
+                             payment.amount))
                     else:
                         cursor.execute('''
                             INSERT INTO payments 
-                            (user_id, bukmeker, player_id, amount, payment_id, card_last4, status)
-                            VALUES (?, ?, ?, ?, ?, ?, ?)
+                            (user_id, bukmeker, player_id, amount, payment_id, card_last4, status, amount_tiyin)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                         ''', (payment.user_id, payment.bukmeker, payment.player_id,
-                             payment.amount, payment.payment_id, payment.card_last4, 
-                             payment.status))
+                             tiyin_to_som(payment.amount), payment.payment_id, payment.card_last4, 
+                             payment.status, payment.amount))
                     conn.commit()
-                    return True
             except sqlite3.IntegrityError:
                 return False
             except Exception:
                 return False
+        self.pending.add(payment)
+        return True
     
     def get_payment_by_id(self, payment_id: str) -> Optional[Payment]:
         """Payment ID bo'yicha to'lovni olish"""
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
-                cursor.execute('SELECT * FROM payments WHERE payment_id = ?', (payment_id,))
+                cursor.execute(f'SELECT {self.payment_columns} FROM payments WHERE payment_id = ?', (payment_id,))
                 row = cursor.fetchone()
                 if row:
-                    payment = Payment(row[1], row[2], row[3], row[4], row[5], row[6])
-                    payment.status = row[7]
-                    payment.created_at = row[8]
-                    # optional columns
-                    try:
-                        payment.updated_at = row[9]
-                    except Exception:
-                        pass
-                    try:
-                        payment.payment_chat_id = row[10]
-                        payment.payment_message_id = row[11]
-                    except Exception:
-                        pass
-                    return payment
+                    return Payment.from_row(row)
                 return None
         except Exception:
             return None
@@ -297,9 +375,73 @@ class Database:
                             WHERE payment_id = ?
                         ''', (status, payment_id))
                     conn.commit()
-                    return True
             except Exception:
                 return False
+        if status != 'pending':
+            self._forget_pending((payment_id,))
+        return True
+
+    def claim_payment(self, payment_id: str, status: str = 'completed',
+                      from_statuses: Sequence[str] = ('pending',), enqueue_source: Optional[str] = None) -> bool:
+        """Pending to'lovni atomik yopish: faqat haqiqatan pending -> status o'tkazgan chaqiruv True oladi.
+
+        Detektor/replay bir to'lovni ikki marta bajarmasligi uchun. from_statuses - replay
+        bot o'chiq paytda expired bo'lgan oynalarni ham yopishi uchun. enqueue_source berilsa
+        shu tranzaksiyada deposit_jobs ga vazifa yoziladi (claim va navbat orasida crash bo'lmaydi).
+        """
+        set_clause = "status = ?, updated_at = CURRENT_TIMESTAMP" if self.has_updated_at else "status = ?"
+        placeholders = ','.join('?' * len(from_statuses))
+        with self.lock:
+            try:
+                with sqlite3.connect(self.db_path) as conn:
+                    cursor = conn.cursor()
+                    cursor.execute(f'''
+                        UPDATE payments SET {set_clause}
+                        WHERE payment_id = ? AND status IN ({placeholders})
+                    ''', (status, payment_id, *from_statuses))
+                    claimed = cursor.rowcount == 1
+                    if claimed and enqueue_source:
+                        now = time.time()
+                        cursor.execute(_ENQUEUE_FROM_PAYMENT, (enqueue_source, now, now, now, payment_id))
+                    conn.commit()
+            except Exception:
+                return False
+        self._forget_pending((payment_id,))
+        return claimed
+
+    def claim_payments(self, payment_ids: Iterable[str], status: str = 'completed',
+                       enqueue_source: Optional[str] = None) -> Set[str]:
+        """Bir nechta pending to'lovni bitta tranzaksiyada atomik yopish (batch detektor uchun).
+
+        enqueue_source berilsa yopilgan har bir to'lov uchun shu tranzaksiyada depozit vazifasi yoziladi.
+
+        Returns:
+            Haqiqatan shu chaqiruvda yopilgan payment_id'lar to'plami
+        """
+        ids = list(dict.fromkeys(payment_ids))
+        if not ids:
+            return set()
+        set_clause = "status = ?, updated_at = CURRENT_TIMESTAMP" if self.has_updated_at else "status = ?"
+        claimed: Set[str] = set()
+        now = time.time()
+        with self.lock:
+            try:
+                with sqlite3.connect(self.db_path) as conn:
+                    cursor = conn.cursor()
+                    for payment_id in ids:
+                        cursor.execute(f'''
+                            UPDATE payments SET {set_clause}
+                            WHERE payment_id = ? AND status = 'pending'
+                        ''', (status, payment_id))
+                        if cursor.rowcount == 1:
+                            claimed.add(payment_id)
+                            if enqueue_source:
+                                cursor.execute(_ENQUEUE_FROM_PAYMENT, (enqueue_source, now, now, now, payment_id))
+                    conn.commit()
+            except Exception:
+                return set()
+        self._forget_pending(ids)
+        return claimed
 
     def update_payment_message_ids(self, payment_id: str, chat_id: int, message_id: int) -> bool:
         """Save the chat_id and message_id of the payment message so we can edit/remove keyboard later."""
@@ -326,31 +468,16 @@ class Database:
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
-                time_str = since_time.strftime('%Y-%m-%d %H:%M:%S')
-                cursor.execute('''
-                    SELECT * FROM payments 
+                time_str = _utc_str(since_time)
+                cursor.execute(f'''
+                    SELECT {self.payment_columns} FROM payments 
                     WHERE status = 'pending' 
                     AND datetime(created_at) >= datetime(?) 
                     ORDER BY created_at DESC
                 ''', (time_str,))
                 
                 rows = cursor.fetchall()
-                payments = []
-                
-                for row in rows:
-                    payment = Payment(row[1], row[2], row[3], row[4], row[5], row[6])
-                    payment.status = row[7]
-                    payment.created_at = row[8]
-                    try:
-                        payment.updated_at = row[9]
-                    except Exception:
-                        pass
-                    try:
-                        payment.payment_chat_id = row[10]
-                        payment.payment_message_id = row[11]
-                    except Exception:
-                        pass
-                    payments.append(payment)
+                payments = [Payment.from_row(row) for row in rows]
                 
                 return payments
                 
@@ -358,46 +485,81 @@ class Database:
             return []
     
     def expire_old_pending_payments(self, before_time: datetime) -> int:
-        """5 daqiqadan oshgan pending to'lovlarni expired qilish"""
+        """before_time dan oldin yaratilgan pending to'lovlarni expired qilish va indeksdan chiqarish"""
+        set_clause = "status = 'expired', updated_at = CURRENT_TIMESTAMP" if self.has_updated_at else "status = 'expired'"
         with self.lock:
             try:
                 with sqlite3.connect(self.db_path) as conn:
                     cursor = conn.cursor()
-                    time_str = before_time.strftime('%Y-%m-%d %H:%M:%S')
-                    if getattr(self, 'has_updated_at', False):
-                        try:
-                            cursor.execute('''
-                                UPDATE payments 
-                                SET status = 'expired', updated_at = CURRENT_TIMESTAMP 
-                                WHERE status = 'pending' 
-                                AND datetime(created_at) < datetime(?)
-                            ''', (time_str,))
-                        except sqlite3.OperationalError as e:
-                            if 'no such column' in str(e):
-                                self.has_updated_at = False
-                                cursor.execute('''
-                                    UPDATE payments 
-                                    SET status = 'expired' 
-                                    WHERE status = 'pending' 
-                                    AND datetime(created_at) < datetime(?)
-                                ''', (time_str,))
-                            else:
-                                raise
-                    else:
-                        cursor.execute('''
-                            UPDATE payments 
-                            SET status = 'expired' 
-                            WHERE status = 'pending' 
-                            AND datetime(created_at) < datetime(?)
-                        ''', (time_str,))
-                    
-                    expired_count = cursor.rowcount
+                    time_str = _utc_str(before_time)
+                    cursor.execute('''
+                        SELECT payment_id FROM payments
+                        WHERE status = 'pending' AND created_at < ?
+                    ''', (time_str,))
+                    expired_ids = [r[0] for r in cursor.fetchall()]
+                    if not expired_ids:
+                        return 0
+                    cursor.executemany(f'''
+                        UPDATE payments SET {set_clause}
+                        WHERE payment_id = ? AND status = 'pending'
+                    ''', [(pid,) for pid in expired_ids])
                     conn.commit()
-                    
-                    return expired_count
-                    
             except Exception:
                 return 0
+        self._forget_pending(expired_ids)
+        return len(expired_ids)
+
+    def _forget_pending(self, payment_ids: Iterable[str]) -> None:
+        """Pending'dan chiqqan to'lovlarni indeks va summa taqsimlovchidan olib tashlash"""
+        ids = list(payment_ids)
+        self.pending.discard_many(ids)
+        self.amounts.release_many(ids)
+
+    def rebuild_pending_index(self) -> int:
+        """Pending indeks va summa bandligini DB'dan qayta qurish (ishga tushishda)"""
+        payments = self.get_pending_payments()
+        self.amounts.rebuild(payments, self.get_recently_released_payments(self.amounts.hold_seconds))
+        return self.pending.rebuild(payments)
+
+    def get_recently_released_payments(self, seconds: float) -> List[Payment]:
+        """So'nggi ``seconds`` ichida pending'dan chiqqan to'lovlar (qayta ishga tushishda summa hold'i uchun).
+
+        updated_at bo'lmagan eski bazada - shu oynada hali pending bo'lishi mumkin bo'lganlar
+        (created_at >= hozir - seconds - PENDING_PAYMENT_TTL_MINUTES); ortiqcha ushlash xavfsiz.
+        """
+        if seconds <= 0:
+            return []
+        since = datetime.now() - timedelta(seconds=seconds)
+        ttl = timedelta(minutes=getattr(config, 'PENDING_PAYMENT_TTL_MINUTES', 30))
+        query = f'''
+            SELECT {self.payment_columns} FROM payments
+            WHERE status != 'pending' AND created_at >= ?
+        '''
+        params = [_utc_str(since - ttl)]
+        if self.has_updated_at:
+            query += ' AND updated_at >= ?'
+            params.append(_utc_str(since))
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, params)
+                return [Payment.from_row(row) for row in cursor.fetchall()]
+        except Exception:
+            return []
+
+    def start_pending_janitor(self, ttl_minutes: int, interval_seconds: int = 60) -> threading.Thread:
+        """ttl_minutes dan eski pending oynalarni davriy expired qiluvchi fon oqimi"""
+        def _loop():
+            while True:
+                time.sleep(interval_seconds)
+                try:
+                    self.expire_old_pending_payments(datetime.now() - timedelta(minutes=ttl_minutes))
+                except Exception:
+                    pass
+
+        thread = threading.Thread(target=_loop, name='pending-janitor', daemon=True)
+        thread.start()
+        return thread
     
     def count_payments_by_status(self, status: str) -> int:
         """Status bo'yicha to'lovlarni sanash"""
@@ -416,90 +578,102 @@ class Database:
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
-                cursor.execute('SELECT * FROM payments WHERE status = "pending" ORDER BY created_at DESC')
+                cursor.execute(f'SELECT {self.payment_columns} FROM payments WHERE status = "pending" ORDER BY created_at DESC')
                 rows = cursor.fetchall()
-                payments = []
-
-                for row in rows:
-                    payment = Payment(row[1], row[2], row[3], row[4], row[5], row[6])
-                    payment.status = row[7]
-                    payment.created_at = row[8]
-                    try:
-                        payment.updated_at = row[9]
-                    except Exception:
-                        pass
-                    try:
-                        payment.payment_chat_id = row[10]
-                        payment.payment_message_id = row[11]
-                    except Exception:
-                        pass
-                    payments.append(payment)
+                payments = [Payment.from_row(row) for row in rows]
 
                 return payments
         except Exception:
             return []
 
-    def get_pending_payments_by_card_and_amount(self, card_last4: str, amount: float, tolerance: float = 5.0) -> List[Payment]:
-        """Fast query: return pending payments that match last4 and amount within tolerance."""
+    def get_payments_by_statuses(self, statuses: Sequence[str]) -> List[Payment]:
+        """Berilgan holatlardagi to'lovlar (replay: pending + expired oynalar)"""
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
-                # Use ABS(amount - ?) <= ? to match nearby amounts (SQLite supports ABS)
-                cursor.execute('''
-                    SELECT * FROM payments
-                    WHERE status = 'pending' AND card_last4 = ? AND ABS(amount - ?) <= ?
+                cursor.execute(f'''
+                    SELECT {self.payment_columns} FROM payments
+                    WHERE status IN ({','.join('?' * len(statuses))})
                     ORDER BY created_at DESC
-                    LIMIT 10
-                ''', (card_last4, amount, tolerance))
+                ''', tuple(statuses))
+                return [Payment.from_row(row) for row in cursor.fetchall()]
+        except Exception:
+            return []
+
+    def get_pending_payments_by_card_and_amount(self, card_last4: str, amount: int, tolerance: int = 0) -> List[Payment]:
+        """Fast query: pending payments matching last4 and amount (tiyin).
+
+        tolerance=0 - aniq tenglik; aks holda BETWEEN, eng yaqin summa birinchi
+        (ikkalasi ham idx_payments_card_tiyin dan foydalanadi).
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                if tolerance:
+                    cursor.execute(f'''
+                        SELECT {self.payment_columns} FROM payments
+                        WHERE card_last4 = ? AND amount_tiyin BETWEEN ? AND ? AND status = 'pending'
+                        ORDER BY ABS(amount_tiyin - ?), created_at DESC
+                        LIMIT 10
+                    ''', (card_last4, amount - tolerance, amount + tolerance, amount))
+                else:
+                    cursor.execute(f'''
+                        SELECT {self.payment_columns} FROM payments
+                        WHERE card_last4 = ? AND amount_tiyin = ? AND status = 'pending'
+                        ORDER BY created_at DESC
+                        LIMIT 10
+                    ''', (card_last4, amount))
                 rows = cursor.fetchall()
-                payments = []
-                for row in rows:
-                    payment = Payment(row[1], row[2], row[3], row[4], row[5], row[6])
-                    payment.status = row[7]
-                    payment.created_at = row[8]
-                    try:
-                        payment.updated_at = row[9]
-                    except Exception:
-                        pass
-                    try:
-                        payment.payment_chat_id = row[10]
-                        payment.payment_message_id = row[11]
-                    except Exception:
-                        pass
-                    payments.append(payment)
+                payments = [Payment.from_row(row) for row in rows]
                 return payments
         except Exception:
             return []
     
+    def get_pending_payments_for_keys(self, keys: Iterable[Tuple[str, int]]) -> Dict[Tuple[str, int], List[Payment]]:
+        """Bir nechta (card_last4, amount_tiyin) kaliti uchun pending to'lovlar - bitta so'rov.
+
+        Returns:
+            kalit -> [Payment, ...] (eng yangisi birinchi); topilmagan kalitlar yo'q
+        """
+        wanted = set(keys)
+        result: Dict[Tuple[str, int], List[Payment]] = {}
+        if not wanted:
+            return result
+        cards = sorted({k[0] for k in wanted})
+        amounts = sorted({k[1] for k in wanted})
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(f'''
+                    SELECT {self.payment_columns} FROM payments
+                    WHERE status = 'pending'
+                      AND card_last4 IN ({','.join('?' * len(cards))})
+                      AND amount_tiyin IN ({','.join('?' * len(amounts))})
+                    ORDER BY created_at DESC
+                ''', (*cards, *amounts))
+                for row in cursor.fetchall():
+                    payment = Payment.from_row(row)
+                    key = (payment.card_last4, payment.amount)
+                    if key in wanted:
+                        result.setdefault(key, []).append(payment)
+        except Exception:
+            return {}
+        return result
+    
     def get_user_payments(self, user_id: int, limit: int = 10) -> List[Payment]:
         """Foydalanuvchi to'lovlarini olish"""
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT * FROM payments 
+                cursor.execute(f'''
+                    SELECT {self.payment_columns} FROM payments 
                     WHERE user_id = ? 
                     ORDER BY created_at DESC 
                     LIMIT ?
                 ''', (user_id, limit))
                 
                 rows = cursor.fetchall()
-                payments = []
-                
-                for row in rows:
-                    payment = Payment(row[1], row[2], row[3], row[4], row[5], row[6])
-                    payment.status = row[7]
-                    payment.created_at = row[8]
-                    try:
-                        payment.updated_at = row[9]
-                    except Exception:
-                        pass
-                    try:
-                        payment.payment_chat_id = row[10]
-                        payment.payment_message_id = row[11]
-                    except Exception:
-                        pass
-                    payments.append(payment)
+                payments = [Payment.from_row(row) for row in rows]
                 
                 return payments
                 
@@ -511,48 +685,34 @@ class Database:
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT * FROM payments 
+                cursor.execute(f'''
+                    SELECT {self.payment_columns} FROM payments 
                     WHERE bukmeker = ? AND player_id = ?
                     ORDER BY created_at DESC
                     LIMIT ?
                 ''', (bukmeker, player_id, limit))
                 rows = cursor.fetchall()
-                payments = []
-                for row in rows:
-                    payment = Payment(row[1], row[2], row[3], row[4], row[5], row[6])
-                    payment.status = row[7]
-                    payment.created_at = row[8]
-                    try:
-                        payment.updated_at = row[9]
-                    except Exception:
-                        pass
-                    try:
-                        payment.payment_chat_id = row[10]
-                        payment.payment_message_id = row[11]
-                    except Exception:
-                        pass
-                    payments.append(payment)
+                payments = [Payment.from_row(row) for row in rows]
                 return payments
         except Exception:
             return []
     
-    def get_today_payments_sum(self) -> float:
-        """Bugungi to'lovlar yig'indisi"""
+    def get_today_payments_sum(self) -> int:
+        """Bugungi to'lovlar yig'indisi (tiyin)"""
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT SUM(amount) FROM payments 
+                    SELECT SUM(amount_tiyin) FROM payments 
                     WHERE DATE(created_at) = DATE('now') 
                     AND status = 'completed'
                 ''')
                 
                 result = cursor.fetchone()[0]
-                return result if result else 0.0
+                return result if result else 0
                 
         except Exception:
-            return 0.0
+            return 0
     
     # ==================== WITHDRAWAL METHODS ====================
     
@@ -564,11 +724,11 @@ class Database:
                     cursor = conn.cursor()
                     cursor.execute('''
                         INSERT INTO withdrawals 
-                        (user_id, bukmeker, player_id, card_number, code, amount, status)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                        (user_id, bukmeker, player_id, card_number, code, amount, status, amount_tiyin)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                     ''', (withdrawal.user_id, withdrawal.bukmeker, withdrawal.player_id,
-                         withdrawal.card_number, withdrawal.code, withdrawal.amount, 
-                         withdrawal.status))
+                         withdrawal.card_number, withdrawal.code, tiyin_to_som(withdrawal.amount), 
+                         withdrawal.status, withdrawal.amount))
                     conn.commit()
                     return cursor.lastrowid
             except Exception:
@@ -580,21 +740,73 @@ class Database:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT * FROM withdrawals WHERE status = "pending"')
-                rows = cursor.fetchall()
-                withdrawals = []
-                
-                for row in rows:
-                    withdrawal = Withdrawal(row[1], row[2], row[3], row[4], row[5])
-                    # row layout: (id, user_id, bukmeker, player_id, card_number, code, amount, status)
-                    withdrawal.amount = row[6]
-                    withdrawal.status = row[7]
-                    withdrawal.id = row[0]
-                    withdrawals.append(withdrawal)
-                
-                return withdrawals
+                return [Withdrawal.from_row(row) for row in cursor.fetchall()]
         except Exception:
             return []
 
+    def get_pending_withdrawals_page(self, offset: int = 0, limit: int = 10) -> Tuple[List[Withdrawal], int]:
+        """Pending yechishlar sahifasi (eng eskisi birinchi) va jami pending soni"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT COUNT(*) FROM withdrawals WHERE status = 'pending'")
+                total = cursor.fetchone()[0]
+                cursor.execute('''
+                    SELECT * FROM withdrawals WHERE status = 'pending'
+                    ORDER BY id LIMIT ? OFFSET ?
+                ''', (int(limit), int(offset)))
+                return [Withdrawal.from_row(row) for row in cursor.fetchall()], total
+        except Exception:
+            return [], 0
+
+    def complete_withdrawals(self, withdrawal_ids: Iterable[int], status: str = 'completed') -> List[Withdrawal]:
+        """Bir nechta pending arizani bitta tranzaksiyada yopish (admin bulk tasdiqlash).
+
+        Returns:
+            Haqiqatan shu chaqiruvda yopilgan arizalar (allaqachon yopilganlar kirmaydi -
+            ikki marta bosish ikki marta bildirishnoma bermaydi)
+        """
+        ids = list(dict.fromkeys(int(i) for i in withdrawal_ids))
+        if not ids:
+            return []
+        closed: List[int] = []
+        rows = []
+        with self.lock:
+            try:
+                with sqlite3.connect(self.db_path) as conn:
+                    cursor = conn.cursor()
+                    for withdrawal_id in ids:
+                        cursor.execute('''
+                            UPDATE withdrawals SET status = ? WHERE id = ? AND status = 'pending'
+                        ''', (status, withdrawal_id))
+                        if cursor.rowcount == 1:
+                            closed.append(withdrawal_id)
+                    for i in range(0, len(closed), 500):
+                        chunk = closed[i:i + 500]
+                        cursor.execute(f"SELECT * FROM withdrawals WHERE id IN ({','.join('?' * len(chunk))}) ORDER BY id",
+                                       chunk)
+                        rows.extend(cursor.fetchall())
+                    conn.commit()
+            except Exception:
+                return []
+        return [Withdrawal.from_row(row) for row in rows]
+
+    def get_usernames(self, user_ids: Iterable[int]) -> Dict[int, Optional[str]]:
+        """user_id -> username (bitta so'rovda; bildirishnomalar uchun)"""
+        ids = list(dict.fromkeys(int(i) for i in user_ids))
+        out: Dict[int, Optional[str]] = {}
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                for i in range(0, len(ids), 500):
+                    chunk = ids[i:i + 500]
+                    cursor.execute(f"SELECT user_id, username FROM users WHERE user_id IN ({','.join('?' * len(chunk))})",
+                                   chunk)
+                    out.update(cursor.fetchall())
+        except Exception:
+            pass
+        return out
+
     def get_withdrawal_by_id(self, withdrawal_id: int) -> Optional[Withdrawal]:
         """Return a Withdrawal object by id or None if not found."""
         try:
@@ -605,16 +817,7 @@ class Database:
                 if not row:
                     return None
 
-                # row layout: (id, user_id, bukmeker, player_id, card_number, code, amount, status, created_at)
-                withdrawal = Withdrawal(row[1], row[2], row[3], row[4], row[5])
-                withdrawal.amount = row[6]
-                withdrawal.status = row[7]
-                try:
-                    withdrawal.created_at = row[8]
-                except Exception:
-                    pass
-                withdrawal.id = row[0]
-                return withdrawal
+                return Withdrawal.from_row(row)
         except Exception:
             return None
     
@@ -657,17 +860,7 @@ class Database:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT * FROM cards WHERE is_active = TRUE')
-                rows = cursor.fetchall()
-                cards = []
-                
-                for row in rows:
-                    card = Card(row[1], row[2])
-                    # row layout: (id, card_number, card_name, is_active)
-                    card.is_active = bool(row[3])
-                    card.id = row[0]
-                    cards.append(card)
-                
-                return cards
+                return [Card.from_row(row) for row in cursor.fetchall()]
         except Exception:
             return []
     
@@ -677,17 +870,7 @@ class Database:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 cursor.execute('SELECT * FROM cards')
-                rows = cursor.fetchall()
-                cards = []
-                
-                for row in rows:
-                    card = Card(row[1], row[2])
-                    # row layout: (id, card_number, card_name, is_active)
-                    card.is_active = bool(row[3])
-                    card.id = row[0]
-                    cards.append(card)
-                
-                return cards
+                return [Card.from_row(row) for row in cursor.fetchall()]
         except Exception:
             return []
     
@@ -719,6 +902,226 @@ class Database:
             except Exception:
                 return False
 
+    # ==================== FINGERPRINT METHODS ====================
+    
+    def load_payment_fingerprints(self, now: float) -> List[Tuple[str, float]]:
+        """Muddati o'tmagan fingerprint'lar (expires_at bo'yicha o'sish tartibida); eskilari o'chiriladi"""
+        with self.lock:
+            try:
+                with sqlite3.connect(self.db_path) as conn:
+                    cursor = conn.cursor()
+                    cursor.execute('DELETE FROM payment_fingerprints WHERE expires_at <= ?', (now,))
+                    cursor.execute('''
+                        SELECT fingerprint, expires_at FROM payment_fingerprints
+                        ORDER BY expires_at
+                    ''')
+                    rows = cursor.fetchall()
+                    conn.commit()
+                    return rows
+            except Exception:
+                return []
+    
+    def save_payment_fingerprints(self, entries: Iterable[Tuple[str, float]]) -> bool:
+        """Fingerprint'larni saqlash (fingerprint, expires_at)"""
+        with self.lock:
+            try:
+                with sqlite3.connect(self.db_path) as conn:
+                    conn.executemany('''
+                        INSERT OR REPLACE INTO payment_fingerprints (fingerprint, expires_at)
+                        VALUES (?, ?)
+                    ''', entries)
+                    conn.commit()
+                    return True
+            except Exception:
+                return False
+
+    # ==================== DEPOSIT JOB METHODS ====================
+    
+    def enqueue_deposit_job(self, payment_id: str, bukmeker: str, player_id: str, amount_tiyin: int,
+                            user_id: Optional[int] = None, source: str = 'manual') -> bool:
+        """Depozit vazifasini qo'shish; payment_id bo'yicha allaqachon bo'lsa False (idempotent)"""
+        now = time.time()
+        with self.lock:
+            try:
+                with sqlite3.connect(self.db_path) as conn:
+                    cursor = conn.cursor()
+                    cursor.execute('''
+                        INSERT OR IGNORE INTO deposit_jobs (payment_id, bukmeker, player_id, amount_tiyin,
+                                                            user_id, source, status, attempts, next_run_at,
+                                                            created_at, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?, 'queued', 0, ?, ?, ?)
+                    ''', (payment_id, bukmeker, player_id, int(amount_tiyin), user_id, source, now, now, now))
+                    added = cursor.rowcount == 1
+                    conn.commit()
+                    return added
+            except Exception:
+                return False
+    
+    def take_deposit_jobs(self, now: float, limit: int, exclude_bukmekers: Iterable[str] = (),
+                          payment_ids: Optional[Sequence[str]] = None, capacity: Optional[Dict[str, int]] = None,
+                          per_bukmeker: Optional[int] = None) -> List[DepositJob]:
+        """Vaqti kelgan queued vazifalarni atomik olish (running, attempts + 1).
+
+        Bir vazifani ikki ishchi (yoki bot va replay tool) bir vaqtda ololmaydi.
+        payment_ids berilsa faqat shu vazifalar orasidan olinadi.
+        per_bukmeker berilsa har bukmekerdan ko'pi bilan shuncha (capacity da bo'lsa - o'sha
+        qolgan sig'im) vazifa olinadi.
+        """
+        exclude = list(exclude_bukmekers)
+        skip = f"AND bukmeker NOT IN ({','.join('?' * len(exclude))})" if exclude else ''
+        only = list(payment_ids) if payment_ids is not None else None
+        if only is not None:
+            if not only:
+                return []
+            skip += f" AND payment_id IN ({','.join('?' * len(only))})"
+            exclude += only
+        if per_bukmeker is not None:
+            caps = list((capacity or {}).items())
+            cap_sql = f"CASE bukmeker{' WHEN ? THEN ?' * len(caps)} ELSE ? END" if caps else '?'
+            select = f'''
+                SELECT payment_id FROM (
+                    SELECT payment_id, bukmeker, next_run_at,
+                           ROW_NUMBER() OVER (PARTITION BY bukmeker ORDER BY next_run_at) AS rn
+                    FROM deposit_jobs
+                    WHERE status = 'queued' AND next_run_at <= ? {skip}
+                )
+                WHERE rn <= {cap_sql}
+                ORDER BY next_run_at LIMIT ?
+            '''
+            params = (now, *exclude, *(v for item in caps for v in item), per_bukmeker, limit)
+        else:
+            select = f'''
+                SELECT payment_id FROM deposit_jobs
+                WHERE status = 'queued' AND next_run_at <= ? {skip}
+                ORDER BY next_run_at LIMIT ?
+            '''
+            params = (now, *exclude, limit)
+        with self.lock:
+            try:
+                with sqlite3.connect(self.db_path) as conn:
+                    cursor = conn.cursor()
+                    cursor.execute(select, params)
+                    taken = []
+                    for (payment_id,) in cursor.fetchall():
+                        cursor.execute('''
+                            UPDATE deposit_jobs SET status = 'running', attempts = attempts + 1, updated_at = ?
+                            WHERE payment_id = ? AND status = 'queued'
+                        ''', (now, payment_id))
+                        if cursor.rowcount == 1:
+                            taken.append(payment_id)
+                    jobs = []
+                    if taken:
+                        cursor.execute(f'''
+                            SELECT {DEPOSIT_JOB_COLUMNS} FROM deposit_jobs
+                            WHERE payment_id IN ({','.join('?' * len(taken))}) ORDER BY next_run_at
+                        ''', taken)
+                        jobs = [DepositJob.from_row(row) for row in cursor.fetchall()]
+                    conn.commit()
+                    return jobs
+            except Exception:
+                return []
+    
+    def finish_deposit_job(self, payment_id: str, status: str, error: Optional[str] = None,
+                           next_run_at: Optional[float] = None) -> bool:
+        """Vazifa natijasi: done / failed / uncertain yoki queued (next_run_at da qayta urinish)"""
+        now = time.time()
+        with self.lock:
+            try:
+                with sqlite3.connect(self.db_path) as conn:
+                    cursor = conn.cursor()
+                    cursor.execute('''
+                        UPDATE deposit_jobs SET status = ?, last_error = ?, next_run_at = COALESCE(?, next_run_at),
+                                                updated_at = ?
+                        WHERE payment_id = ? AND status = 'running'
+                    ''', (status, error, next_run_at, now, payment_id))
+                    updated = cursor.rowcount == 1
+                    conn.commit()
+                    return updated
+            except Exception:
+                return False
+    
+    def recover_deposit_jobs(self) -> int:
+        """Ishga tushishda: oldingi jarayonda running qolgan vazifalar -> uncertain.
+
+        Bukmeker chaqiruvi bajarilgan-bajarilmagani noma'lum - avtomatik qayta urinish ikki marta
+        depozit qilishi mumkin, shuning uchun admin tekshiruviga qoldiriladi.
+        """
+        with self.lock:
+            try:
+                with sqlite3.connect(self.db_path) as conn:
+                    cursor = conn.cursor()
+                    cursor.execute('''
+                        UPDATE deposit_jobs SET status = 'uncertain', updated_at = ?,
+                                                last_error = COALESCE(last_error, 'interrupted by restart')
+                        WHERE status = 'running'
+                    ''', (time.time(),))
+                    count = cursor.rowcount
+                    conn.commit()
+                    return count
+            except Exception:
+                return 0
+    
+    def requeue_deposit_job(self, payment_id: str) -> bool:
+        """uncertain/failed vazifani admin qarori bilan qayta navbatga qo'yish"""
+        now = time.time()
+        with self.lock:
+            try:
+                with sqlite3.connect(self.db_path) as conn:
+                    cursor = conn.cursor()
+                    cursor.execute('''
+                        UPDATE deposit_jobs SET status = 'queued', next_run_at = ?, updated_at = ?
+                        WHERE payment_id = ? AND status IN ('uncertain', 'failed')
+                    ''', (now, now, payment_id))
+                    updated = cursor.rowcount == 1
+                    conn.commit()
+                    return updated
+            except Exception:
+                return False
+    
+    def get_deposit_job(self, payment_id: str) -> Optional[DepositJob]:
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(f'SELECT {DEPOSIT_JOB_COLUMNS} FROM deposit_jobs WHERE payment_id = ?', (payment_id,))
+                row = cursor.fetchone()
+                return DepositJob.from_row(row) if row else None
+        except Exception:
+            return None
+    
+    def get_deposit_jobs(self, statuses: Sequence[str], limit: int = 100) -> List[DepositJob]:
+        """Berilgan holatlardagi vazifalar (eng eskisi birinchi)"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(f'''
+                    SELECT {DEPOSIT_JOB_COLUMNS} FROM deposit_jobs
+                    WHERE status IN ({','.join('?' * len(statuses))})
+                    ORDER BY created_at LIMIT ?
+                ''', (*statuses, limit))
+                return [DepositJob.from_row(row) for row in cursor.fetchall()]
+        except Exception:
+            return []
+    
+    def next_deposit_job_at(self) -> Optional[float]:
+        """Eng yaqin queued vazifa vaqti (navbat bo'sh bo'lsa None)"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT MIN(next_run_at) FROM deposit_jobs WHERE status = 'queued'")
+                return cursor.fetchone()[0]
+        except Exception:
+            return None
+    
+    def count_deposit_jobs(self) -> Dict[str, int]:
+        """Holat bo'yicha vazifalar soni"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute('SELECT status, COUNT(*) FROM deposit_jobs GROUP BY status')
+                return dict(cursor.fetchall())
+        except Exception:
+            return {}
+
+
 # Global database instance
 db = Database()
-
@@ -0,0 +1,131 @@
+"""
+To'lov va yechishlarni sana oralig'i bo'yicha faylga eksport qilish (moliya bo'limi uchun)
+
+Formatlar: gzip bilan siqilgan CSV yoki JSONL.
+
+Xususiyatlar:
+- Konstant xotira: qatorlar keyset ((created_at, id) > oxirgi qator) bo'laklari bilan o'qiladi va
+  darhol faylga yoziladi, model obyektlari/to_dict yaratilmaydi
+- created_at oralig'i bo'yicha indeks skani (idx_payments_created / idx_withdrawals_created)
+- since/until lokal vaqt; created_at esa UTC (CURRENT_TIMESTAMP) - chegaralar _utc_str bilan
+  UTC ga o'tkaziladi
+- Har bir bo'lak alohida so'rov - SQLite o'qish qulfi uzoq ushlanmaydi (bot yozishda davom etadi)
+- Sanalar DB'dagi matn ko'rinishida yoziladi (isoformat yo'q), summa tiyin + aniq so'm satri
+"""
+
+import csv
+import gzip
+import json
+import os
+import sqlite3
+from datetime import datetime
+from typing import Optional, Tuple
+
+from .database import _utc_str
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+EXPORT_BATCH_SIZE = 2000
+
+# jadval -> eksport ustunlari (amount_som hisoblanadigan ustun, DB'da yo'q)
+EXPORT_TABLES = {
+    'payments': (
+        'id', 'payment_id', 'user_id', 'bukmeker', 'player_id', 'card_last4',
+        'amount_tiyin', 'status', 'created_at', 'updated_at',
+    ),
+    'withdrawals': (
+        'id', 'user_id', 'bukmeker', 'player_id', 'card_number', 'code',
+        'amount_tiyin', 'status', 'created_at',
+    ),
+}
+
+
+def _som_str(tiyin: Optional[int]) -> str:
+    """Tiyin -> aniq so'm satri ("50017.00"), float orqali emas."""
+    if tiyin is None:
+        return ''
+    sign = '-' if tiyin < 0 else ''
+    whole, rest = divmod(abs(tiyin), 100)
+    return f"{sign}{whole}.{rest:02d}"
+
+
+def _select_list(cursor, table: str) -> str:
+    """Legacy DB'da yo'q ustunlar uchun NULL qo'yilgan SELECT ro'yxati."""
+    cursor.execute(f"PRAGMA table_info({table})")
+    present = {r[1] for r in cursor.fetchall()}
+    return ', '.join(c if c in present else f"NULL AS {c}" for c in EXPORT_TABLES[table])
+
+
+def export_table(db_path: str, table: str, since: datetime, until: datetime,
+                 fmt: str = 'csv', out_dir: str = 'exports') -> Tuple[str, int]:
+    """
+    Jadvalni [since, until) oralig'i bo'yicha eksport qilish
+
+    Args:
+        db_path: SQLite fayl yo'li
+        table: 'payments' yoki 'withdrawals'
+        since: boshlanish (kiradi; naive - lokal vaqt)
+        until: tugash (kirmaydi; naive - lokal vaqt)
+        fmt: 'csv' yoki 'jsonl'
+        out_dir: fayl yoziladigan papka
+
+    Returns:
+        (fayl yo'li, yozilgan qatorlar soni)
+    """
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"table must be one of {list(EXPORT_TABLES)}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"fmt must be one of {list(EXPORT_FORMATS)}")
+
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(
+        out_dir,
+        f"{table}_{since:%Y%m%d}_{until:%Y%m%d}_{datetime.now():%H%M%S}.{fmt}.gz"
+    )
+    columns = EXPORT_TABLES[table]
+    header = columns + ('amount_som',)
+    amount_idx = columns.index('amount_tiyin')
+    since_str = _utc_str(since)
+    until_str = _utc_str(until)
+    created_idx = columns.index('created_at')
+
+    count = 0
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        select_list = _select_list(cursor, table)
+        # created_at oralig'i indeks bo'yicha o'qiladi; (created_at, id) - keyset (bir xil
+        # soniyadagi qatorlar id bo'yicha davom etadi)
+        query = (
+            f"SELECT {select_list} FROM {table} "
+            f"WHERE created_at >= ? AND created_at < ? AND (created_at > ? OR id > ?) "
+            f"ORDER BY created_at, id LIMIT {EXPORT_BATCH_SIZE}"
+        )
+        with gzip.open(path, 'wt', encoding='utf-8', newline='') as f:
+            if fmt == 'csv':
+                writer = csv.writer(f)
+                writer.writerow(header)
+            last_created, last_id = since_str, 0
+            while True:
+                rows = cursor.execute(query, (last_created, until_str, last_created, last_id)).fetchall()
+                if not rows:
+                    break
+                if fmt == 'csv':
+                    writer.writerows(row + (_som_str(row[amount_idx]),) for row in rows)
+                else:
+                    f.writelines(
+                        json.dumps(dict(zip(header, row + (_som_str(row[amount_idx]),))),
+                                   ensure_ascii=False) + '\n'
+                        for row in rows
+                    )
+                count += len(rows)
+                last_created, last_id = rows[-1][created_idx], rows[-1][0]
+    except Exception:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        raise
+    finally:
+        conn.close()
+
+    return path, count
@@ -1,8 +1,17 @@
 from datetime import datetime
 from typing import Optional
 from dataclasses import dataclass, field
+from utils.money import to_tiyin, parse_som, format_som
 
-@dataclass
+# DB'dan o'qilgan qatorlar uchun __init__/__post_init__ ni chetlab o'tish
+# (ma'lumot yozishda allaqachon validatsiyadan o'tgan)
+_new = object.__new__
+
+def _iso(value):
+    """datetime -> ISO satr; from_row'dan kelgan satr/None o'zgarishsiz"""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+@dataclass(slots=True)
 class User:
     """Foydalanuvchi modeli"""
     user_id: int
@@ -19,6 +28,21 @@ class User:
         if self.user_id <= 0:
             raise ValueError("user_id must be positive")
     
+    @classmethod
+    def from_row(cls, row) -> "User":
+        """DB qatoridan validatsiyasiz yaratish.
+
+        Row: (user_id, username, phone, first_name, is_admin, created_at)
+        """
+        obj = _new(cls)
+        obj.user_id = row[0]
+        obj.username = row[1]
+        obj.phone = row[2]
+        obj.first_name = row[3]
+        obj.is_admin = bool(row[4])
+        obj.created_at = row[5] if len(row) > 5 else None
+        return obj
+    
     def to_dict(self) -> dict:
         """Dict formatga o'tkazish"""
         return {
@@ -27,19 +51,19 @@ class User:
             'phone': self.phone,
             'first_name': self.first_name,
             'is_admin': self.is_admin,
-            'created_at': self.created_at.isoformat()
+            'created_at': _iso(self.created_at)
         }
     
     def __str__(self):
         return f"User(id={self.user_id}, username={self.username})"
 
-@dataclass
+@dataclass(slots=True)
 class Payment:
     """To'lov modeli"""
     user_id: int
     bukmeker: str
     player_id: str
-    amount: float
+    amount: int  # tiyin (utils.money)
     payment_id: str
     card_last4: Optional[str] = None
     status: str = "pending"  # pending, completed, failed, expired
@@ -54,6 +78,9 @@ class Payment:
         if not isinstance(self.user_id, int):
             raise ValueError("user_id must be an integer")
         
+        if not isinstance(self.amount, int):
+            raise ValueError("amount must be an integer (tiyin)")
+        
         if self.amount <= 0:
             raise ValueError("amount must be positive")
         
@@ -67,6 +94,33 @@ class Payment:
         if self.status not in valid_statuses:
             raise ValueError(f"status must be one of {valid_statuses}")
     
+    @classmethod
+    def from_row(cls, row) -> "Payment":
+        """DB qatoridan validatsiyasiz yaratish (bulk o'qish uchun).
+
+        Row: (id, user_id, bukmeker, player_id, amount, payment_id, card_last4, status,
+              created_at, updated_at, payment_chat_id, payment_message_id, amount_tiyin)
+        Legacy DB'larda oxirgi ustunlar bo'lmasligi mumkin.
+        """
+        n = len(row)
+        obj = _new(cls)
+        obj.user_id = row[1]
+        obj.bukmeker = row[2]
+        obj.player_id = row[3]
+        obj.amount = row[12] if n > 12 and row[12] is not None else to_tiyin(row[4])
+        obj.payment_id = row[5]
+        obj.card_last4 = row[6]
+        obj.status = row[7]
+        obj.created_at = row[8]
+        obj.updated_at = row[9] if n > 9 and row[9] is not None else row[8]
+        if n > 11:
+            obj.payment_chat_id = row[10]
+            obj.payment_message_id = row[11]
+        else:
+            obj.payment_chat_id = None
+            obj.payment_message_id = None
+        return obj
+    
     def mark_completed(self):
         """To'lovni completed qilish"""
         self.status = "completed"
@@ -96,8 +150,8 @@ class Payment:
             'payment_id': self.payment_id,
             'card_last4': self.card_last4,
             'status': self.status,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat(),
+            'created_at': _iso(self.created_at),
+            'updated_at': _iso(self.updated_at),
             'payment_chat_id': self.payment_chat_id,
             'payment_message_id': self.payment_message_id
         }
@@ -105,7 +159,7 @@ class Payment:
     def __str__(self):
         return f"Payment(id={self.payment_id}, amount={self.amount}, status={self.status})"
 
-@dataclass
+@dataclass(slots=True)
 class Withdrawal:
     """Pul yechish modeli"""
     user_id: int
@@ -113,7 +167,7 @@ class Withdrawal:
     player_id: str
     card_number: str
     code: str
-    amount: Optional[float] = None
+    amount: Optional[int] = None  # tiyin (utils.money)
     status: str = "pending"  # pending, approved, completed, failed
     created_at: datetime = field(default_factory=datetime.now)
     id: Optional[int] = None
@@ -137,13 +191,33 @@ class Withdrawal:
         if not self.code:
             raise ValueError("code cannot be empty")
         
-        if self.amount is not None and self.amount <= 0:
-            raise ValueError("amount must be positive")
+        if self.amount is not None and (not isinstance(self.amount, int) or self.amount <= 0):
+            raise ValueError("amount must be a positive integer (tiyin)")
         
         valid_statuses = ['pending', 'approved', 'completed', 'failed']
         if self.status not in valid_statuses:
             raise ValueError(f"status must be one of {valid_statuses}")
     
+    @classmethod
+    def from_row(cls, row) -> "Withdrawal":
+        """DB qatoridan validatsiyasiz yaratish.
+
+        Row: (id, user_id, bukmeker, player_id, card_number, code, amount, status, created_at,
+              amount_tiyin)
+        """
+        n = len(row)
+        obj = _new(cls)
+        obj.id = row[0]
+        obj.user_id = row[1]
+        obj.bukmeker = row[2]
+        obj.player_id = row[3]
+        obj.card_number = row[4]
+        obj.code = row[5]
+        obj.amount = row[9] if n > 9 and row[9] is not None else to_tiyin(row[6])
+        obj.status = row[7]
+        obj.created_at = row[8] if n > 8 else None
+        return obj
+    
     def mark_approved(self):
         """Withdrawal ni approved qilish"""
         self.status = "approved"
@@ -176,13 +250,13 @@ class Withdrawal:
             'code': self.code,
             'amount': self.amount,
             'status': self.status,
-            'created_at': self.created_at.isoformat()
+            'created_at': _iso(self.created_at)
         }
     
     def __str__(self):
         return f"Withdrawal(id={self.id}, card={self.get_masked_card()}, status={self.status})"
 
-@dataclass
+@dataclass(slots=True)
 class Card:
     """Karta modeli"""
     card_number: str
@@ -204,6 +278,20 @@ class Card:
         if len(clean_card) != 16:
             raise ValueError("card_number must be 16 digits")
     
+    @classmethod
+    def from_row(cls, row) -> "Card":
+        """DB qatoridan validatsiyasiz yaratish.
+
+        Row: (id, card_number, card_name, is_active, created_at)
+        """
+        obj = _new(cls)
+        obj.id = row[0]
+        obj.card_number = row[1]
+        obj.card_name = row[2]
+        obj.is_active = bool(row[3])
+        obj.created_at = row[4] if len(row) > 4 else None
+        return obj
+    
     def get_last4(self) -> str:
         """Karta raqamining oxirgi 4 raqamini olish"""
         clean_card = self.card_number.replace(" ", "")
@@ -238,13 +326,45 @@ class Card:
             'card_number': self.card_number,
             'card_name': self.card_name,
             'is_active': self.is_active,
-            'created_at': self.created_at.isoformat()
+            'created_at': _iso(self.created_at)
         }
     
     def __str__(self):
         status = "Active" if self.is_active else "Inactive"
         return f"Card({self.get_masked_number()}, {status})"
 
+@dataclass(slots=True)
+class DepositJob:
+    """Bukmekerga depozit vazifasi (deposit_jobs jadvali; payment_id - idempotentlik kaliti)"""
+    payment_id: str
+    bukmeker: str
+    player_id: str
+    amount: int  # tiyin (utils.money)
+    user_id: Optional[int] = None
+    source: str = "detector"
+    status: str = "queued"  # queued, running, done, failed, uncertain
+    attempts: int = 0
+    next_run_at: float = 0.0  # epoch
+    last_error: Optional[str] = None
+    created_at: Optional[float] = None
+    updated_at: Optional[float] = None
+
+    @classmethod
+    def from_row(cls, row) -> "DepositJob":
+        """DB qatoridan validatsiyasiz yaratish.
+
+        Row: (payment_id, bukmeker, player_id, amount_tiyin, user_id, source, status, attempts,
+              next_run_at, last_error, created_at, updated_at)
+        """
+        obj = _new(cls)
+        (obj.payment_id, obj.bukmeker, obj.player_id, obj.amount, obj.user_id, obj.source,
+         obj.status, obj.attempts, obj.next_run_at, obj.last_error, obj.created_at,
+         obj.updated_at) = row
+        return obj
+
+    def __str__(self):
+        return f"DepositJob(id={self.payment_id}, status={self.status}, attempts={self.attempts})"
+
 # Utility funksiyalar
 def validate_card_number(card_number: str) -> bool:
     """Karta raqamini validatsiya qilish"""
@@ -255,8 +375,8 @@ def validate_card_number(card_number: str) -> bool:
         return False
 
 def format_amount(amount: float) -> str:
-    """Summani formatlash"""
-    return f"{amount:,.0f}".replace(",", " ")
+    """Summani formatlash (so'm)"""
+    return format_som(amount).replace(",", " ")
 
 def parse_payment_format(text: str) -> Optional[dict]:
     """PAYMENT|SUMMA|KARTA4 formatni parse qilish"""
@@ -266,10 +386,10 @@ def parse_payment_format(text: str) -> Optional[dict]:
         if len(parts) != 3 or parts[0] != 'PAYMENT':
             return None
         
-        amount = float(parts[1])
+        amount = parse_som(parts[1])
         card_last4 = parts[2]
         
-        if len(card_last4) != 4 or not card_last4.isdigit():
+        if amount is None or len(card_last4) != 4 or not card_last4.isdigit():
             return None
         
         return {
@@ -0,0 +1,135 @@
+"""
+Pending to'lovlarning xotiradagi indeksi - detektor uchun O(1) qidiruv
+
+Kalit: (card_last4, amount_tiyin) -> shu kalitdagi pending Payment'lar (eng yangisi oxirida)
+Tolerance uchun: card_last4 -> (amount_tiyin, created_ts, payment_id) saralangan ro'yxati (bisect)
+
+Database bilan sinxron:
+- add_payment -> add()
+- status o'zgarishi / claim -> discard()
+- expire_old_pending_payments -> discard_many()
+- ishga tushishda -> rebuild() (DB'dagi barcha pending'lar)
+"""
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .models import Payment
+
+Key = Tuple[str, int]
+
+
+def _created_ts(payment: Payment) -> float:
+    """created_at -> epoch. DB matni CURRENT_TIMESTAMP (UTC) formatida."""
+    created = payment.created_at
+    if isinstance(created, str):
+        try:
+            return datetime.strptime(created[:19], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc).timestamp()
+        except ValueError:
+            return time.time()
+    if isinstance(created, datetime):
+        return created.timestamp()
+    return time.time()
+
+
+class PendingPaymentIndex:
+    """
+    Thread-safe pending to'lovlar indeksi
+
+    Attributes:
+        _by_key: (card_last4, amount_tiyin) -> [(created_ts, Payment), ...]
+        _by_id: payment_id -> (key, created_ts, Payment)
+        _by_card: card_last4 -> [(amount_tiyin, created_ts, payment_id), ...] summa bo'yicha saralangan
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_key: Dict[Key, List[Tuple[float, Payment]]] = {}
+        self._by_id: Dict[str, Tuple[Key, float, Payment]] = {}
+        self._by_card: Dict[str, List[Tuple[int, float, str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def _add_locked(self, payment: Payment, created_ts: float) -> None:
+        key = (payment.card_last4, payment.amount)
+        if payment.payment_id in self._by_id:
+            self._discard_locked(payment.payment_id)
+        bucket = self._by_key.setdefault(key, [])
+        bucket.append((created_ts, payment))
+        if len(bucket) > 1 and bucket[-2][0] > created_ts:
+            bucket.sort(key=lambda e: e[0])
+        self._by_id[payment.payment_id] = (key, created_ts, payment)
+        insort(self._by_card.setdefault(key[0], []), (key[1], created_ts, payment.payment_id))
+
+    def _discard_locked(self, payment_id: str) -> Optional[Payment]:
+        entry = self._by_id.pop(payment_id, None)
+        if entry is None:
+            return None
+        key, created_ts, payment = entry
+        bucket = self._by_key.get(key)
+        if bucket:
+            bucket[:] = [e for e in bucket if e[1].payment_id != payment_id]
+            if not bucket:
+                del self._by_key[key]
+        amounts = self._by_card.get(key[0])
+        if amounts:
+            pos = bisect_left(amounts, (key[1], created_ts, payment_id))
+            if pos < len(amounts) and amounts[pos][2] == payment_id:
+                del amounts[pos]
+            if not amounts:
+                del self._by_card[key[0]]
+        return payment
+
+    def add(self, payment: Payment, created_ts: Optional[float] = None) -> None:
+        """Yangi pending to'lovni indeksga qo'shish"""
+        if payment.status != 'pending' or not payment.card_last4 or payment.amount is None:
+            return
+        with self._lock:
+            self._add_locked(payment, created_ts if created_ts is not None else time.time())
+
+    def discard(self, payment_id: str) -> Optional[Payment]:
+        """To'lovni indeksdan olib tashlash (pending holatdan chiqdi)"""
+        with self._lock:
+            return self._discard_locked(payment_id)
+
+    def discard_many(self, payment_ids: Iterable[str]) -> List[Payment]:
+        with self._lock:
+            removed = [self._discard_locked(pid) for pid in payment_ids]
+        return [p for p in removed if p is not None]
+
+    def lookup(self, card_last4: str, amount: int) -> List[Payment]:
+        """Aniq (card_last4, amount_tiyin) bo'yicha pending'lar, eng yangisi birinchi"""
+        with self._lock:
+            bucket = self._by_key.get((card_last4, amount))
+            return [p for _, p in reversed(bucket)] if bucket else []
+
+    def lookup_range(self, card_last4: str, amount: int, tolerance: int) -> List[Payment]:
+        """
+        card_last4 bo'yicha [amount - tolerance, amount + tolerance] oralig'idagi pending'lar
+
+        Returns:
+            Summasi eng yaqini birinchi; teng bo'lsa eng yangisi birinchi
+        """
+        with self._lock:
+            amounts = self._by_card.get(card_last4)
+            if not amounts:
+                return []
+            lo = bisect_left(amounts, (amount - tolerance,))
+            hi = bisect_right(amounts, (amount + tolerance, float('inf')))
+            window = sorted(amounts[lo:hi], key=lambda e: (abs(e[0] - amount), -e[1]))
+            return [self._by_id[pid][2] for _, _, pid in window]
+
+    def rebuild(self, payments: Iterable[Payment]) -> int:
+        """Indeksni DB'dagi pending to'lovlardan qayta qurish"""
+        with self._lock:
+            self._by_key.clear()
+            self._by_id.clear()
+            self._by_card.clear()
+            for payment in payments:
+                if payment.status == 'pending' and payment.card_last4 and payment.amount is not None:
+                    self._add_locked(payment, _created_ts(payment))
+            return len(self._by_id)
@@ -2,17 +2,18 @@ import telebot
 from telebot.types import Message
 from database.database import db
 from database.models import Payment
-from api.xbet_api import xbet_api
-from api.mobcash_api import melbet_api, betwiner_api, winwin_api
-from api.mostbet_api import mostbet_api
+from handlers.providers import get_provider
 from utils.validators import validate_player_id, validate_amount
 from utils.keyboards import get_main_menu_keyboard, get_cancel_keyboard, get_back_keyboard, get_admin_menu_keyboard
 import config
-from utils.helpers import (generate_payment_id, generate_random_amount, get_random_card, 
+from utils.helpers import (generate_payment_id, get_random_card, 
                           create_payment_message, create_success_message, create_channel_payment_message)
 from utils.state_manager import deposit_states, withdrawal_states, last_menu_action, clear_user_states
 from config import MIN_DEPOSIT, MAX_DEPOSIT
-import threading
+from utils.money import to_tiyin
+from utils.ttl_cache import TTLCache
+from utils.task_executor import submit
+from utils.deadline import deadline
 import time
 
 def register_deposit_handlers(bot: telebot.TeleBot):
@@ -162,7 +163,9 @@ def register_deposit_handlers(bot: telebot.TeleBot):
                 except Exception:
                     pass
 
-        threading.Thread(target=_async_check_player, args=(user_id, bukmeker, player_id, checking_msg), daemon=True).start()
+        # "Tekshirilmoqda" bosqichi uchun umumiy muddat - provayder chaqiruvlariga uzatiladi
+        with deadline(getattr(config, 'PLAYER_CHECK_DEADLINE_SECONDS', 8)):
+            submit('provider_io', _async_check_player, user_id, bukmeker, player_id, checking_msg)
     
     @bot.message_handler(func=lambda message: message.from_user.id in deposit_states and 
                         deposit_states[message.from_user.id].get('action') == 'deposit' and
@@ -220,66 +223,33 @@ def register_deposit_handlers(bot: telebot.TeleBot):
         # State ni tozalash
         clear_user_states(user_id)
 
+# (bukmeker, player_id) -> find_player natijasi; foydalanuvchilar bir xil ID ni qayta-qayta yuboradi
+player_cache = TTLCache(
+    ttl_seconds=getattr(config, 'PLAYER_CACHE_TTL_SECONDS', 300),
+    negative_ttl_seconds=getattr(config, 'PLAYER_CACHE_NEGATIVE_TTL_SECONDS', 30),
+    stale_ttl_seconds=getattr(config, 'PLAYER_CACHE_STALE_SECONDS', 3600),
+    max_entries=getattr(config, 'PLAYER_CACHE_MAX_ENTRIES', 10000),
+)
+
 def check_player(bukmeker: str, player_id: str) -> dict:
-    """Player ni tekshirish"""
+    """Player ni tekshirish (TTL kesh orqali; API xatoligida eski natija qaytariladi)"""
+    provider = get_provider(bukmeker)
+    if provider is None:
+        return {'Success': False, 'error': 'Noma\'lum bukmeker'}
+    key = (bukmeker, str(player_id).strip())
+    cached = player_cache.get(key)
+    if cached is not None:
+        return dict(cached)
     try:
-        if bukmeker == "1xBet":
-            if xbet_api:
-                result = xbet_api.find_player(player_id)
-                # API xatolik qaytarsa ham, Success True bo'lsa
-                if result.get('Success'):
-                    return result
-                else:
-                    return {'Success': False, 'error': result.get('error', 'API xatolik')}
-            else:
-                # API mavjud bo'lmasa, player mavjud deb qabul qilamiz
-                return {'Success': True, 'UserId': player_id, 'Name': 'Player'}
-                
-        elif bukmeker == "Melbet":
-            if melbet_api:
-                result = melbet_api.find_player(player_id)
-                if result.get('Success'):
-                    return result
-                else:
-                    return {'Success': False, 'error': result.get('error', 'API xatolik')}
-            else:
-                return {'Success': True, 'UserId': player_id, 'Name': 'Player'}
-                
-        elif bukmeker == "Betwiner":
-            if betwiner_api:
-                result = betwiner_api.find_player(player_id)
-                if result.get('Success'):
-                    return result
-                else:
-                    return {'Success': False, 'error': result.get('error', 'API xatolik')}
-            else:
-                return {'Success': True, 'UserId': player_id, 'Name': 'Player'}
-                
-        elif bukmeker == "WinWinBet":
-            if winwin_api:
-                result = winwin_api.find_player(player_id)
-                if result.get('Success'):
-                    return result
-                else:
-                    return {'Success': False, 'error': result.get('error', 'API xatolik')}
-            else:
-                return {'Success': True, 'UserId': player_id, 'Name': 'Player'}
-                
-        elif bukmeker == "Mostbet":
-            if mostbet_api:
-                result = mostbet_api.find_player(player_id)
-                if result.get('Success'):
-                    return result
-                else:
-                    return {'Success': False, 'error': result.get('error', 'API xatolik')}
-            else:
-                return {'Success': True, 'UserId': player_id, 'Name': 'Player'}
-        else:
-            return {'Success': False, 'error': 'Noma\'lum bukmeker'}
-            
+        result = provider.find_player(player_id)
     except Exception as e:
+        stale = player_cache.get_stale(key)
+        if stale is not None:
+            return dict(stale, stale=True)
         # API xatolik bo'lsa ham davom ettiramiz
         return {'Success': True, 'UserId': player_id, 'Name': 'Player', 'warning': 'API not available'}
+    player_cache.set(key, dict(result), negative=not result.get('Success'))
+    return result
 
 def process_deposit(bot: telebot.TeleBot, user_id: int, bukmeker: str, 
                    player_id: str, amount: float, player_info: dict, opening_msg=None):
@@ -287,10 +257,6 @@ def process_deposit(bot: telebot.TeleBot, user_id: int, bukmeker: str,
     from utils.bot_helpers import safe_send_message, safe_edit_text
     
     try:
-        # Random qo'shimcha summa
-        random_addition = generate_random_amount()
-        final_amount = amount + random_addition
-        
         # Random karta tanlash
         cards = db.get_active_cards()
         
@@ -303,20 +269,34 @@ def process_deposit(bot: telebot.TeleBot, user_id: int, bukmeker: str,
             )
             return
         
-        card = get_random_card(cards)
         payment_id = generate_payment_id()
         
-        # To'lovni bazaga saqlash
+        # Qo'shimcha summa (1..125) shu kartada band bo'lmagan qiymatlardan tanlanadi -
+        # bir xil (karta, yakuniy summa) ikki pending oynaga tushmaydi; karta to'lsa boshqasiga o'tiladi
+        allocation = db.amounts.allocate(payment_id, int(amount), [c.card_number[-4:] for c in cards])
+        if not allocation:
+            safe_send_message(
+                bot,
+                user_id,
+                "❌ Hozirda to'lovlar ko'p. Bir necha daqiqadan so'ng qayta urinib ko'ring.",
+                reply_markup=get_main_menu_keyboard()
+            )
+            return
+        card_last4, final_amount = allocation
+        card = get_random_card([c for c in cards if c.card_number[-4:] == card_last4])
+        
+        # To'lovni bazaga saqlash (summa tiyin da)
         payment = Payment(
             user_id=user_id,
             bukmeker=bukmeker,
             player_id=player_id,
-            amount=final_amount,
+            amount=to_tiyin(final_amount),
             payment_id=payment_id,
             card_last4=card.card_number[-4:]
         )
         
         if not db.add_payment(payment):
+            db.amounts.release(payment_id, hold=False)
             safe_send_message(
                 bot,
                 user_id,
@@ -375,37 +355,9 @@ def process_deposit(bot: telebot.TeleBot, user_id: int, bukmeker: str,
             )
 
 def get_balance(bukmeker: str, player_id: str = None) -> dict:
-    """Balansni olish - player_id ixtiyoriy"""
-    try:
-        if bukmeker == "1xBet":
-            if xbet_api:
-                return xbet_api.get_balance()
-            return {'Success': False, 'Balance': 0, 'Limit': 0}
-            
-        elif bukmeker == "Melbet":
-            if melbet_api:
-                return melbet_api.get_balance()
-            return {'Success': False, 'Balance': 0, 'Limit': 0}
-            
-        elif bukmeker == "Betwiner":
-            if betwiner_api:
-                return betwiner_api.get_balance()
-            return {'Success': False, 'Balance': 0, 'Limit': 0}
-            
-        elif bukmeker == "WinWinBet":
-            if winwin_api:
-                return winwin_api.get_balance()
-            return {'Success': False, 'Balance': 0, 'Limit': 0}
-            
-        elif bukmeker == "Mostbet":
-            if mostbet_api:
-                return mostbet_api.get_balance()
-            return {'Success': False, 'Balance': 0, 'Limit': 0}
-        else:
-            return {'Success': False, 'Balance': 0, 'Limit': 0}
-            
-    except Exception as e:
-        return {'Success': False, 'Balance': 0, 'Limit': 0}
+    """Kassa balansi - balance_service snapshot'idan (bloklamaydi); player_id ixtiyoriy"""
+    from handlers.balance_service import balance_service
+    return balance_service.get(bukmeker)
 
 def monitor_payment(bot: telebot.TeleBot, user_id: int, payment_id: str, 
                    bukmeker: str, player_id: str, final_amount: float, player_info: dict):
@@ -488,40 +440,11 @@ def monitor_payment(bot: telebot.TeleBot, user_id: int, payment_id: str,
 
 def execute_deposit(bukmeker: str, player_id: str, amount: float, player_info: dict) -> bool:
     """To'lovni amalga oshirish"""
+    provider = get_provider(bukmeker)
+    if provider is None:
+        return False
     try:
-        if bukmeker == "1xBet":
-            if xbet_api:
-                result = xbet_api.deposit_add(player_id, amount)
-                return result.get('Success', False)
-            return False
-            
-        elif bukmeker == "Melbet":
-            if melbet_api:
-                result = melbet_api.deposit_add(player_id, amount)
-                return result.get('Success', False)
-            return False
-            
-        elif bukmeker == "Betwiner":
-            if betwiner_api:
-                result = betwiner_api.deposit_add(player_id, amount)
-                return result.get('Success', False)
-            return False
-            
-        elif bukmeker == "WinWinBet":
-            if winwin_api:
-                result = winwin_api.deposit_add(player_id, amount)
-                return result.get('Success', False)
-            return False
-            
-        elif bukmeker == "Mostbet":
-            if mostbet_api:
-                result = mostbet_api.deposit_player(1, player_id, amount)
-                # Mostbet API Success False qaytaradi muvaffaqiyatli bo'lsa
-                return not result.get('Success', True)
-            return False
-        else:
-            return False
-            
+        return provider.deposit(player_id, amount)['Success']
     except Exception:
         return False
 
@@ -531,34 +454,11 @@ def execute_deposit_detailed(bukmeker: str, player_id: str, amount: float, playe
 
     Returns a dict with at least 'Success': bool and optional 'Error'/'Message'.
     """
+    provider = get_provider(bukmeker)
+    if provider is None:
+        return {'Success': False, 'Error': 'Noma\'lum bukmeker'}
     try:
-        if bukmeker == "1xBet":
-            if xbet_api:
-                return xbet_api.deposit_add(player_id, amount)
-            return {'Success': False, 'Error': '1xBet API mavjud emas'}
-
-        elif bukmeker == "Melbet":
-            if melbet_api:
-                return melbet_api.deposit_add(player_id, amount)
-            return {'Success': False, 'Error': 'Melbet API mavjud emas'}
-
-        elif bukmeker == "Betwiner":
-            if betwiner_api:
-                return betwiner_api.deposit_add(player_id, amount)
-            return {'Success': False, 'Error': 'Betwiner API mavjud emas'}
-
-        elif bukmeker == "WinWinBet":
-            if winwin_api:
-                return winwin_api.deposit_add(player_id, amount)
-            return {'Success': False, 'Error': 'WinWinBet API mavjud emas'}
-
-        elif bukmeker == "Mostbet":
-            if mostbet_api:
-                return mostbet_api.deposit_player(1, player_id, amount)
-            return {'Success': False, 'Error': 'Mostbet API mavjud emas'}
-        else:
-            return {'Success': False, 'Error': 'Noma\'lum bukmeker'}
-
+        return provider.deposit(player_id, amount)
     except Exception as e:
         return {'Success': False, 'Error': str(e)}
 
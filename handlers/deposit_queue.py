@@ -0,0 +1,199 @@
+"""
+Bukmekerga depozitlarning doimiy (SQLite) navbati - deposit_jobs jadvali
+
+Avval depozit claim'dan keyin fon oqimida "otib yuborilardi": claim va bukmeker chaqiruvi
+orasidagi crash/restart kreditni yo'qotardi, qayta urinish esa ikki marta kredit berishi mumkin edi.
+
+Endi:
+- Vazifa claim bilan bitta tranzaksiyada yoziladi (Database.claim_payments(enqueue_source=...)),
+  payment_id - idempotentlik kaliti (PRIMARY KEY): bitta to'lovga bitta vazifa
+- Ishchi vazifani atomik oladi (queued -> running); ikki ishchi bir vazifani ololmaydi
+- Natija:
+    Success            -> done
+    Success: False     -> queued (jitter'li eksponensial backoff), max_attempts dan keyin failed
+    so'rov yuborilmadi -> queued (circuit ochiq, rate limit yoki ulanish ochilmadi - kredit bo'lmagani aniq)
+    boshqa xato        -> uncertain (read timeout, "Connection aborted", RemoteDisconnected, reset:
+                          POST ketgan bo'lishi mumkin - avtomatik qayta urinish o'rniga admin tekshiradi)
+- Restart'da running qolgan vazifalar uncertain ga o'tkaziladi (Database.recover_deposit_jobs)
+- Vazifalar provider_io executor'ida parallel bajariladi; bitta provayderga bir vaqtda
+  ``per_provider`` tadan ko'p emas (har provayderning qolgan sig'imi bo'yicha olinadi) - osilib
+  qolgan bukmeker boshqalarini to'sib qo'ymaydi
+
+Ishlatish:
+    deposit_queue = DepositQueue(db, on_done=_on_deposit_done)
+    deposit_queue.start()
+    ...claim_payments(ids, enqueue_source='detector'); deposit_queue.wake()
+"""
+
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from requests.exceptions import ConnectTimeout, ConnectionError as RequestsConnectionError
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from database.models import DepositJob
+from handlers.providers import get_provider
+from utils.circuit_breaker import CircuitOpenError
+from utils.money import tiyin_to_som
+from utils.rate_limiter import RateLimitTimeout
+from utils.task_executor import submit
+
+DONE = 'done'
+FAILED = 'failed'
+UNCERTAIN = 'uncertain'
+QUEUED = 'queued'
+
+# (job, yakuniy holat, bukmeker javobi yoki xato matni)
+DoneCallback = Callable[[DepositJob, str, object], None]
+
+
+def request_not_sent(error: BaseException) -> bool:
+    """Xato so'rov bukmekerga yuborilmasdan oldin bo'lganmi (qayta urinish xavfsiz).
+
+    requests ConnectionError'ni POST ketgandan keyin ham beradi ("Connection aborted",
+    RemoteDisconnected, ConnectionResetError - keep-alive ulanishda tez-tez). Shuning uchun faqat
+    ulanish ochish bosqichidagi xatolar (ConnectTimeout, NewConnectionError) yuborilmagan hisoblanadi.
+    """
+    if isinstance(error, (CircuitOpenError, RateLimitTimeout, ConnectTimeout)):
+        return True
+    if isinstance(error, RequestsConnectionError):
+        reason = error.args[0] if error.args else None
+        # MaxRetryError -> asl sabab
+        reason = getattr(reason, 'reason', reason)
+        return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+    return False
+
+
+class DepositQueue:
+    """
+    Depozit navbati ishchisi
+
+    Attributes:
+        db: Database
+        on_done: yakuniy holatda (done/failed/uncertain) chaqiriladi
+        workers: bir vaqtda bajariladigan vazifalar soni
+        per_provider: bitta provayder uchun bir vaqtdagi vazifalar chegarasi
+        max_attempts: Success: False / yuborilmagan so'rov uchun urinishlar soni
+        base_delay, max_delay: backoff chegaralari (soniya)
+    """
+
+    def __init__(self, db, on_done: Optional[DoneCallback] = None, workers: int = 8, per_provider: int = 4,
+                 max_attempts: int = 5, base_delay: float = 5.0, max_delay: float = 300.0,
+                 poll_seconds: float = 5.0):
+        self.db = db
+        self.on_done = on_done
+        self.workers = workers
+        self.per_provider = per_provider
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_seconds = poll_seconds
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, int] = {}
+        self._thread: Optional[threading.Thread] = None
+        self.recovered = 0
+
+    def start(self) -> threading.Thread:
+        """running qolganlarni uncertain qilish va poller oqimini ishga tushirish"""
+        self.recovered = self.db.recover_deposit_jobs()
+        if self.recovered:
+            print(f"⚠️ Deposit jobs interrupted by restart (uncertain): {self.recovered}")
+        self._thread = threading.Thread(target=self._loop, name='deposit-queue', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def wake(self) -> None:
+        """Yangi vazifa yozilganda poller'ni darhol uyg'otish"""
+        self._wake.set()
+
+    def backoff(self, attempts: int) -> float:
+        """attempts-urinishdan keyingi kutish: eksponensial, yarmi tasodifiy (equal jitter)"""
+        delay = min(self.max_delay, self.base_delay * 2 ** max(0, attempts - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _take(self) -> List[DepositJob]:
+        # Bo'sh slotlar va har provayderning qolgan sig'imi bo'yicha vazifalarni olish
+        with self._lock:
+            free = self.workers - sum(self._inflight.values())
+            capacity = {b: max(0, self.per_provider - n) for b, n in self._inflight.items() if n}
+        if free <= 0:
+            return []
+        jobs = self.db.take_deposit_jobs(time.time(), free, capacity=capacity, per_bukmeker=self.per_provider)
+        with self._lock:
+            for job in jobs:
+                self._inflight[job.bukmeker] = self._inflight.get(job.bukmeker, 0) + 1
+        return jobs
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                for job in self._take():
+                    if submit('provider_io', self._run, job) is None:
+                        # Executor rad etdi - vazifa navbatga qaytadi
+                        self.db.finish_deposit_job(job.payment_id, QUEUED, 'executor rejected',
+                                                   time.time() + self.poll_seconds)
+                        with self._lock:
+                            self._inflight[job.bukmeker] -= 1
+                next_at = self.db.next_deposit_job_at()
+                # Vaqti kelgan, lekin olinmagan vazifa - sig'im to'la; bo'shaganda _run uyg'otadi
+                wait = None if next_at is None else next_at - time.time()
+                timeout = self.poll_seconds if wait is None or wait <= 0 else min(self.poll_seconds, wait)
+            except Exception as e:
+                print(f"Deposit queue error: {e}")
+                timeout = self.poll_seconds
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def execute(self, job: DepositJob) -> Tuple[str, object]:
+        """Bitta urinish; (holat, javob/xato) - holat: done / queued / failed / uncertain"""
+        provider = get_provider(job.bukmeker)
+        if provider is None or not provider.available:
+            return FAILED, f"{job.bukmeker} API mavjud emas"
+        try:
+            result = provider.deposit(job.player_id, tiyin_to_som(job.amount))
+        except Exception as e:
+            if request_not_sent(e):
+                # So'rov bukmekerga yetib bormagan - qayta urinish xavfsiz
+                return QUEUED, str(e)
+            return UNCERTAIN, str(e)
+        if result.get('Success'):
+            return DONE, result
+        return QUEUED, result.get('Error') or result.get('error') or result.get('Message') or 'Success: False'
+
+    def _run(self, job: DepositJob) -> str:
+        try:
+            status, detail = self.execute(job)
+            if status == QUEUED and job.attempts >= self.max_attempts:
+                status = FAILED
+            error = None if status == DONE else str(detail)[:500]
+            next_run_at = time.time() + self.backoff(job.attempts) if status == QUEUED else None
+            self.db.finish_deposit_job(job.payment_id, status, error, next_run_at)
+            job.status = status
+            if status != QUEUED and self.on_done:
+                try:
+                    self.on_done(job, status, detail)
+                except Exception as e:
+                    print(f"Deposit callback error {job.payment_id}: {e}")
+            return status
+        finally:
+            with self._lock:
+                self._inflight[job.bukmeker] -= 1
+            self._wake.set()
+
+    def run_once(self, payment_ids: Optional[List[str]] = None) -> Dict[str, str]:
+        """Vaqti kelgan vazifalarni chaqiruvchi oqimda bir marta bajarish (offline tool'lar uchun).
+
+        payment_ids berilsa faqat shu vazifalar (botning boshqa vazifalari unga qoladi).
+        """
+        outcomes = {}
+        while True:
+            jobs = self.db.take_deposit_jobs(time.time(), self.workers, payment_ids=payment_ids)
+            if not jobs:
+                return outcomes
+            for job in jobs:
+                with self._lock:
+                    self._inflight[job.bukmeker] = self._inflight.get(job.bukmeker, 0) + 1
+                outcomes[job.payment_id] = self._run(job)
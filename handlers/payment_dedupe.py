@@ -0,0 +1,153 @@
+"""
+PAYMENT xabarlari dublikatlarini tashlash - chegaralangan, vaqt oynali fingerprint kesh
+
+Bir xil bank bildirishnomasi ikki marta kelishi mumkin (forward, qayta post, handler poygasi).
+Har bir xabar uchun fingerprint'lar (message_fingerprints):
+- m:<chat_id>:<message_id> - aynan shu Telegram xabari
+- t:<chat_id>:<hash> - shu chatdagi normalizatsiya qilingan matn (qayta post)
+- o:<sender_id>:<date>:<hash> - asl xabar muallifi va vaqti
+- forward nusxasida asl xabar kalitlari (forward_from_chat/forward_from_message_id yoki
+  forward_from/forward_date) - boshqa chatdagi nusxa faqat forward metama'lumoti mos kelsa dublikat
+
+Bank qatorlarida tranzaksiya ID yo'q: boshqa chatdagi bir xil matn - boshqa mijozning haqiqiy
+to'lovi bo'lishi mumkin, shuning uchun matn fingerprint'i chat bilan bog'langan.
+
+Ulardan biri oynada bo'lsa xabar dublikat - DB/bukmeker API'ga yetib bormaydi (O(1)).
+Fingerprint'lar xabar qayta ishlangandan keyin remember() bilan yoziladi (xato bo'lsa yozilmaydi -
+qayta post ham ishlanadi).
+
+Xotirada OrderedDict (eng eskisi boshida) - max_entries dan oshsa eskilari chiqariladi.
+Yangi fingerprint'lar flush() da payment_fingerprints jadvaliga yoziladi va ishga tushishda
+load() bilan qayta yuklanadi.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+from handlers.payment_parser import normalize
+
+
+def _text_digest(text: str) -> str:
+    """Normalizatsiya qilingan matn hash'i (registr va bo'shliqlarga befarq)"""
+    canonical = ' '.join(normalize(text).lower().split())
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def text_fingerprint(text: str, chat_id: Optional[int]) -> str:
+    """Shu chatdagi matn fingerprint'i"""
+    return f"t:{chat_id}:{_text_digest(text)}"
+
+
+def message_fingerprints(message, text: str) -> List[str]:
+    """Telegram xabari fingerprint'lari (o'zi, shu chatdagi matni va asl xabar identifikatori)"""
+    digest = _text_digest(text)
+    chat_id = getattr(getattr(message, 'chat', None), 'id', None)
+    message_id = getattr(message, 'message_id', None)
+    keys = [f"t:{chat_id}:{digest}"]
+    if chat_id is not None and message_id is not None:
+        keys.append(f"m:{chat_id}:{message_id}")
+
+    forward_chat = getattr(message, 'forward_from_chat', None)
+    forward_message_id = getattr(message, 'forward_from_message_id', None)
+    if forward_chat is not None and forward_message_id is not None:
+        # Kanal postining forward'i - asl postning m: kaliti
+        keys.append(f"m:{forward_chat.id}:{forward_message_id}")
+    forward_user = getattr(message, 'forward_from', None)
+    forward_date = getattr(message, 'forward_date', None)
+    if forward_date:
+        if forward_user is not None:
+            keys.append(f"o:{forward_user.id}:{forward_date}:{digest}")
+    else:
+        sender = getattr(message, 'from_user', None)
+        date = getattr(message, 'date', None)
+        if sender is not None and date:
+            keys.append(f"o:{sender.id}:{date}:{digest}")
+    return keys
+
+
+class PaymentDedupe:
+    """
+    Thread-safe fingerprint kesh
+
+    Attributes:
+        db: Database (load/save uchun; None bo'lsa faqat xotirada)
+        ttl: fingerprint amal qilish muddati (soniya)
+        max_entries: xotiradagi maksimal fingerprint soni
+    """
+
+    def __init__(self, db=None, ttl_seconds: float = 600, max_entries: int = 20000):
+        self.db = db
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, float]" = OrderedDict()
+        self._unsaved: List[Tuple[str, float]] = []
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self) -> int:
+        """DB'dagi muddati o'tmagan fingerprint'larni xotiraga yuklash"""
+        if self.db is None:
+            return 0
+        rows = self.db.load_payment_fingerprints(time.time())
+        with self._lock:
+            for fingerprint, expires_at in rows[-self.max_entries:]:
+                self._entries[fingerprint] = expires_at
+        return len(rows)
+
+    def _evict_locked(self, now: float) -> None:
+        # Eng eskisi boshida: muddati o'tganlarni va limitdan ortiqlarni chiqarish
+        entries = self._entries
+        while entries:
+            fingerprint, expires_at = next(iter(entries.items()))
+            if expires_at > now and len(entries) <= self.max_entries:
+                break
+            entries.popitem(last=False)
+
+    def is_duplicate(self, keys: Sequence[str]) -> bool:
+        """
+        Xabar dublikatmi tekshirish (yozmaydi - qayta ishlangandan keyin remember())
+
+        Returns:
+            True - kalitlardan biri oynada bor (tashlash kerak), False - yangi xabar
+        """
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                expires_at = self._entries.get(key)
+                if expires_at is not None and expires_at > now:
+                    self.dropped += 1
+                    return True
+        return False
+
+    def remember(self, keys: Sequence[str]) -> None:
+        """Qayta ishlangan xabar fingerprint'larini yozish"""
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            for key in keys:
+                self._entries[key] = expires_at
+                self._entries.move_to_end(key)
+                self._unsaved.append((key, expires_at))
+            self._evict_locked(now)
+
+    def flush(self) -> int:
+        """Yangi fingerprint'larni DB'ga yozish (drain oqimidan chaqiriladi)"""
+        with self._lock:
+            pending, self._unsaved = self._unsaved, []
+        if not pending or self.db is None:
+            return 0
+        if not self.db.save_payment_fingerprints(pending):
+            # DB uzoq ishlamasa navbat cheksiz o'smasin: muddati o'tganlar tashlanadi,
+            # max_entries dan ortig'i - eng eskilari
+            now = time.time()
+            with self._lock:
+                retry = [item for item in pending if item[1] > now] + self._unsaved
+                self._unsaved = retry[-self.max_entries:]
+            return 0
+        return len(pending)
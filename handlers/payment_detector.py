@@ -12,9 +12,10 @@ Funksiyalar:
 """
 
 import re
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Sequence, Tuple, Union
 from datetime import datetime, timedelta
 import config
+from handlers.payment_parser import PIPE_FORMAT, parse_payment_text
 
 class PaymentDetector:
     """
@@ -22,127 +23,54 @@ class PaymentDetector:
     
     Attributes:
         db: Database manager instance
-        PAYMENT_PATTERN: Regex pattern to'lov xabarini aniqlash uchun
+        enqueue_source: berilsa claim bilan birga deposit_jobs ga vazifa yoziladi (handlers/deposit_queue.py)
+        PAYMENT_RE: PAYMENT|summa|karta formatining kompilyatsiya qilingan regexi
     """
     
-    # To'lov pattern - har qanday joyda paydo bo'lishi mumkin
-    # Summa: raqamlar (vergul yoki nuqta bilan kasrli)
-    # Karta: oxirgi 4 ta raqam
-    # Eslatma: ba'zi xabarlar pipe belgisi (|) o'rniga boshqa unicode variantlardan foydalanishi mumkin,
-    # shuning uchun parse jarayonida oldin normalizatsiya qilish va oxirgi 4 raqamni pipe'dan keyin matn ichidan izlash kerak.
-    PAYMENT_PATTERN = r'PAYMENT\|\s*(\d+(?:[.,]\d+)?)\s*\|\s*(?:.*?(\d{4}))'
-    PAYMENT_RE = re.compile(PAYMENT_PATTERN, re.IGNORECASE)
+    # To'lov pattern - har qanday joyda paydo bo'lishi mumkin (formatlar: handlers/payment_parser.py)
+    PAYMENT_RE = PIPE_FORMAT.pattern
     
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, enqueue_source: Optional[str] = None):
         """
         PaymentDetector ni initsializatsiya qilish
         
         Args:
             db_manager: Database manager instance
+            enqueue_source: deposit_jobs.source (None - vazifa yozilmaydi)
         """
         self.db = db_manager
+        self.enqueue_source = enqueue_source
     
-    def parse_payment_message(self, message_text: str) -> Optional[Dict[str, Any]]:
+    def parse_payment_message(self, message_text: str, source: Optional[int] = None) -> Optional[Dict[str, Any]]:
         """
         To'lov xabarini parse qilish va ma'lumotlarni ajratish
         
         Args:
             message_text: Telegram guruhidan kelgan xabar matni
+            source: Xabar kelgan chat ID (manbaga xos formatlar uchun, ixtiyoriy)
             
-        Format: PAYMENT|summa|karta_oxirgi_4_raqam
+        Format: PAYMENT|summa|karta_oxirgi_4_raqam (boshqa formatlar - payment_parser registry)
         Misol: 
-            - "PAYMENT|50000|8012" → {'amount': 50000.0, 'card_last4': '8012', ...}
-            - "To'lov: PAYMENT|3613.50|8012" → {'amount': 3613.5, 'card_last4': '8012', ...}
+            - "PAYMENT|50000|8012" → {'amount': 5000000, 'card_last4': '8012', ...}
+            - "To'lov: PAYMENT|3613.50|8012" → {'amount': 361350, 'card_last4': '8012', ...}
             
         Returns:
             Dict yoki None:
-            - {'amount': float, 'card_last4': str, 'raw_message': str}
+            - {'amount': int (tiyin), 'card_last4': str, 'raw_message': str}
             - None (agar format noto'g'ri bo'lsa)
         """
         try:
-            # Normalize common unicode variants and non-breaking spaces
-            raw = (message_text or '')
-            raw = raw.replace('\u00A0', ' ')
-            raw = raw.replace('\u00A6', '|')
-            raw = raw.replace('\uFF5C', '|')
-            raw = raw.replace('¦', '|')
-            raw = raw.replace('｜', '|')
-            raw = raw.replace('\u2016', '|')
-            cleaned_text = raw.strip()
-
-            # 1) Old style explicit PAYMENT|amount|last4
-            match = self.PAYMENT_RE.search(cleaned_text)
-            if match:
-                amount_str = match.group(1).replace(',', '.')
-                amount = float(amount_str)
-                card_last4 = match.group(2)
-
-                return {
-                    'amount': amount,
-                    'card_last4': card_last4,
-                    'raw_message': message_text
-                }
-
-            # Agar PAYMENT token bor, lekin parse bo'lmasa, debug uchun konsolga yozamiz
-            try:
-                if 'PAYMENT' in cleaned_text.upper() and not match:
-                    print(f"[payment_detector] PAYMENT token topildi, lekin regex parse bo'lmadi: {cleaned_text}")
-            except Exception:
-                pass
-
-            # 2) More human-friendly formats, e.g. lines like:
-            #    "Summa: 3,630 so'm" and "Karta: **** **** **** 8012"
-            #    We try to extract both amount and last4 when possible.
-            summa_re = re.compile(r"(?i)\b(?:summa|сумма)[:\s]*([\d\s\.,]+)")
-            card_re = re.compile(r"(?i)\b(?:karta|kartasi|карта|карты|card|cardno|cardnr|№)[:\s\-]*[^\d]*(\d{4})\b")
-
-            amount_match = summa_re.search(cleaned_text)
-            card_match = card_re.search(cleaned_text)
-
-            if amount_match and card_match:
-                # Normalize amount: remove spaces and thousands separators
-                raw_amount = amount_match.group(1)
-                # Keep digits and dot; remove commas and spaces used as thousand separators
-                amount_digits = re.sub(r"[\s,]", "", raw_amount)
-                amount_digits = re.sub(r"[^\d.]", "", amount_digits)
-                if not amount_digits:
-                    return None
-                amount = float(amount_digits)
-                card_last4 = card_match.group(1)
-
-                return {
-                    'amount': amount,
-                    'card_last4': card_last4,
-                    'raw_message': message_text
-                }
-
-            # 3) Fallback: try to find currency-like amount and any nearby 4-digit group
-            # This is conservative: require both an amount-like token and a 4-digit sequence
-            generic_amount_re = re.compile(r"([\d]{1,3}(?:[.,]\d{3})*(?:[.,]\d+)?)")
-            generic_card_re = re.compile(r"\b(\d{4})\b")
-
-            g_amount = generic_amount_re.search(cleaned_text)
-            g_card = generic_card_re.search(cleaned_text)
-            if g_amount and g_card:
-                raw_amount = g_amount.group(1)
-                amount_digits = re.sub(r"[\s,]", "", raw_amount)
-                amount_digits = re.sub(r"[^\d.]", "", amount_digits)
-                try:
-                    amount = float(amount_digits)
-                    card_last4 = g_card.group(1)
-                    return {
-                        'amount': amount,
-                        'card_last4': card_last4,
-                        'raw_message': message_text
-                    }
-                except Exception:
-                    return None
-
-            return None
-        except (ValueError, AttributeError):
-            return None
+            parsed = parse_payment_text(message_text, source)
         except Exception:
             return None
+        if not parsed:
+            return None
+        amount, card_last4, _ = parsed
+        return {
+            'amount': amount,
+            'card_last4': card_last4,
+            'raw_message': message_text
+        }
     
     def find_matching_payment(self, parsed_payment: Dict[str, Any], tolerance: float = None) -> Optional[Any]:
         """
@@ -150,22 +78,19 @@ class PaymentDetector:
         
         Args:
             parsed_payment: Parse qilingan to'lov ma'lumotlari
-            tolerance: Summa farqi tolerantligi (default: 0 - aniq match)
+            tolerance: Summa farqi tolerantligi, tiyin (default: config.PAYMENT_MATCH_TOLERANCE_TIYIN, 0)
             
         Returns:
             Payment object yoki None
         """
         try:
-            amount = float(parsed_payment['amount'])
+            amount = int(parsed_payment['amount'])
             card_last4 = str(parsed_payment['card_last4'])
 
-            # Aniq match - toleransiz (tezroq)
-            tol = tolerance if tolerance is not None else 0.0
-            
-            # Database'dan aniq match qidirish
-            candidates = self.db.get_pending_payments_by_card_and_amount(card_last4, amount, tol)
+            tol = self._tolerance(tolerance)
+            candidates = self._candidates(card_last4, amount, tol)
             
-            # Eng yangi paymentni qaytarish (created_at DESC)
+            # Summasi eng yaqin, keyin eng yangi payment
             if candidates:
                 return candidates[0]
             
@@ -173,12 +98,21 @@ class PaymentDetector:
             
         except Exception:
             return None
-
-            if not matches:
-                return None
-            
-        except Exception:
-            return None
+    
+    def _tolerance(self, tolerance: Optional[float] = None) -> int:
+        """Tolerance (tiyin): argument yoki config.PAYMENT_MATCH_TOLERANCE_TIYIN"""
+        if tolerance is None:
+            tolerance = getattr(config, 'PAYMENT_MATCH_TOLERANCE_TIYIN', 0)
+        return int(tolerance) if tolerance else 0
+    
+    def _candidates(self, card_last4: str, amount: int, tol: int) -> List[Any]:
+        """Xotiradagi indeksdan (aniq - hash, tolerance - bisect oralig'i); indeks yo'q bo'lsa DB'dan"""
+        index = getattr(self.db, 'pending', None)
+        if index is None:
+            return self.db.get_pending_payments_by_card_and_amount(card_last4, amount, tol)
+        if tol:
+            return index.lookup_range(card_last4, amount, tol)
+        return index.lookup(card_last4, amount)
     
     def process_payment(self, payment_data: Dict, parsed_payment: Dict) -> bool:
         """
@@ -190,10 +124,10 @@ class PaymentDetector:
             
         Process:
             1. Payment ID ni olish
-            2. DB'da statusni 'completed' ga o'zgartirish
+            2. DB'da pending -> 'completed' (atomik claim)
             
         Returns:
-            True (muvaffaqiyatli) yoki False (xato)
+            True (shu chaqiruv to'lovni yopdi) yoki False (xato yoki allaqachon yopilgan)
         """
         try:
             # payment_data Payment object yoki dict bo'lishi mumkin
@@ -202,8 +136,9 @@ class PaymentDetector:
             if not payment_id:
                 return False
             
-            self.db.update_payment_status(payment_id, 'completed')
-            return True
+            if self.enqueue_source:
+                return self.db.claim_payment(payment_id, 'completed', enqueue_source=self.enqueue_source)
+            return self.db.claim_payment(payment_id, 'completed')
             
         except (AttributeError, TypeError):
             return False
@@ -242,6 +177,76 @@ class PaymentDetector:
         
         return None
     
+    def detect_batch(self, messages: Sequence[Union[str, Tuple[str, Optional[int]]]]) -> List[Tuple[int, Dict[str, Any], Any]]:
+        """
+        Ko'p xabarni bir martada qayta ishlash (reconnect / bank bot backlog'i)
+        
+        Args:
+            messages: xabar matnlari yoki (matn, source_chat_id) juftliklari
+            
+        Pipeline:
+            1. Hammasini parse qilish
+            2. Nomzodlarni bitta indeks o'tishi yoki bitta DB so'rovi bilan olish
+            3. Bir xil (karta, summa) kalitli xabarlarga turli to'lovlarni biriktirish
+            4. Barchasini bitta tranzaksiyada atomik claim qilish
+            
+        Returns:
+            [(xabar indeksi, parsed, Payment), ...] - faqat shu chaqiruv yopgan to'lovlar
+        """
+        parsed_list = []
+        for i, item in enumerate(messages):
+            text, source = item if isinstance(item, tuple) else (item, None)
+            parsed = self.parse_payment_message(text, source)
+            if parsed:
+                parsed_list.append((i, parsed))
+        return self.match_batch(parsed_list)
+    
+    def match_batch(self, parsed_list: Sequence[Tuple[int, Dict[str, Any]]]) -> List[Tuple[int, Dict[str, Any], Any]]:
+        """
+        detect_batch ning 2-4 bosqichlari - allaqachon parse qilingan xabarlar uchun
+        
+        Args:
+            parsed_list: [(xabar indeksi, parse_payment_message natijasi), ...]
+        """
+        if not parsed_list:
+            return []
+        
+        keys = {(p['card_last4'], p['amount']) for _, p in parsed_list}
+        tol = self._tolerance()
+        if tol or getattr(self.db, 'pending', None) is not None:
+            candidates = {k: self._candidates(k[0], k[1], tol) for k in keys}
+        else:
+            candidates = self.db.get_pending_payments_for_keys(keys)
+        
+        # Har bir kalit uchun nomzodlar eng yangisidan boshlab navbat bilan beriladi
+        assigned = []
+        used = set()
+        cursors: Dict[Tuple[str, int], int] = {}
+        for i, parsed in parsed_list:
+            key = (parsed['card_last4'], parsed['amount'])
+            pool = candidates.get(key) or []
+            pos = cursors.get(key, 0)
+            while pos < len(pool) and pool[pos].payment_id in used:
+                pos += 1
+            if pos >= len(pool):
+                continue
+            payment = pool[pos]
+            cursors[key] = pos + 1
+            used.add(payment.payment_id)
+            assigned.append((i, parsed, payment))
+        if not assigned:
+            return []
+        
+        try:
+            ids = [p.payment_id for _, _, p in assigned]
+            if self.enqueue_source:
+                claimed = self.db.claim_payments(ids, 'completed', enqueue_source=self.enqueue_source)
+            else:
+                claimed = self.db.claim_payments(ids, 'completed')
+        except Exception:
+            return []
+        return [entry for entry in assigned if entry[2].payment_id in claimed]
+    
     def validate_card_number(self, card_number: str) -> bool:
         """
         Karta raqamini validatsiya qilish
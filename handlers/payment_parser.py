@@ -0,0 +1,148 @@
+"""
+To'lov xabarlari parseri - jadvalga asoslangan, oldindan kompilyatsiya qilingan
+
+Xabar formatlari deklarativ ro'yxatda (registry) saqlanadi. Har bir format:
+- keywords: arzon prefiltr - kichik harfli matnda shulardan biri bo'lmasa regex ishga tushmaydi
+- pattern: modul darajasida bir marta kompilyatsiya qilingan regex
+- amount_group / card_group: summa va karta oxirgi 4 raqami guruhlari
+
+Manba (source) - xabar kelgan chat ID. Manbaga xos formatlar avval, keyin umumiy
+(source=None) formatlar sinab ko'riladi.
+
+Xavfsizlik:
+- Matn MAX_MESSAGE_LENGTH bilan kesiladi (Telegram limiti)
+- Bo'shliq/oraliq qismlar chegaralangan ({0,N}) - katastrofik backtracking yo'q
+"""
+
+import re
+from typing import Dict, List, NamedTuple, Optional, Pattern, Tuple
+
+from utils.money import parse_som
+
+# Telegram xabar matni limiti; undan uzun matn parse qilinmaydi (kesiladi)
+MAX_MESSAGE_LENGTH = 4096
+
+# Unicode pipe variantlari -> '|', NBSP -> probel. str.translate dict jadval bilan qisqa
+# xabarda ham ~2 mks; faqat matnda bor belgilar uchun str.replace bir necha barobar arzon
+_NORMALIZE_PAIRS = (
+    ('\u00A0', ' '),   # NBSP
+    ('\u202F', ' '),   # narrow NBSP
+    ('\u00A6', '|'),   # broken bar
+    ('\uFF5C', '|'),   # fullwidth vertical line
+    ('\u2016', '|'),   # double vertical line
+    ('\u2223', '|'),   # divides
+)
+
+
+class PaymentFormat(NamedTuple):
+    """Bitta xabar formati ta'rifi"""
+    name: str
+    keywords: Tuple[str, ...]
+    pattern: Pattern
+    amount_group: int = 1
+    card_group: int = 2
+
+
+# 1) PAYMENT|summa|...karta_oxirgi_4  (pipe'dan keyin bo'shliq/yangi qator, so'ng 64 belgigacha
+#    matn ichidan 4 raqam; eski cheksiz .*? uzun satrlarda har bir PAYMENT| uchun dumni oxirigacha ko'rardi)
+PIPE_FORMAT = PaymentFormat(
+    name='pipe',
+    keywords=('payment|',),
+    pattern=re.compile(r'PAYMENT\|\s*(\d+(?:[.,]\d+)?)\s*\|\s{0,16}[^\n]{0,64}?(\d{4})', re.IGNORECASE),
+)
+
+# 2) "Summa: 3,630 so'm" ... "Karta: **** **** **** 8012" (tartib ixtiyoriy;
+#    \A + lookahead - har biri matnni bir marta ko'radi)
+LABELED_FORMAT = PaymentFormat(
+    name='labeled',
+    keywords=('summa', 'сумма'),
+    pattern=re.compile(
+        r'(?is)\A(?=.*?\b(?:summa|сумма)[:\s]{0,8}(\d[\d \.,]{0,24}))'
+        r'(?=.*?\b(?:karta|kartasi|карта|карты|card|cardno|cardnr|№)[:\s\-]{0,8}[^\d]{0,32}(\d{4})\b)'
+    ),
+)
+
+# 3) Zaxira: summa ko'rinishidagi token va alohida 4 xonali guruh
+GENERIC_FORMAT = PaymentFormat(
+    name='generic',
+    keywords=(),
+    pattern=re.compile(r'(?s)\A(?=.*?(\d{1,3}(?:[.,]\d{3})*(?:[.,]\d+)?))(?=.*?\b(\d{4})\b)'),
+)
+
+# source (chat_id) -> formatlar; None - barcha manbalar uchun umumiy
+_REGISTRY: Dict[Optional[int], List[PaymentFormat]] = {
+    None: [PIPE_FORMAT, LABELED_FORMAT, GENERIC_FORMAT],
+}
+
+# format nomi -> muvaffaqiyatli parse soni (debug print o'rniga)
+FORMAT_HITS: Dict[str, int] = {}
+
+
+def register_format(fmt: PaymentFormat, source: Optional[int] = None, first: bool = False) -> None:
+    """
+    Yangi formatni ro'yxatga olish
+
+    Args:
+        fmt: PaymentFormat
+        source: chat ID (None - barcha manbalar)
+        first: True bo'lsa ro'yxat boshiga qo'shiladi
+    """
+    formats = _REGISTRY.setdefault(source, [])
+    if first:
+        formats.insert(0, fmt)
+    else:
+        formats.append(fmt)
+
+
+def formats_for(source: Optional[int] = None) -> List[PaymentFormat]:
+    """Manba uchun sinab ko'riladigan formatlar (manbaga xoslari birinchi)"""
+    if source is None or source not in _REGISTRY:
+        return _REGISTRY.get(None, [])
+    return _REGISTRY[source] + _REGISTRY.get(None, [])
+
+
+def normalize(text: str) -> str:
+    """Unicode pipe/NBSP normalizatsiyasi va uzunlik chegarasi"""
+    text = (text or '')[:MAX_MESSAGE_LENGTH]
+    # ASCII matnda almashtiriladigan belgi yo'q - translate o'tkazib yuboriladi
+    if not text.isascii():
+        for old, new in _NORMALIZE_PAIRS:
+            if old in text:
+                text = text.replace(old, new)
+    return text.strip()
+
+
+def parse_payment_text(text: str, source: Optional[int] = None) -> Optional[Tuple[int, str, str]]:
+    """
+    Xabardan summa va karta oxirgi 4 raqamini ajratish
+
+    Args:
+        text: xabar matni
+        source: xabar kelgan chat ID (manbaga xos formatlar uchun)
+
+    Returns:
+        (amount_tiyin, card_last4, format_name) yoki None
+    """
+    cleaned = normalize(text)
+    if not cleaned:
+        return None
+    lowered = cleaned.lower()
+
+    for fmt in formats_for(source):
+        if fmt.keywords:
+            for keyword in fmt.keywords:
+                if keyword in lowered:
+                    break
+            else:
+                continue
+        match = fmt.pattern.search(cleaned)
+        if not match:
+            continue
+        # Birinchi mos kelgan format hal qiladi (eski xatti-harakat: summa noto'g'ri bo'lsa None)
+        amount = parse_som(match.group(fmt.amount_group).strip(' .,'))
+        if amount is None:
+            return None
+        FORMAT_HITS[fmt.name] = FORMAT_HITS.get(fmt.name, 0) + 1
+        return amount, match.group(fmt.card_group), fmt.name
+
+    return None
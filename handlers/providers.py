@@ -0,0 +1,160 @@
+"""
+Bukmeker provayderlari registri - bitta interfeys (find_player, deposit, payout, balance)
+
+deposit.py / withdrawal.py / admin.py dagi ``if bukmeker == "1xBet" ... elif "Mostbet"``
+zanjirlari o'rniga: ``get_provider(bukmeker)`` - O(1) lug'at qidiruvi.
+
+Natijalar normallashtirilgan:
+- deposit(): har doim dict, 'Success' - haqiqiy bool (Mostbet'ning teskari Success bayrog'i
+  shu yerda to'g'rilanadi, xom qiymat 'RawSuccess' da qoladi)
+- find_player(): topilmasa {'Success': False, 'error': ...}
+- balance(): API yo'q bo'lsa {'Success': False, 'Balance': 0, 'Limit': 0}
+
+Har bir API chaqiruvi provayder circuit breaker'i orqali o'tadi (utils.circuit_breaker):
+API osilib qolsa breaker ochiladi va chaqiruvlar darhol ``CircuitOpenError`` bilan qaytadi;
+balance() bunday holatda {'Success': False, 'Error': ...} qaytaradi.
+
+Joriy deadline (utils.deadline) bo'lsa chaqiruvdan oldin tekshiriladi; idempotent o'qishlar
+(find_player, balance) hedging bilan (p95 dan sekin bo'lsa ikkinchi urinish).
+
+Har HTTP urinish (provayder, operatsiya) kvotasidan token oladi (utils.rate_limiter): kvota
+to'lsa chaqiruv deadline ichida navbatda kutadi, sig'masa ``RateLimitTimeout`` (so'rov yuborilmagan).
+
+O'qishlar (find_player, balance) singleflight orqali: bir xil parallel so'rovlar (bitta o'yinchi ID,
+bitta kassa balansi) bitta API chaqiruvini bo'lishadi (utils.singleflight).
+
+Yangi bukmeker qo'shish - faqat shu fayldagi PROVIDERS ro'yxatiga bitta qator.
+"""
+
+from typing import Dict, Optional
+
+from api.xbet_api import xbet_api
+from api.mobcash_api import melbet_api, betwiner_api, winwin_api
+from api.mostbet_api import mostbet_api
+from utils.circuit_breaker import CircuitOpenError, get_breaker
+from utils.deadline import check_deadline, hedged_call
+from utils.http_pool import attach_session
+from utils.rate_limiter import RateLimitTimeout, acquire
+from utils.singleflight import get_group
+
+
+class Provider:
+    """
+    Bitta bukmeker adapteri (API klienti ustidan)
+
+    Attributes:
+        name: bukmeker nomi (DB va menyudagi kabi)
+        api: API klienti yoki None (sozlanmagan)
+        manual_payout: pul yechish API orqali emas, admin tomonidan qo'lda tasdiqlanadi
+        admin_balance: admin "Kasa balansi" ekranida ko'rsatiladi
+        breaker: provayder circuit breaker'i
+        flight: bir xil parallel o'qishlarni birlashtiruvchi singleflight guruhi
+    """
+
+    payout_method = 'withdraw_subtract'
+    manual_payout = False
+    admin_balance = True
+
+    def __init__(self, name: str, api):
+        self.name = name
+        self.api = api
+        # Klient Session ishlatsa - provayder uchun umumiy keep-alive pool
+        attach_session(api, name)
+        self.breaker = get_breaker(name)
+        self.flight = get_group(name)
+
+    @property
+    def available(self) -> bool:
+        return self.api is not None
+
+    def _call(self, op: str, fn, *args):
+        # Avval kvota (navbatda kutish breaker'ning slow-call vaqtiga kirmaydi), keyin breaker
+        acquire(self.name, op)
+        return self.breaker.call(fn, *args)
+
+    def find_player(self, player_id: str) -> dict:
+        """O'yinchini tekshirish (API yo'q bo'lsa mavjud deb qabul qilinadi)"""
+        if not self.api:
+            return {'Success': True, 'UserId': player_id, 'Name': 'Player'}
+        result = self.flight.do(('find_player', str(player_id)), hedged_call, self.name, 'find_player',
+                                self._call, 'find_player', self.api.find_player, player_id)
+        if result.get('Success'):
+            # Natija kutuvchilar bilan bo'lishilgan - har chaqiruvchiga o'z nusxasi
+            return dict(result)
+        return {'Success': False, 'error': result.get('error', 'API xatolik')}
+
+    def _deposit_raw(self, player_id: str, amount: float) -> dict:
+        return self.api.deposit_add(player_id, amount)
+
+    def _deposit_ok(self, result: dict) -> bool:
+        return bool(result.get('Success', False))
+
+    def deposit(self, player_id: str, amount: float) -> dict:
+        """Depozit (so'm); natijada 'Success' - haqiqiy muvaffaqiyat"""
+        if not self.api:
+            return {'Success': False, 'Error': f'{self.name} API mavjud emas'}
+        check_deadline(f"{self.name}.deposit")
+        result = self._call('deposit', self._deposit_raw, player_id, amount)
+        if not isinstance(result, dict):
+            return {'Success': False, 'Error': f"Noto'g'ri javob: {result!r}"}
+        return dict(result, Success=self._deposit_ok(result), RawSuccess=result.get('Success'))
+
+    def payout(self, player_id: str, code: str) -> Optional[dict]:
+        """Pul yechish kodini bajarish; API yo'q bo'lsa None"""
+        if not self.api:
+            return None
+        check_deadline(f"{self.name}.payout")
+        return self._call('payout', getattr(self.api, self.payout_method), player_id, code)
+
+    def balance(self) -> dict:
+        """Kassa balansi"""
+        if not self.api:
+            return {'Success': False, 'Balance': 0, 'Limit': 0}
+        try:
+            return dict(self.flight.do(('balance',), hedged_call, self.name, 'balance',
+                                       self._call, 'balance', self.api.get_balance))
+        except (CircuitOpenError, RateLimitTimeout) as e:
+            return {'Success': False, 'Balance': 0, 'Limit': 0, 'Error': str(e)}
+
+
+class XbetProvider(Provider):
+    payout_method = 'deposit_payout'
+
+
+class MostbetProvider(Provider):
+    # Pul yechish admin tomonidan qo'lda tasdiqlanadi; balans admin ekranida yo'q
+    manual_payout = True
+    admin_balance = False
+
+    def _deposit_raw(self, player_id: str, amount: float) -> dict:
+        return self.api.deposit_player(1, player_id, amount)
+
+    def _deposit_ok(self, result: dict) -> bool:
+        # Mostbet API muvaffaqiyatli bo'lsa Success False qaytaradi
+        return not result.get('Success', True)
+
+    def payout(self, player_id: str, code: str) -> Optional[dict]:
+        if not self.api:
+            return None
+        return {'Success': True, 'Amount': 0}
+
+
+PROVIDERS: Dict[str, Provider] = {
+    p.name: p for p in (
+        XbetProvider('1xBet', xbet_api),
+        Provider('Melbet', melbet_api),
+        Provider('Betwiner', betwiner_api),
+        Provider('WinWinBet', winwin_api),
+        MostbetProvider('Mostbet', mostbet_api),
+    )
+}
+
+
+def get_provider(bukmeker: str) -> Optional[Provider]:
+    """Bukmeker nomi bo'yicha provayder (noma'lum bo'lsa None)"""
+    return PROVIDERS.get(bukmeker)
+
+
+def admin_balance_providers() -> Dict[str, Provider]:
+    """Admin balans ekranida ko'rsatiladigan provayderlar"""
+    return {name: p for name, p in PROVIDERS.items() if p.admin_balance}
@@ -5,45 +5,89 @@ from database.models import Withdrawal
 from utils.validators import validate_player_id, validate_card_number, validate_code
 from utils.keyboards import get_main_menu_keyboard, get_back_keyboard, get_admin_menu_keyboard
 import config
-from utils.helpers import create_withdrawal_user_message, create_withdrawal_admin_message, log_withdrawal, format_amount, format_datetime
+from utils.helpers import create_withdrawal_user_message, create_withdrawal_admin_message, log_withdrawal, format_datetime
+from utils.money import to_tiyin, tiyin_to_som
 from utils.state_manager import withdrawal_states, deposit_states, last_menu_action, clear_user_states
-from config import ADMIN_ID, NOTIFICATION_CHANNEL_ID
+from config import ADMIN_ID
 
 # reuse deposit player check
 from handlers.deposit import check_player
 
 # API clients
-from api.mobcash_api import melbet_api, betwiner_api, winwin_api
-from api.xbet_api import xbet_api
-from api.mostbet_api import mostbet_api  # Add Mostbet API import
+from handlers.providers import get_provider
+from utils.circuit_breaker import CircuitOpenError
+from utils.rate_limiter import RateLimitTimeout
 
-import threading
+from utils.task_executor import submit
+from utils.deadline import deadline
+from utils.ttl_cache import TTLCache
+from handlers.withdrawal_queue import notify_withdrawals_completed, register_withdrawal_queue_handlers
 
 
 def _normalize_amount(value):
-    """Qiymatni musbat float ga aylantiradi yoki None qaytaradi.
+    """API qaytargan so'm qiymatini musbat tiyin (int) ga aylantiradi yoki None qaytaradi.
     Qo'llab-quvvatlaydi: int, float, str (bo'sh joy/vergul bilan).
     Manfiy qiymatlar absolyut qiymatga aylantiriladi (withdrawal uchun).
     """
     try:
-        if value is None:
+        tiyin = to_tiyin(value)
+        if not tiyin:
             return None
-        if isinstance(value, (int, float)):
-            v = float(value)
-            # Manfiy bo'lsa absolyut qiymat, musbat bo'lsa o'zi
-            return abs(v) if v != 0 else None
-        if isinstance(value, str):
-            s = value.strip().replace(' ', '').replace(',', '')
-            if s == '':
-                return None
-            v = float(s)
-            return abs(v) if v != 0 else None
+        # Manfiy bo'lsa absolyut qiymat, musbat bo'lsa o'zi
+        return abs(tiyin)
     except Exception:
         return None
-    return None
+
+
+# (bukmeker, player_id, kod) -> payout natijasi. Tarmoq uzilishidan keyin foydalanuvchi xuddi shu
+# kodni qayta yuboradi - bukmekerga ikkinchi so'rov (ikki marta yechish xavfi) o'rniga keshdagi
+# natija. Withdrawal qatori yaratilgach yozuv o'chiriladi.
+payout_cache = TTLCache(
+    ttl_seconds=getattr(config, 'PAYOUT_CACHE_TTL_SECONDS', 600),
+    negative_ttl_seconds=getattr(config, 'PAYOUT_CACHE_NEGATIVE_TTL_SECONDS', 15),
+    stale_ttl_seconds=0,
+    max_entries=getattr(config, 'PAYOUT_CACHE_MAX_ENTRIES', 5000),
+)
+
+
+def _payout_key(bukmeker: str, player_id: str, code: str) -> tuple:
+    return (bukmeker, str(player_id).strip(), str(code).strip())
+
+
+def check_payout(bukmeker: str, player_id: str, code: str):
+    """Payout kodini bajarish (kesh + singleflight orqali); provayder/API yo'q bo'lsa None.
+
+    Bir vaqtda kelgan bir xil so'rovlar bitta API chaqiruvini bo'lishadi; xato (istisno)
+    keshlanmaydi - keyingi urinish API'ga boradi.
+    """
+    provider = get_provider(bukmeker)
+    if provider is None:
+        return None
+    key = _payout_key(bukmeker, player_id, code)
+    cached = payout_cache.get(key)
+    if cached is not None:
+        return dict(cached)
+
+    def _execute():
+        # Parallel so'rov shu orada natijani yozgan bo'lishi mumkin
+        cached = payout_cache.get(key)
+        if cached is not None:
+            return cached
+        result = provider.payout(player_id, code)
+        if isinstance(result, dict):
+            payout_cache.set(key, dict(result), negative=not result.get('Success'))
+        return result
+
+    result = provider.flight.do(('payout',) + key[1:], _execute)
+    return dict(result) if isinstance(result, dict) else result
+
+
 def register_withdrawal_handlers(bot: telebot.TeleBot):
 	"""Register withdrawal flow handlers and admin callbacks."""
 
+	# Admin yechish navbati (📋 Yechish arizalari) - admin state handlerlaridan oldin
+	register_withdrawal_queue_handlers(bot)
+
 	# Bukmeker tanlash - faqat withdrawal context da
 	@bot.message_handler(func=lambda message: (message.text in ["🎯 1xBet", "🎲 Melbet", "🎰 Mostbet", "🎪 Betwiner", "🎨 WinWinBet"]) and (last_menu_action.get(message.from_user.id) == 'withdrawal'))
 	def select_bukmeker_withdrawal(message: Message):
@@ -114,52 +158,26 @@ def register_withdrawal_handlers(bot: telebot.TeleBot):
 				return
 
 			_id = int(call.data.split('_')[-1])
-			w = db.get_withdrawal_by_id(_id)
-			if not w:
-				bot.answer_callback_query(call.id, "Ariza topilmadi", show_alert=True)
+			# Statusni completed ga o'zgartirish (faqat pending bo'lsa - qayta bosish xabar takrorlamaydi)
+			done = db.complete_withdrawals([_id])
+			if not done:
+				w = db.get_withdrawal_by_id(_id)
+				bot.answer_callback_query(call.id, "Allaqachon tasdiqlangan" if w else "Ariza topilmadi", show_alert=True)
+				try:
+					bot.delete_message(call.message.chat.id, call.message.message_id)
+				except Exception:
+					pass
 				return
 
-			# Statusni completed ga o'zgartirish
-			db.update_withdrawal_status(_id, 'completed')
-			
-			# Foydalanuvchiga xabar (summa format_amount bilan, qo'shimcha " so'm" YO'Q)
-			try:
-				amount_text = format_amount(w.amount) if (w.amount is not None and w.amount > 0) else "—"
-				bot.send_message(
-					w.user_id, 
-					f"✅ Pul kartangizga o'tkazildi!\n\n"
-					f"💰 Summa: {amount_text}\n"
-					f"🆔 {w.bukmeker} ID: {w.player_id}\n\n"
-					f"Rahmat! 🎉"
-				)
-			except Exception:
-				pass
-			
+			# Foydalanuvchi va kanalga xabar - notifier navbati orqali
+			notify_withdrawals_completed(bot, done)
+
 			# Admindan xabarni o'chirish
 			try:
 				bot.delete_message(call.message.chat.id, call.message.message_id)
 			except Exception:
 				pass
-			
-			# Kanal/notification ga yuborish
-			if NOTIFICATION_CHANNEL_ID:
-				try:
-					user = db.get_user(w.user_id)
-					username = getattr(user, 'username', 'username_yoq') if user else 'username_yoq'
-					
-					amount_text = format_amount(w.amount) if (w.amount is not None and w.amount > 0) else "—"
-					notification_msg = (
-						f"✅ <b>Pul o'tkazildi</b>\n\n"
-						f"<b>#{w.bukmeker}#</b>\n"
-						f"👤 @{username}\n"
-						f"💰 <b>Summa:</b> {amount_text}\n"
-						f"🆔 <b>ID:</b> {w.player_id}\n"
-						f"📆 {format_datetime()}"
-					)
-					bot.send_message(NOTIFICATION_CHANNEL_ID, notification_msg, parse_mode='HTML')
-				except Exception:
-					pass
-			
+
 			# Callback javob
 			try:
 				bot.answer_callback_query(call.id, "✅ Tasdiqlandi!", show_alert=False)
@@ -276,12 +294,9 @@ def handle_withdrawal_player_id(bot: telebot.TeleBot, message: Message):
 			except Exception:
 				pass
 
-	# Background thread
-	threading.Thread(
-		target=_async_check_player,
-		args=(user_id, bukmeker, player_id, checking_msg),
-		daemon=True
-	).start()
+	# Fon vazifasi (provider_io executor)
+	with deadline(getattr(config, 'PLAYER_CHECK_DEADLINE_SECONDS', 8)):
+		submit('provider_io', _async_check_player, user_id, bukmeker, player_id, checking_msg)
 
 
 def handle_withdrawal_code(bot: telebot.TeleBot, message: Message):
@@ -308,18 +323,13 @@ def handle_withdrawal_code(bot: telebot.TeleBot, message: Message):
 	def _async_check_payout(u_id: int, bkm: str, p_id: str, payout_code: str, check_msg):
 		try:
 			result = None
+			unavailable = False
 			try:
-				if bkm == "1xBet" and xbet_api:
-					result = xbet_api.deposit_payout(p_id, payout_code)
-				elif bkm == "Melbet" and melbet_api:
-					result = melbet_api.withdraw_subtract(p_id, payout_code)
-				elif bkm == "Betwiner" and betwiner_api:
-					result = betwiner_api.withdraw_subtract(p_id, payout_code)
-				elif bkm == "WinWinBet" and winwin_api:
-					result = winwin_api.withdraw_subtract(p_id, payout_code)
-				elif bkm == "Mostbet" and mostbet_api:
-					# Mostbet uchun manual approval
-					result = {'Success': True, 'Amount': 0}
+				# Mostbet uchun manual approval - provayder {'Success': True, 'Amount': 0} qaytaradi
+				result = check_payout(bkm, p_id, payout_code)
+			except (CircuitOpenError, RateLimitTimeout):
+				# Bukmeker API ishlamayapti yoki kvota to'lgan - "ariza ochilmagan" deyish noto'g'ri bo'ladi
+				unavailable = True
 			except Exception:
 				result = None
 
@@ -330,6 +340,19 @@ def handle_withdrawal_code(bot: telebot.TeleBot, message: Message):
 			except Exception:
 				pass
 
+			if unavailable:
+				try:
+					bot.send_message(
+						u_id,
+						f"⚠️ {bkm} serveri vaqtincha javob bermayapti.\n"
+						f"Kod hali ishlatilmadi - birozdan so'ng qayta urinib ko'ring.\n"
+						f"Bosh sahifaga qaytish - /start",
+						reply_markup=get_main_menu_keyboard()
+					)
+				finally:
+					clear_user_states(u_id)
+				return
+
 			# Agar payout topilmasa
 			if not result or not result.get('Success'):
 				try:
@@ -385,12 +408,8 @@ def handle_withdrawal_code(bot: telebot.TeleBot, message: Message):
 			except Exception:
 				pass
 
-	# Background thread
-	threading.Thread(
-		target=_async_check_payout,
-		args=(user_id, bukmeker, player_id, code, checking_msg),
-		daemon=True
-	).start()
+	# Fon vazifasi (provider_io executor)
+	submit('provider_io', _async_check_payout, user_id, bukmeker, player_id, code, checking_msg)
 
 
 def handle_withdrawal_card(bot: telebot.TeleBot, message: Message):
@@ -406,7 +425,7 @@ def handle_withdrawal_card(bot: telebot.TeleBot, message: Message):
 	bukmeker = state['bukmeker']
 	player_id = state['player_id']
 	code = state['code']
-	amount = state.get('amount')
+	amount = state.get('amount')  # tiyin (_normalize_amount)
 
 	# Agar amount yo'q bo'lsa (Mostbet yoki API qaytarmagan), None saqlaymiz
 	if not amount or amount <= 0:
@@ -414,7 +433,7 @@ def handle_withdrawal_card(bot: telebot.TeleBot, message: Message):
 
 	# Withdrawal ni bazaga saqlash (None bo'lsa NULL yoziladi, placeholder ishlatilmaydi)
 	try:
-		amount_for_store = _normalize_amount(amount)
+		amount_for_store = amount
 		withdrawal = Withdrawal(
 			user_id=user_id,
 			bukmeker=bukmeker,
@@ -442,6 +461,9 @@ def handle_withdrawal_card(bot: telebot.TeleBot, message: Message):
 		clear_user_states(user_id)
 		return
 
+	# Ariza yaratildi - kod endi DB qatorida; keshdagi payout natijasi kerak emas
+	payout_cache.invalidate(_payout_key(bukmeker, player_id, code))
+
 	# Log attempt
 	try:
 		log_withdrawal({
@@ -460,11 +482,16 @@ def handle_withdrawal_card(bot: telebot.TeleBot, message: Message):
 	user_message = create_withdrawal_user_message(bukmeker, player_id, card_number, code)
 	bot.send_message(user_id, user_message, reply_markup=get_main_menu_keyboard())
 
-	# Adminga ma'lumot yuborish (tasdiqlash tugmasi bilan)
+	# Adminga ma'lumot yuborish (tasdiqlash tugmasi bilan). WITHDRAWAL_ADMIN_DM = False bo'lsa
+	# arizalar faqat "📋 Yechish arizalari" navbatida ko'rinadi
+	if not getattr(config, 'WITHDRAWAL_ADMIN_DM', True):
+		clear_user_states(user_id)
+		return
+
 	user = db.get_user(user_id)
 	username = getattr(user, 'username', 'username_yoq') if user else 'username_yoq'
 	
-	admin_amount = _normalize_amount(amount)
+	admin_amount = tiyin_to_som(amount)
 	admin_message = create_withdrawal_admin_message(
 		username, bukmeker, player_id, card_number, code, admin_amount
 	)
@@ -0,0 +1,218 @@
+"""Admin uchun pending yechish arizalari navbati (sahifalangan, ko'p tanlab tasdiqlash).
+
+Avval har ariza adminga alohida DM ("✅ Pul o'tkazildi" tugmasi bilan) sifatida kelardi va har
+bosish: DB o'qish, status yangilash, foydalanuvchi xabari, DM o'chirish, kanal xabari. Ko'p
+arizada admin chati to'lib ketardi va yuzlab API chaqiruvlari ketma-ket bajarilardi. Endi:
+
+ - "📋 Yechish arizalari" - bitta xabar ichida inline navbat (``WITHDRAWAL_QUEUE_PAGE_SIZE`` tadan)
+ - Arizalarni sahifalar bo'ylab belgilash (☑️), butun sahifani tanlash/tozalash
+ - Tasdiqlash - statuslar bitta tranzaksiyada (db.complete_withdrawals); faqat haqiqatan yopilgan
+   arizalar bo'yicha bildirishnoma (ikki marta bosish - ikki marta xabar emas)
+ - Bildirishnomalar utils.notifier orqali (tezlik chegarasi bilan, fonda); kanalga har ariza
+   uchun emas, ``CHANNEL_BATCH_SIZE`` talik jamlangan xabar
+
+Callback data: ``wq:<amal>:<argumentlar>`` (t - belgilash, p - sahifa, a - sahifani tanlash,
+c - tozalash, ok - tasdiqlash).
+"""
+
+import threading
+from collections import OrderedDict
+from typing import List, Set, Tuple
+
+import telebot
+from telebot.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message
+
+import config
+from config import ADMIN_ID, NOTIFICATION_CHANNEL_ID
+from database.database import db
+from database.models import Withdrawal
+from utils.bot_helpers import safe_edit_text, safe_send_message
+from utils.helpers import format_amount, format_card_number, format_datetime
+from utils.money import tiyin_to_som
+from utils.notifier import notifier
+
+QUEUE_BUTTON = "📋 Yechish arizalari"
+PAGE_SIZE = getattr(config, 'WITHDRAWAL_QUEUE_PAGE_SIZE', 8)
+# Bitta kanal xabaridagi arizalar soni (bulk tasdiqlashda)
+CHANNEL_BATCH_SIZE = 20
+# Eslab qolinadigan navbat xabarlari (admin eski xabarni ham bosishi mumkin)
+MAX_VIEWS = 50
+
+# navbat xabari message_id -> {'page': int, 'selected': set(withdrawal_id)}
+_views: "OrderedDict[int, dict]" = OrderedDict()
+_views_lock = threading.Lock()
+
+
+def _view(message_id: int) -> dict:
+    """Xabar holati (_views_lock ostida chaqiriladi)"""
+    view = _views.get(message_id)
+    if view is None:
+        view = _views[message_id] = {'page': 0, 'selected': set()}
+        while len(_views) > MAX_VIEWS:
+            _views.popitem(last=False)
+    else:
+        _views.move_to_end(message_id)
+    return view
+
+
+def _amount_text(w: Withdrawal) -> str:
+    return format_amount(tiyin_to_som(w.amount)) if (w.amount is not None and w.amount > 0) else "—"
+
+
+def render_queue(page: int, selected: Set[int]) -> Tuple[str, InlineKeyboardMarkup, int]:
+    """Navbat sahifasi: (HTML matn, klaviatura, haqiqiy sahifa raqami)"""
+    items, total = db.get_pending_withdrawals_page(page * PAGE_SIZE, PAGE_SIZE)
+    pages = max(1, -(-total // PAGE_SIZE))
+    if page >= pages:
+        # Tasdiqlashdan keyin oxirgi sahifa bo'shab qolgan bo'lishi mumkin
+        page = pages - 1
+        items, total = db.get_pending_withdrawals_page(page * PAGE_SIZE, PAGE_SIZE)
+
+    markup = InlineKeyboardMarkup()
+    if not items:
+        markup.row(InlineKeyboardButton("🔄 Yangilash", callback_data="wq:p:0"))
+        return "📭 Pending yechish arizalari yo'q", markup, 0
+
+    usernames = db.get_usernames(w.user_id for w in items)
+    blocks = []
+    for w in items:
+        mark = "☑️" if w.id in selected else "▫️"
+        blocks.append(
+            f"{mark} <b>#{w.id}</b> {w.bukmeker} · @{usernames.get(w.user_id) or 'username_yoq'}\n"
+            f"💳 <code>{format_card_number(w.card_number)}</code> · 💵 {_amount_text(w)}\n"
+            f"🆔 <code>{w.player_id}</code> · 🔑 <code>{w.code}</code>"
+        )
+        markup.row(InlineKeyboardButton(f"{mark} #{w.id} · {_amount_text(w)}",
+                                        callback_data=f"wq:t:{w.id}:{page}"))
+
+    nav = []
+    if page > 0:
+        nav.append(InlineKeyboardButton("⬅️", callback_data=f"wq:p:{page - 1}"))
+    nav.append(InlineKeyboardButton(f"🔄 {page + 1}/{pages}", callback_data=f"wq:p:{page}"))
+    if page + 1 < pages:
+        nav.append(InlineKeyboardButton("➡️", callback_data=f"wq:p:{page + 1}"))
+    markup.row(*nav)
+    markup.row(
+        InlineKeyboardButton("✔️ Sahifani tanlash", callback_data=f"wq:a:{page}"),
+        InlineKeyboardButton("✖️ Tozalash", callback_data=f"wq:c:{page}"),
+    )
+    if selected:
+        markup.row(InlineKeyboardButton(f"✅ Pul o'tkazildi ({len(selected)} ta)", callback_data=f"wq:ok:{page}"))
+
+    text = (
+        f"📋 <b>Yechish arizalari:</b> {total} ta (tanlangan: {len(selected)})\n"
+        f"📄 Sahifa {page + 1}/{pages}\n\n"
+        + "\n\n".join(blocks)
+    )
+    return text, markup, page
+
+
+def _channel_messages(withdrawals: List[Withdrawal], usernames: dict) -> List[str]:
+    """Kanal xabarlari: bitta ariza - avvalgi format, ko'p bo'lsa CHANNEL_BATCH_SIZE talik ro'yxat"""
+    if len(withdrawals) == 1:
+        w = withdrawals[0]
+        return [
+            f"✅ <b>Pul o'tkazildi</b>\n\n"
+            f"<b>#{w.bukmeker}#</b>\n"
+            f"👤 @{usernames.get(w.user_id) or 'username_yoq'}\n"
+            f"💰 <b>Summa:</b> {_amount_text(w)}\n"
+            f"🆔 <b>ID:</b> {w.player_id}\n"
+            f"📆 {format_datetime()}"
+        ]
+    messages = []
+    for i in range(0, len(withdrawals), CHANNEL_BATCH_SIZE):
+        chunk = withdrawals[i:i + CHANNEL_BATCH_SIZE]
+        lines = [
+            f"<b>#{w.bukmeker}#</b> 👤 @{usernames.get(w.user_id) or 'username_yoq'} · "
+            f"💰 {_amount_text(w)} · 🆔 {w.player_id}"
+            for w in chunk
+        ]
+        messages.append(
+            f"✅ <b>Pul o'tkazildi</b> ({len(chunk)} ta)\n\n"
+            + "\n".join(lines)
+            + f"\n\n📆 {format_datetime()}"
+        )
+    return messages
+
+
+def notify_withdrawals_completed(bot: telebot.TeleBot, withdrawals: List[Withdrawal]) -> None:
+    """Yopilgan arizalar bo'yicha foydalanuvchi va kanal xabarlari (notifier navbati orqali)"""
+    if not withdrawals:
+        return
+    # Foydalanuvchilar avval - kanal bucket'i sekinroq (daqiqasiga chegaralangan)
+    for w in withdrawals:
+        notifier.send(
+            bot,
+            w.user_id,
+            f"✅ Pul kartangizga o'tkazildi!\n\n"
+            f"💰 Summa: {_amount_text(w)}\n"
+            f"🆔 {w.bukmeker} ID: {w.player_id}\n\n"
+            f"Rahmat! 🎉"
+        )
+    if NOTIFICATION_CHANNEL_ID:
+        usernames = db.get_usernames(w.user_id for w in withdrawals)
+        for text in _channel_messages(withdrawals, usernames):
+            notifier.send(bot, NOTIFICATION_CHANNEL_ID, text, parse_mode='HTML')
+
+
+def _answer(bot: telebot.TeleBot, call: CallbackQuery, text: str = None, show_alert: bool = False) -> None:
+    try:
+        bot.answer_callback_query(call.id, text, show_alert=show_alert)
+    except Exception:
+        pass
+
+
+def register_withdrawal_queue_handlers(bot: telebot.TeleBot):
+    """Admin yechish navbati handlerlari"""
+
+    @bot.message_handler(func=lambda message: message.from_user.id == ADMIN_ID and message.text == QUEUE_BUTTON)
+    def show_withdrawal_queue(message: Message):
+        text, markup, page = render_queue(0, set())
+        sent = safe_send_message(bot, ADMIN_ID, text, parse_mode='HTML', reply_markup=markup)
+        if sent is not None:
+            with _views_lock:
+                _view(sent.message_id)['page'] = page
+
+    @bot.callback_query_handler(func=lambda call: bool(call.data and call.data.startswith('wq:')))
+    def handle_withdrawal_queue(call: CallbackQuery):
+        if call.from_user.id != ADMIN_ID:
+            _answer(bot, call, "Sizda ruxsat yo'q", show_alert=True)
+            return
+
+        parts = call.data.split(':')
+        action = parts[1] if len(parts) > 1 else ''
+        try:
+            args = [int(p) for p in parts[2:]]
+        except ValueError:
+            _answer(bot, call)
+            return
+        page = args[-1] if args else 0
+        message_id = call.message.message_id
+        notice = None
+
+        if action == 'ok':
+            with _views_lock:
+                view = _view(message_id)
+                selected, view['selected'] = view['selected'], set()
+            done = db.complete_withdrawals(selected)
+            notify_withdrawals_completed(bot, done)
+            notice = f"✅ {len(done)} ta ariza tasdiqlandi"
+            if len(done) < len(selected):
+                notice += f" ({len(selected) - len(done)} tasi allaqachon yopilgan)"
+        elif action == 'a':
+            items, _ = db.get_pending_withdrawals_page(page * PAGE_SIZE, PAGE_SIZE)
+            with _views_lock:
+                _view(message_id)['selected'].update(w.id for w in items)
+        with _views_lock:
+            view = _view(message_id)
+            if action == 't' and len(args) == 2:
+                view['selected'].symmetric_difference_update({args[0]})
+            elif action == 'c':
+                view['selected'].clear()
+            selected = set(view['selected'])
+
+        text, markup, view_page = render_queue(page, selected)
+        with _views_lock:
+            _view(message_id)['page'] = view_page
+        safe_edit_text(bot, call.message.chat.id, message_id, text, parse_mode='HTML', reply_markup=markup)
+        _answer(bot, call, notice)
@@ -1,6 +1,11 @@
 from handlers.payment_detector import PaymentDetector
+from handlers.payment_dedupe import PaymentDedupe, message_fingerprints
 from datetime import datetime
+import queue
 import re
+import threading
+import time
+from utils.task_executor import submit
 import telebot
 from telebot import apihelper
 from telebot.types import Message
@@ -12,9 +17,12 @@ from handlers.deposit import register_deposit_handlers, register_cancel_callback
 from handlers.withdrawal import register_withdrawal_handlers
 from handlers.admin import register_admin_handlers
 from handlers.payments import register_payment_handlers
-from handlers.deposit import execute_deposit
+from handlers.deposit_queue import DepositQueue
+from handlers.balance_service import balance_service
 from utils.keyboards import get_main_menu_keyboard, get_admin_menu_keyboard
 from utils.helpers import create_channel_payment_message
+from utils.money import format_tiyin, tiyin_to_som
+from utils.notifier import notifier
 from utils.state_manager import is_user_in_process
 
 # Middleware ni yoqish
@@ -78,111 +86,145 @@ register_payment_handlers(bot)
 register_cancel_callback(bot)
 
 # Payment detector for group/channel payment notifications
-payment_detector = PaymentDetector(db)
+payment_detector = PaymentDetector(db, enqueue_source='detector')
 
+# Dublikat PAYMENT xabarlari (forward/qayta post) detektorgacha tashlanadi; restart'dan keyin ham
+payment_dedupe = PaymentDedupe(db, ttl_seconds=getattr(config, 'PAYMENT_DEDUPE_TTL_SECONDS', 600))
+payment_dedupe.load()
 
-@bot.message_handler(func=lambda message: bool(re.search(r'PAYMENT\|', (message.text or ''), re.IGNORECASE)), content_types=['text'])
-def handle_group_payment(message: Message):
-    try:
-        # Fast parse; heavy work runs in background to avoid blocking telebot workers
-        parsed = payment_detector.parse_payment_message(message.text or '')
-        if not parsed:
-            return
 
-        # Do NOT send any message back to the group where the detector saw the payment.
-        # We'll notify only the admin/notification channel to avoid group spam.
+# Guruhdan kelgan PAYMENT xabarlari navbatga tushadi; bitta drain oqimi ularni mikro-batch
+# qilib match_batch ga beradi (reconnect/backlog paytida o'nlab xabar - bitta so'rov/claim)
+PAYMENT_BATCH_WINDOW = getattr(config, 'PAYMENT_BATCH_WINDOW_SECONDS', 0.2)
+PAYMENT_BATCH_MAX = 200
+_payment_queue = queue.Queue()
 
-        def _bg_detect_and_handle(parsed_msg, orig_message):
-            try:
-                payment = payment_detector.find_matching_payment(parsed_msg)
-                if not payment:
-                    return
 
-                # mark completed in DB, but only notify admin/group if this is the first time
-                try:
-                    payment_id = getattr(payment, 'payment_id', None)
-                    # Load current DB record to see current status
-                    existing = db.get_payment_by_id(payment_id)
-                    already_completed = getattr(existing, 'status', None) == 'completed'
+def _notify_deposit_channel(payment_id, amount, user_id, bukmeker):
+    """Muvaffaqiyatli depozit haqida NOTIFICATION_CHANNEL ga xabar (notify executor'ida)"""
+    if not getattr(config, 'NOTIFICATION_CHANNEL_ID', None):
+        return
+    balance_info = get_balance(bukmeker)
+    # Snapshot depozitdan oldingi bo'lishi mumkin - keyingi o'qishlar uchun fonda yangilash
+    balance_service.invalidate(bukmeker)
+    user_obj = db.get_user(user_id)
+    channel_message = create_channel_payment_message(
+        payment_id,
+        tiyin_to_som(amount),
+        (user_obj.username if user_obj else "username_yo'q"),
+        (user_obj.phone if user_obj else "telefon_yo'q"),
+        balance_info.get('Balance', 0),
+        balance_info.get('Limit', 0),
+        bukmeker,
+        success=True
+    )
+    # Kanal bucket'i (daqiqasiga chegaralangan) orqali - ommaviy depozitlarda 429 emas
+    notifier.send(bot, config.NOTIFICATION_CHANNEL_ID, channel_message, parse_mode='HTML')
+
+
+def _on_deposit_done(job, status, detail):
+    """Depozit vazifasi yakunlanganda (deposit_queue ishchisida): bildirishnomalar / status"""
+    payment_id, bukmeker, amount, user_id = job.payment_id, job.bukmeker, job.amount, job.user_id
+    if status == 'done':
+        try:
+            bot.send_message(user_id, f"✅ To'lov muvaffaqiyatli amalga oshirildi. Bukmeker: {bukmeker}, Summa: {format_tiyin(amount)} so'm")
+        except Exception:
+            pass
 
-                    # Update status to completed (idempotent)
-                    db.update_payment_status(payment_id, 'completed')
+        # remove keyboard from original payment message if present
+        try:
+            payment_db = db.get_payment_by_id(payment_id)
+            if getattr(payment_db, 'payment_chat_id', None) and getattr(payment_db, 'payment_message_id', None):
+                try:
+                    chat_id = payment_db.payment_chat_id
+                    # Only edit reply_markup for private chats to avoid touching group/channel messages
+                    if chat_id and int(chat_id) > 0:
+                        bot.edit_message_reply_markup(chat_id, payment_db.payment_message_id, reply_markup=None)
                 except Exception:
-                    existing = None
-                    already_completed = False
-
-                # Notify admin only if this payment wasn't already completed
-                # No admin DM on detection; silent proceed. If already completed, we also stay silent.
-
-                # Execute deposit in a separate background thread so this detector thread can finish quickly
-                def _bg_execute_deposit():
-                    try:
-                        bukmeker = getattr(payment, 'bukmeker', None)
-                        player_id = getattr(payment, 'player_id', None)
-                        amount = getattr(payment, 'amount', None)
-                        user_id = getattr(payment, 'user_id', None)
-
-                        executed = False
-                        try:
-                            executed = execute_deposit(bukmeker, player_id, amount, {'Success': True})
-                        except Exception as e:
-                            print(f"Error executing deposit after detection (bg): {e}")
-
-                        if executed:
-                            try:
-                                bot.send_message(user_id, f"✅ To'lov muvaffaqiyatli amalga oshirildi. Bukmeker: {bukmeker}, Summa: {amount:,.0f} so'm")
-                            except Exception:
-                                pass
-
-                            # remove keyboard from original payment message if present
-                            try:
-                                payment_db = db.get_payment_by_id(payment_id)
-                                if getattr(payment_db, 'payment_chat_id', None) and getattr(payment_db, 'payment_message_id', None):
-                                    try:
-                                        chat_id = payment_db.payment_chat_id
-                                        # Only edit reply_markup for private chats to avoid touching group/channel messages
-                                        if chat_id and int(chat_id) > 0:
-                                            bot.edit_message_reply_markup(chat_id, payment_db.payment_message_id, reply_markup=None)
-                                    except Exception:
-                                        pass
-                            except Exception:
-                                pass
-
-                            # notify only NOTIFICATION_CHANNEL (no payment group) after successful booking execution
-                            try:
-                                balance_info = get_balance(bukmeker)
-                                user_obj = db.get_user(user_id)
-                                channel_message = create_channel_payment_message(
-                                    payment_id,
-                                    amount,
-                                    (user_obj.username if user_obj else "username_yo'q"),
-                                    (user_obj.phone if user_obj else "telefon_yo'q"),
-                                    balance_info.get('Balance', 0),
-                                    balance_info.get('Limit', 0),
-                                    bukmeker,
-                                    success=True
-                                )
-                                if getattr(config, 'NOTIFICATION_CHANNEL_ID', None):
-                                    bot.send_message(config.NOTIFICATION_CHANNEL_ID, channel_message, parse_mode='HTML')
-                            except Exception:
-                                pass
-                        else:
-                            try:
-                                db.update_payment_status(payment_id, 'failed')
-                            except Exception:
-                                pass
-                            # No admin spam on failure either
-                    except Exception as e:
-                        print(f"Unexpected error in background deposit execution: {e}")
-
-                import threading as _threading
-                _threading.Thread(target=_bg_execute_deposit, daemon=True).start()
+                    pass
+        except Exception:
+            pass
 
-            except Exception as e:
-                print(f"Payment detector background error: {e}")
+        # notify only NOTIFICATION_CHANNEL (no payment group) after successful booking execution
+        submit('notify', _notify_deposit_channel, payment_id, amount, user_id, bukmeker)
+    elif status == 'failed':
+        try:
+            db.update_payment_status(payment_id, 'failed')
+        except Exception:
+            pass
+        # No admin spam on failure either
+    else:
+        # uncertain - bukmeker depozitni bajargan bo'lishi mumkin; avtomatik qayta urinilmaydi
+        submit('notify', bot.send_message, config.ADMIN_ID,
+               f"⚠️ Depozit natijasi noma'lum - bukmeker kabinetida tekshiring!\n\n"
+               f"ID: {payment_id}\nBukmeker: {bukmeker}\nO'yinchi: {job.player_id}\n"
+               f"Summa: {format_tiyin(amount)} so'm\nXato: {detail}")
+
+
+# Claim qilingan to'lovlar deposit_jobs jadvaliga claim bilan bir tranzaksiyada yoziladi;
+# restart'dan keyin ham bajariladi, har to'lov uchun bir marta
+deposit_queue = DepositQueue(
+    db,
+    on_done=_on_deposit_done,
+    workers=getattr(config, 'DEPOSIT_WORKERS', 8),
+    max_attempts=getattr(config, 'DEPOSIT_MAX_ATTEMPTS', 5),
+)
+
+
+def _drain_payment_queue():
+    """Navbatdagi PAYMENT xabarlarini oyna ichida yig'ib, bitta batch sifatida aniqlash"""
+    while True:
+        batch = [_payment_queue.get()]
+        deadline = time.monotonic() + PAYMENT_BATCH_WINDOW
+        while len(batch) < PAYMENT_BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_payment_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        # Handler tekshiruvidan keyin yozilganlar (oldingi batch) va shu batch ichidagi nusxalar
+        fresh, seen = [], set()
+        for text, chat_id, keys in batch:
+            if seen.intersection(keys) or payment_dedupe.is_duplicate(keys):
+                continue
+            seen.update(keys)
+            fresh.append((text, chat_id, keys))
+        if not fresh:
+            continue
+        try:
+            # Har bir xabar alohida so'rov emas: parse -> bitta indeks/DB o'tishi -> bitta claim tranzaksiyasi
+            parsed = [payment_detector.parse_payment_message(text, chat_id) for text, chat_id, _ in fresh]
+            matches = payment_detector.match_batch([(i, p) for i, p in enumerate(parsed) if p])
+        except Exception as e:
+            print(f"Payment detector background error: {e}")
+            continue
+        # Qayta ishlangan xabarlar endi dublikat (xato bo'lsa yozilmaydi - qayta post ishlanadi);
+        # (karta, summa) kaliti fingerprint TTL'i davomida boshqa to'lovga berilmaydi
+        for (_, _, keys), p in zip(fresh, parsed):
+            payment_dedupe.remember(keys)
+            if p:
+                db.amounts.hold(p['card_last4'], p['amount'])
+        payment_dedupe.flush()
+        # Yopilgan to'lovlarning depozit vazifalari claim bilan birga yozilgan - ishchini uyg'otish
+        if matches:
+            deposit_queue.wake()
 
-        import threading as _threading
-        _threading.Thread(target=_bg_detect_and_handle, args=(parsed, message), daemon=True).start()
+
+threading.Thread(target=_drain_payment_queue, name='payment-batch', daemon=True).start()
+
+
+@bot.message_handler(func=lambda message: bool(re.search(r'PAYMENT\|', (message.text or ''), re.IGNORECASE)), content_types=['text'])
+def handle_group_payment(message: Message):
+    # Do NOT send any message back to the group where the detector saw the payment.
+    # Heavy work runs in the batch drain thread to avoid blocking telebot workers.
+    try:
+        text = message.text or ''
+        keys = message_fingerprints(message, text)
+        if payment_dedupe.is_duplicate(keys):
+            return
+        _payment_queue.put((text, message.chat.id, keys))
     except Exception as e:
         # keep handler silent on errors
         print(f"Payment handler error: {e}")
@@ -254,6 +296,17 @@ if __name__ == "__main__":
         # Database ni tekshirish
         users_count = db.get_users_count()
         print(f"👥 Foydalanuvchilar: {users_count}")
+        print(f"⏳ Pending to'lovlar (indeks): {len(db.pending)}")
+        
+        # Eski pending oynalarni davriy expired qilish (indeks ham tozalanadi)
+        db.start_pending_janitor(getattr(config, 'PENDING_PAYMENT_TTL_MINUTES', 30))
+        
+        # Depozit navbati (oldingi ishga tushishdan qolgan queued vazifalar ham bajariladi)
+        deposit_queue.start()
+        
+        # Kassa balanslari fonda yangilanib turadi (admin ekrani va bildirishnomalar snapshot o'qiydi)
+        balance_service.start()
+        print(f"📥 Depozit navbati: {db.count_deposit_jobs()}")
         
         # Polling boshqaruvi - optimallashtirilgan
         import time as _time
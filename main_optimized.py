@@ -18,13 +18,18 @@ import re
 from database.database import db
 from handlers.start import register_start_handlers
 from handlers.menu import register_menu_handlers
-from handlers.deposit import register_deposit_handlers, execute_deposit
+from handlers.deposit import register_deposit_handlers
+from handlers.deposit_queue import DepositQueue
+from handlers.balance_service import balance_service
 from handlers.withdrawal import register_withdrawal_handlers
 from handlers.admin import register_admin_handlers
 from handlers.payments import register_payment_handlers
 from handlers.payment_detector import PaymentDetector
+from handlers.payment_dedupe import PaymentDedupe, message_fingerprints
 from config import BOT_TOKEN
 import config
+from utils.money import format_som, format_tiyin
+from utils.notifier import notifier
 
 
 # Middleware'ni yoqish
@@ -78,7 +83,89 @@ except Exception:
 
 
 # Payment detector
-payment_detector = PaymentDetector(db)
+payment_detector = PaymentDetector(db, enqueue_source='detector')
+
+# Dublikat PAYMENT xabarlari (forward/qayta post) detektorgacha tashlanadi; restart'dan keyin ham
+payment_dedupe = PaymentDedupe(db, ttl_seconds=getattr(config, 'PAYMENT_DEDUPE_TTL_SECONDS', 600))
+payment_dedupe.load()
+
+def _on_deposit_done(job, status, detail):
+    """Depozit vazifasi yakunlanganda: foydalanuvchi va kanal bildirishnomalari"""
+    payment_id, bukmeker, player_id = job.payment_id, job.bukmeker, job.player_id
+    amount, user_id = job.amount, job.user_id  # tiyin
+    if status == 'done':
+        # Notification va user xabar yuborish
+        try:
+            from handlers.deposit import get_balance
+            balance_result = get_balance(bukmeker, player_id)
+            balance_service.invalidate(bukmeker)
+            balance_info = {'Balance': balance_result.get('Balance', 0), 'Limit': balance_result.get('Limit', 0)} if balance_result and balance_result.get('Success') else {'Balance': 0, 'Limit': 0}
+            
+            user_data = db.get_user(user_id)
+            user_username = getattr(user_data, 'username', '') or '' if user_data else ''
+            user_phone = getattr(user_data, 'phone', '') or '' if user_data else ''
+            
+            if getattr(config, 'NOTIFICATION_CHANNEL_ID', None):
+                username_str = f"@{user_username}" if user_username else f"ID: {user_id}"
+                phone_str = user_phone if user_phone else "—"
+                
+                channel_msg = (
+                    f"✅ Operatsiya muvaffaqiyatli o'tdi!\n\n"
+                    f"Bukmeker: {bukmeker}\n"
+                    f"ID: {player_id}\n"
+                    f"Summa: {format_tiyin(amount)} so'm\n\n"
+                    f"Mijoz: {username_str}\n"
+                    f"Tel: {phone_str}\n\n"
+                    f"Kassa:\n"
+                    f"  Balans: {format_som(balance_info['Balance'])} so'm\n"
+                    f"  Limit: {format_som(balance_info['Limit'])} so'm"
+                )
+                notifier.send(bot, config.NOTIFICATION_CHANNEL_ID, channel_msg)
+            
+            payment = db.get_payment_by_id(payment_id)
+            payment_msg_id = getattr(payment, 'payment_message_id', None)
+            if payment_msg_id:
+                try:
+                    bot.delete_message(user_id, payment_msg_id)
+                except Exception:
+                    pass
+            
+            bot.send_message(
+                user_id,
+                f"✅ To'lov amalga oshirildi!\n\n"
+                f"Bukmeker: {bukmeker}\n"
+                f"Summa: {format_tiyin(amount)} so'm\n\n"
+                f"Bot: @uzpaykassa_bot"
+            )
+        except Exception:
+            pass
+        return
+
+    if status == 'failed':
+        db.update_payment_status(payment_id, 'failed')
+        title = "❌ To'lov muvaffaqiyatsiz!"
+    else:
+        # uncertain - bukmeker bajargan bo'lishi mumkin; avtomatik qayta urinilmaydi
+        title = "⚠️ To'lov natijasi noma'lum - kabinetda tekshiring!"
+    if getattr(config, 'NOTIFICATION_CHANNEL_ID', None):
+        error_channel_msg = (
+            f"{title}\n\n"
+            f"Bukmeker: {bukmeker}\n"
+            f"ID: {player_id}\n"
+            f"Summa: {format_tiyin(amount)} so'm\n\n"
+            f"Sabab: {detail}"
+        )
+        notifier.send(bot, config.NOTIFICATION_CHANNEL_ID, error_channel_msg)
+
+
+# Depozitlar doimiy navbat orqali (restart'dan keyin ham, har to'lov uchun bir marta)
+deposit_queue = DepositQueue(
+    db,
+    on_done=_on_deposit_done,
+    workers=getattr(config, 'DEPOSIT_WORKERS', 8),
+    max_attempts=getattr(config, 'DEPOSIT_MAX_ATTEMPTS', 5),
+)
+
 
 # Pre-compile lambda uchun - tezroq
 def _is_payment_message(m):
@@ -90,6 +177,24 @@ def _is_payment_message(m):
     return 'PAYMENT' in text.upper()
 
 
+def _claim_payment(parsed) -> bool:
+    """Mos pending to'lovni topib atomik claim qilish; claim bo'lsa True"""
+    payment = payment_detector.find_matching_payment(parsed)
+    if not payment:
+        return False
+
+    bukmeker = getattr(payment, 'bukmeker', None)
+    player_id = getattr(payment, 'player_id', None)
+    amount = getattr(payment, 'amount', None)  # tiyin
+    status = getattr(payment, 'status', None)
+
+    if status == 'completed' or not all([bukmeker, player_id, amount]):
+        return False
+
+    # Atomik claim - takroriy xabar bir to'lovni ikki marta bajarmasin
+    return bool(payment_detector.process_payment(payment, parsed))
+
+
 @bot.message_handler(
     func=_is_payment_message,
     content_types=['text', 'photo', 'video', 'document', 'animation']
@@ -98,89 +203,23 @@ def handle_group_payment(message: Message):
     """Guruh PAYMENT xabarini aniqlash va API chaqirish."""
     try:
         msg_text = (getattr(message, 'text', None) or getattr(message, 'caption', None) or '')
-        parsed = payment_detector.parse_payment_message(msg_text)
+        parsed = payment_detector.parse_payment_message(msg_text, message.chat.id)
         if not parsed:
             return
-
-        payment = payment_detector.find_matching_payment(parsed)
-        if not payment:
+        keys = message_fingerprints(message, msg_text)
+        if payment_dedupe.is_duplicate(keys):
             return
 
-        payment_id = getattr(payment, 'payment_id', None)
-        bukmeker = getattr(payment, 'bukmeker', None)
-        player_id = getattr(payment, 'player_id', None)
-        amount = getattr(payment, 'amount', None)
-        user_id = getattr(payment, 'user_id', None)
-        status = getattr(payment, 'status', None)
+        claimed = _claim_payment(parsed)
+        # Qayta ishlangan xabar endi dublikat (xato bo'lsa yozilmaydi - qayta post ishlanadi)
+        payment_dedupe.remember(keys)
+        # (karta, summa) kaliti fingerprint TTL'i davomida boshqa to'lovga berilmaydi
+        db.amounts.hold(parsed['card_last4'], parsed['amount'])
+        payment_dedupe.flush()
 
-        if status == 'completed' or not all([bukmeker, player_id, amount]):
-            return
-
-        try:
-            from handlers.deposit import execute_deposit_detailed
-            result = execute_deposit_detailed(bukmeker, player_id, amount, {})
-            executed = result.get('Success', False)
-            error_msg = result.get('Error') or result.get('error') or result.get('Message') or 'Noma\'lum xato'
-        except Exception as e:
-            executed = False
-            error_msg = str(e)
-
-        if executed:
-            db.update_payment_status(payment_id, 'completed')
-            
-            # Notification va user xabar yuborish
-            try:
-                from handlers.deposit import get_balance
-                balance_result = get_balance(bukmeker, player_id)
-                balance_info = {'Balance': balance_result.get('Balance', 0), 'Limit': balance_result.get('Limit', 0)} if balance_result and balance_result.get('Success') else {'Balance': 0, 'Limit': 0}
-                
-                user_data = db.get_user(user_id)
-                user_username = getattr(user_data, 'username', '') or '' if user_data else ''
-                user_phone = getattr(user_data, 'phone', '') or '' if user_data else ''
-                
-                if getattr(config, 'NOTIFICATION_CHANNEL_ID', None):
-                    username_str = f"@{user_username}" if user_username else f"ID: {user_id}"
-                    phone_str = user_phone if user_phone else "—"
-                    
-                    channel_msg = (
-                        f"✅ Operatsiya muvaffaqiyatli o'tdi!\n\n"
-                        f"Bukmeker: {bukmeker}\n"
-                        f"ID: {player_id}\n"
-                        f"Summa: {amount:,.0f} so'm\n\n"
-                        f"Mijoz: {username_str}\n"
-                        f"Tel: {phone_str}\n\n"
-                        f"Kassa:\n"
-                        f"  Balans: {balance_info['Balance']:,.0f} so'm\n"
-                        f"  Limit: {balance_info['Limit']:,.0f} so'm"
-                    )
-                    bot.send_message(config.NOTIFICATION_CHANNEL_ID, channel_msg)
-                
-                payment_msg_id = getattr(payment, 'payment_message_id', None)
-                if payment_msg_id:
-                    try:
-                        bot.delete_message(user_id, payment_msg_id)
-                    except Exception:
-                        pass
-                
-                bot.send_message(
-                    user_id,
-                    f"✅ To'lov amalga oshirildi!\n\n"
-                    f"Bukmeker: {bukmeker}\n"
-                    f"Summa: {amount:,.0f} so'm\n\n"
-                    f"Bot: @uzpaykassa_bot"
-                )
-            except Exception:
-                pass
-        else:
-            if getattr(config, 'NOTIFICATION_CHANNEL_ID', None):
-                error_channel_msg = (
-                    f"❌ To'lov muvaffaqiyatsiz!\n\n"
-                    f"Bukmeker: {bukmeker}\n"
-                    f"ID: {player_id}\n"
-                    f"Summa: {amount:,.0f} so'm\n\n"
-                    f"Sabab: {error_msg}"
-                )
-                bot.send_message(config.NOTIFICATION_CHANNEL_ID, error_channel_msg)
+        if claimed:
+            # Depozit vazifasi claim bilan birga yozildi - navbat ishchisi bajaradi
+            deposit_queue.wake()
     except Exception:
         pass
 
@@ -211,6 +250,16 @@ if __name__ == "__main__":
 
         users_count = db.get_users_count()
         print(f"👥 Foydalanuvchilar: {users_count}")
+        print(f"⏳ Pending to'lovlar (indeks): {len(db.pending)}")
+
+        # Eski pending oynalarni davriy expired qilish (indeks ham tozalanadi)
+        db.start_pending_janitor(getattr(config, 'PENDING_PAYMENT_TTL_MINUTES', 30))
+
+        # Depozit navbati (oldingi ishga tushishdan qolgan queued vazifalar ham bajariladi)
+        deposit_queue.start()
+
+        # Kassa balanslari fonda yangilanib turadi (bildirishnomalar snapshot o'qiydi)
+        balance_service.start()
 
         import time as _time
         backoff = 1
@@ -0,0 +1,396 @@
+"""Bukmeker API'lari uchun lokal stub server (yuklama testlari uchun).
+
+Real bukmeker API'lariga tegmasdan depozit/pul yechish oqimlarini sinash uchun:
+provayderlar (``handlers/providers.py``) ishlatadigan yuzani taqlid qiladi -
+find_player, deposit_add / deposit_player (Mostbet), deposit_payout / withdraw_subtract, get_balance.
+
+Server (JSON, HTTP/1.1 keep-alive):
+    POST /<provayder>/<op>     op: find_player, deposit, payout, balance
+    GET  /_stats               provayder/op bo'yicha hisoblagichlar va kreditlar
+    POST /_profile             {"provider": "1xBet" | null, ...Profile maydonlari} - profilni ish paytida o'zgartirish
+
+Har so'rov profili (provayder bo'yicha alohida berilishi mumkin):
+    latency_ms    - asosiy kechikish
+    jitter_ms     - qo'shimcha eksponensial kechikish (o'rtacha), uzun "dum" uchun
+    error_rate    - HTTP 500 ulushi (klient HTTPError ko'taradi)
+    timeout_rate  - ``hang_seconds`` osilib qolish ulushi (klient read timeout oladi)
+    reject_rate   - biznes rad etish ulushi (Success: False)
+    missing_rate  - find_player "topilmadi" ulushi
+
+Mostbet depozit javobi real API kabi teskari (muvaffaqiyatda Success: False).
+
+``StubClient`` - shu serverga ulanadigan API klienti (``.session`` bor - http_pool ulanadi);
+``install_api_modules(url)`` ``api.xbet_api`` / ``api.mobcash_api`` / ``api.mostbet_api`` modullarini
+stub klientlar bilan almashtiradi (handlers import qilinishidan oldin chaqirilishi kerak).
+
+Ishga tushirish:
+    python tools/bookmaker_stub.py --port 8765 --latency-ms 120 --jitter-ms 60 --error-rate 0.02
+    python tools/bookmaker_stub.py --profile 1xBet:timeout_rate=0.2,latency_ms=400
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import quote, unquote
+
+import requests
+
+# modul -> (atribut, provayder nomi)
+API_MODULES = {
+    'api.xbet_api': (('xbet_api', '1xBet'),),
+    'api.mobcash_api': (('melbet_api', 'Melbet'), ('betwiner_api', 'Betwiner'), ('winwin_api', 'WinWinBet')),
+    'api.mostbet_api': (('mostbet_api', 'Mostbet'),),
+}
+
+# Depozit javobi teskari bo'lgan provayderlar
+INVERTED_SUCCESS = {'Mostbet'}
+
+
+class Profile:
+    """Stub javob profili (qarang: modul docstring)"""
+
+    __slots__ = ('latency_ms', 'jitter_ms', 'error_rate', 'timeout_rate', 'reject_rate', 'missing_rate',
+                 'hang_seconds')
+
+    def __init__(self, latency_ms: float = 50.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 timeout_rate: float = 0.0, reject_rate: float = 0.0, missing_rate: float = 0.0,
+                 hang_seconds: float = 30.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.reject_rate = reject_rate
+        self.missing_rate = missing_rate
+        self.hang_seconds = hang_seconds
+
+    def updated(self, **fields) -> "Profile":
+        values = {name: getattr(self, name) for name in self.__slots__}
+        for name, value in fields.items():
+            if name not in values:
+                raise ValueError(f"Noma'lum profil maydoni: {name}")
+            values[name] = float(value)
+        return Profile(**values)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class BookmakerStub:
+    """
+    Stub server (alohida oqimda)
+
+    Attributes:
+        profile: umumiy profil
+        overrides: provayder -> profil
+        initial_balance: har provayder kassasining boshlang'ich balansi (so'm)
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, profile: Optional[Profile] = None,
+                 overrides: Optional[Dict[str, Profile]] = None, balance: float = 100_000_000.0,
+                 seed: Optional[int] = None):
+        self.profile = profile or Profile()
+        self.overrides: Dict[str, Profile] = dict(overrides or {})
+        self.initial_balance = balance
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._balances: Dict[str, float] = {}
+        self._counters: Dict[str, Dict[str, Dict[str, int]]] = {}
+        self._credits: Dict[str, Dict[str, float]] = {}
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._server.serve_forever, name='bookmaker-stub', daemon=True)
+        self._thread.start()
+        return self.url
+
+    def serve_forever(self) -> None:
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def profile_for(self, provider: str) -> Profile:
+        with self._lock:
+            return self.overrides.get(provider, self.profile)
+
+    def set_profile(self, provider: Optional[str] = None, **fields) -> None:
+        """Profilni ish paytida o'zgartirish (provider None - umumiy profil)"""
+        with self._lock:
+            if provider is None:
+                self.profile = self.profile.updated(**fields)
+            else:
+                self.overrides[provider] = self.overrides.get(provider, self.profile).updated(**fields)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'counters': json.loads(json.dumps(self._counters)),
+                'credits': {p: dict(c) for p, c in self._credits.items()},
+                'balances': dict(self._balances),
+            }
+
+    def _count(self, provider: str, op: str, outcome: str) -> None:
+        with self._lock:
+            ops = self._counters.setdefault(provider, {}).setdefault(op, {})
+            ops[outcome] = ops.get(outcome, 0) + 1
+
+    def _draw(self, profile: Profile) -> str:
+        with self._lock:
+            r = self._random.random()
+            delay = profile.latency_ms + (self._random.expovariate(1 / profile.jitter_ms) if profile.jitter_ms > 0 else 0)
+        time.sleep(delay / 1000)
+        if r < profile.timeout_rate:
+            return 'timeout'
+        r -= profile.timeout_rate
+        if r < profile.error_rate:
+            return 'error'
+        return 'ok'
+
+    def _roll(self, rate: float) -> bool:
+        with self._lock:
+            return self._random.random() < rate
+
+    def handle(self, provider: str, op: str, payload: dict):
+        """(http status, javob) - stub mantiqi"""
+        profile = self.profile_for(provider)
+        outcome = self._draw(profile)
+        if outcome == 'timeout':
+            self._count(provider, op, 'timeout')
+            time.sleep(profile.hang_seconds)
+            return 504, {'Success': False, 'Error': 'stub timeout'}
+        if outcome == 'error':
+            self._count(provider, op, 'error')
+            return 500, {'Success': False, 'Error': 'stub internal error'}
+
+        player_id = str(payload.get('player_id', ''))
+        if op == 'find_player':
+            if self._roll(profile.missing_rate):
+                self._count(provider, op, 'missing')
+                return 200, {'Success': False, 'error': 'Player not found'}
+            self._count(provider, op, 'ok')
+            return 200, {'Success': True, 'UserId': player_id, 'Name': f"Player {player_id[-4:]}", 'Currency': 'UZS'}
+
+        if op == 'deposit':
+            amount = float(payload.get('amount', 0))
+            if self._roll(profile.reject_rate):
+                self._count(provider, op, 'rejected')
+                ok = False
+                result = {'Message': 'Limit exceeded', 'Error': 'Limit exceeded'}
+            else:
+                with self._lock:
+                    self._balances[provider] = self._balances.get(provider, self.initial_balance) - amount
+                    credits = self._credits.setdefault(provider, {'count': 0, 'amount': 0.0})
+                    credits['count'] += 1
+                    credits['amount'] += amount
+                self._count(provider, op, 'ok')
+                ok = True
+                result = {'Message': 'OK', 'Summa': amount, 'OperationId': f"{int(time.time() * 1000)}"}
+            success = (not ok) if provider in INVERTED_SUCCESS else ok
+            return 200, dict(result, Success=success)
+
+        if op == 'payout':
+            if self._roll(profile.reject_rate):
+                self._count(provider, op, 'rejected')
+                return 200, {'Success': False, 'Message': "Kod noto'g'ri"}
+            with self._lock:
+                amount = float(self._random.randint(10, 500) * 1000)
+                self._balances[provider] = self._balances.get(provider, self.initial_balance) + amount
+            self._count(provider, op, 'ok')
+            return 200, {'Success': True, 'Amount': amount, 'Summa': amount}
+
+        if op == 'balance':
+            self._count(provider, op, 'ok')
+            with self._lock:
+                balance = self._balances.get(provider, self.initial_balance)
+            return 200, {'Success': True, 'Balance': balance, 'Limit': self.initial_balance * 5}
+
+        self._count(provider, op, 'unknown')
+        return 404, {'Success': False, 'Error': f"unknown op: {op}"}
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # keep-alive'da Nagle + delayed ACK har javobga ~40 ms qo'shadi
+            disable_nagle_algorithm = True
+
+            def _reply(self, status: int, body: dict) -> None:
+                data = json.dumps(body).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Klient timeout'dan keyin ulanishni yopgan
+                    self.close_connection = True
+
+            def _body(self) -> dict:
+                length = int(self.headers.get('Content-Length') or 0)
+                if not length:
+                    return {}
+                try:
+                    return json.loads(self.rfile.read(length))
+                except ValueError:
+                    return {}
+
+            def do_GET(self):
+                if self.path.rstrip('/') == '/_stats':
+                    self._reply(200, stub.stats())
+                else:
+                    self._reply(404, {'Success': False, 'Error': 'not found'})
+
+            def do_POST(self):
+                payload = self._body()
+                if self.path.rstrip('/') == '/_profile':
+                    fields = dict(payload)
+                    provider = fields.pop('provider', None)
+                    try:
+                        stub.set_profile(provider, **fields)
+                    except (TypeError, ValueError) as e:
+                        self._reply(400, {'Success': False, 'Error': str(e)})
+                        return
+                    self._reply(200, {'Success': True, 'profile': stub.profile_for(provider or '').to_dict()})
+                    return
+                parts = [unquote(p) for p in self.path.strip('/').split('/')]
+                if len(parts) != 2:
+                    self._reply(404, {'Success': False, 'Error': 'not found'})
+                    return
+                status, body = stub.handle(parts[0], parts[1], payload)
+                self._reply(status, body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class StubClient:
+    """
+    Stub server uchun API klienti - real klientlar metodlari bilan
+
+    Attributes:
+        provider: provayder nomi (URL'da)
+        session: requests.Session (Provider uni http_pool'ga almashtiradi)
+    """
+
+    def __init__(self, base_url: str, provider: str, session: Optional[requests.Session] = None):
+        self.base_url = base_url.rstrip('/')
+        self.provider = provider
+        self.session = session or requests.Session()
+
+    def _call(self, op: str, **payload) -> dict:
+        response = self.session.post(f"{self.base_url}/{quote(self.provider, safe='')}/{op}", json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    def find_player(self, player_id: str) -> dict:
+        return self._call('find_player', player_id=player_id)
+
+    def deposit_add(self, player_id: str, amount: float) -> dict:
+        return self._call('deposit', player_id=player_id, amount=amount)
+
+    def deposit_player(self, cashdesk: int, player_id: str, amount: float) -> dict:
+        return self._call('deposit', player_id=player_id, amount=amount, cashdesk=cashdesk)
+
+    def withdraw_subtract(self, player_id: str, code: str) -> dict:
+        return self._call('payout', player_id=player_id, code=code)
+
+    def deposit_payout(self, player_id: str, code: str) -> dict:
+        return self._call('payout', player_id=player_id, code=code)
+
+    def get_balance(self) -> dict:
+        return self._call('balance')
+
+
+def install_api_modules(base_url: str) -> Dict[str, StubClient]:
+    """``api.*`` modullarini stub klientlar bilan almashtirish; provayder -> klient"""
+    clients: Dict[str, StubClient] = {}
+    package = types.ModuleType('api')
+    package.__path__ = []
+    sys.modules['api'] = package
+    for module_name, attrs in API_MODULES.items():
+        module = types.ModuleType(module_name)
+        for attr, provider in attrs:
+            clients[provider] = StubClient(base_url, provider)
+            setattr(module, attr, clients[provider])
+        sys.modules[module_name] = module
+        setattr(package, module_name.split('.', 1)[1], module)
+    return clients
+
+
+def parse_profile_overrides(specs) -> Dict[str, dict]:
+    """``--profile 1xBet:timeout_rate=0.2,latency_ms=400`` -> {'1xBet': {...}}"""
+    overrides: Dict[str, dict] = {}
+    for spec in specs or []:
+        provider, _, fields = spec.partition(':')
+        values = overrides.setdefault(provider, {})
+        for item in filter(None, fields.split(',')):
+            key, _, value = item.partition('=')
+            values[key.strip()] = float(value)
+    return overrides
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    """Profil flag'lari (load harness ham ishlatadi)"""
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--timeout-rate', type=float, default=0.0)
+    parser.add_argument('--reject-rate', type=float, default=0.0)
+    parser.add_argument('--missing-rate', type=float, default=0.0)
+    parser.add_argument('--hang-seconds', type=float, default=30.0)
+    parser.add_argument('--profile', action='append', metavar='PROVIDER:key=value,...',
+                        help="provayder uchun alohida profil (bir necha marta berish mumkin)")
+    parser.add_argument('--seed', type=int, default=None)
+
+
+def stub_from_args(args, host: str = '127.0.0.1', port: int = 0) -> BookmakerStub:
+    profile = Profile(args.latency_ms, args.jitter_ms, args.error_rate, args.timeout_rate,
+                      args.reject_rate, args.missing_rate, args.hang_seconds)
+    overrides = {provider: profile.updated(**fields)
+                 for provider, fields in parse_profile_overrides(args.profile).items()}
+    return BookmakerStub(host, port, profile, overrides, seed=args.seed)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    stub = stub_from_args(args, args.host, args.port)
+    print(f"Bookmaker stub: {stub.url}  profile={stub.profile.to_dict()}")
+    for provider, profile in stub.overrides.items():
+        print(f"  {provider}: {profile.to_dict()}")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(stub.stats(), indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""incoming_messages.log (yoki Telegram chat eksporti) ni detektor orqali qayta o'tkazish.
+
+Bot o'chiq bo'lgan yoki match o'tkazib yuborilgan paytdagi PAYMENT xabarlarini topib,
+qaysi pending oynalar yopilgan bo'lishi kerakligini ko'rsatadi.
+
+Manbalar:
+ - logs/incoming_messages.log - main.py middleware formati:
+   ``<iso vaqt> | <user_id> | <chat_id> | <matn>`` (ko'p qatorli matnning davomi keyingi qatorlarda)
+ - Telegram Desktop JSON eksporti (result.json): ``{"id": chat_id, "messages": [...]}``
+
+Ishlash tartibi:
+ 1. Manba oqim sifatida o'qiladi; parse bo'laklari process pool'ga tarqatiladi
+    (payment_parser - toza funksiya, DB/config kerak emas)
+ 2. Asosiy jarayonda xabarlar vaqt bo'yicha saralanadi va DB'dagi oynalar bilan solishtiriladi:
+    oyna xabardan oldin yaratilgan bo'lishi kerak; bitta oyna faqat bir marta beriladi
+ 3. dry-run (default) - faqat hisobot; --apply - oyna atomik claim qilinadi va depozit bajariladi
+
+Ishga tushirish:
+    python tools/replay_incoming.py logs/incoming_messages.log
+    python tools/replay_incoming.py result.json --include-expired --since 2026-10-01 --apply
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'handlers')]
+
+from handlers.payment_parser import parse_payment_text  # noqa: E402
+
+# (epoch, chat_id, matn)
+Record = Tuple[float, Optional[int], str]
+# (epoch, chat_id, amount_tiyin, card_last4, matn)
+Parsed = Tuple[float, Optional[int], int, str, str]
+
+_LOG_LINE = re.compile(r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?) \| (-?\d+) \| (-?\d+) \| ?(.*)$')
+
+# Oyna yaratilishi va xabar vaqti orasidagi soat farqi uchun zaxira (soniya)
+CLOCK_SKEW = 5
+
+
+def read_log(path: str) -> Iterator[Record]:
+    """incoming_messages.log ni oqim sifatida o'qish (davom qatorlari birlashtiriladi)"""
+    current = None
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            m = _LOG_LINE.match(line)
+            if m:
+                if current:
+                    yield current
+                ts = datetime.fromisoformat(m.group(1)).timestamp()
+                current = (ts, int(m.group(3)), m.group(4))
+            elif current:
+                current = (current[0], current[1], current[2] + '\n' + line)
+    if current:
+        yield current
+
+
+def _export_text(text) -> str:
+    # Telegram eksportida matn satr yoki entity ro'yxati bo'ladi
+    if isinstance(text, str):
+        return text
+    return ''.join(part if isinstance(part, str) else part.get('text', '') for part in text or [])
+
+
+def read_export(path: str) -> Iterator[Record]:
+    """Telegram Desktop JSON eksportidan xabarlar"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    chat_id = data.get('id')
+    for msg in data.get('messages', []):
+        if msg.get('type', 'message') != 'message':
+            continue
+        if msg.get('date_unixtime'):
+            ts = float(msg['date_unixtime'])
+        else:
+            ts = datetime.fromisoformat(msg['date']).timestamp()
+        yield ts, chat_id, _export_text(msg.get('text'))
+
+
+def _chunks(records: Iterator[Record], size: int) -> Iterator[List[Record]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _parse_chunk(args) -> List[Parsed]:
+    """Process pool ishchisi: bo'lakdagi PAYMENT xabarlarini parse qilish"""
+    chunk, all_formats = args
+    out = []
+    for ts, chat_id, text in chunk:
+        # Jonli handler bilan bir xil darvoza: faqat PAYMENT tokenli xabarlar
+        if not all_formats and 'payment' not in text.lower():
+            continue
+        parsed = parse_payment_text(text, chat_id)
+        if parsed:
+            out.append((ts, chat_id, parsed[0], parsed[1], text))
+    return out
+
+
+def parse_parallel(records: Iterator[Record], workers: int, chunk_size: int,
+                   all_formats: bool = False) -> List[Parsed]:
+    """Manbani bo'laklab process pool'da parse qilish; natija vaqt bo'yicha saralangan"""
+    results: List[Parsed] = []
+    tasks = ((chunk, all_formats) for chunk in _chunks(records, chunk_size))
+    if workers <= 1:
+        for task in tasks:
+            results.extend(_parse_chunk(task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for part in pool.map(_parse_chunk, tasks):
+                results.extend(part)
+    results.sort(key=lambda r: r[0])
+    return results
+
+
+def match(parsed: List[Parsed], db, statuses, tolerance: int, window_seconds: float) -> List[Tuple[Parsed, object]]:
+    """
+    Xabarlarni DB oynalari bilan solishtirish (vaqt tartibida, har oyna bir marta)
+
+    Oyna xabar vaqtida ochiq bo'lishi kerak: created <= xabar <= created + window_seconds
+
+    Returns:
+        [(parsed xabar, Payment), ...]
+    """
+    from database.pending_index import PendingPaymentIndex, _created_ts
+
+    index = PendingPaymentIndex()
+    for payment in db.get_payments_by_statuses(statuses):
+        # index faqat 'pending' ni qabul qiladi - expired oynalar ham nomzod bo'lishi uchun
+        status, payment.status = payment.status, 'pending'
+        index.add(payment, _created_ts(payment))
+        payment.status = status
+
+    matches = []
+    for record in parsed:
+        ts, _, amount, card_last4, _ = record
+        if tolerance:
+            candidates = index.lookup_range(card_last4, amount, tolerance)
+        else:
+            candidates = index.lookup(card_last4, amount)
+        for payment in candidates:
+            created = _created_ts(payment)
+            if created - CLOCK_SKEW <= ts <= created + window_seconds + CLOCK_SKEW:
+                index.discard(payment.payment_id)
+                matches.append((record, payment))
+                break
+    return matches
+
+
+def apply(matches, db, statuses) -> List[str]:
+    """Oynalarni atomik claim qilib depozit navbatiga qo'yish va vaqti kelganlarini bajarish.
+
+    Vazifalar deposit_jobs da qoladi: qayta urinishlar (backoff) ishlab turgan bot navbati tomonidan
+    davom ettiriladi; bitta to'lov ikki marta bajarilmaydi.
+    """
+    from handlers.deposit_queue import DepositQueue
+
+    claimed = []
+    for _, payment in matches:
+        ok = db.claim_payment(payment.payment_id, 'completed', statuses, enqueue_source='replay')
+        claimed.append(ok)
+
+    def on_done(job, status, detail):
+        if status == 'failed':
+            db.update_payment_status(job.payment_id, 'failed')
+        elif status == 'uncertain':
+            print(f"Deposit uncertain {job.payment_id}: {detail}")
+
+    ids = [p.payment_id for (_, p), ok in zip(matches, claimed) if ok]
+    results = DepositQueue(db, on_done=on_done).run_once(ids)
+    names = {'done': 'deposited', 'queued': 'retry-queued'}
+    return [names.get(results.get(p.payment_id), results.get(p.payment_id, 'queued')) if ok else 'skipped'
+            for (_, p), ok in zip(matches, claimed)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('source', help="incoming_messages.log yoki Telegram result.json")
+    parser.add_argument('--db', help='SQLite yo\'li (default: config.DATABASE_PATH)')
+    parser.add_argument('--apply', action='store_true', help='oynalarni yopish va depozit qilish')
+    parser.add_argument('--include-expired', action='store_true', help="expired oynalarni ham solishtirish")
+    parser.add_argument('--since', type=datetime.fromisoformat)
+    parser.add_argument('--until', type=datetime.fromisoformat)
+    parser.add_argument('--chat', type=int, action='append', help='faqat shu chat ID (takrorlash mumkin)')
+    parser.add_argument('--all-formats', action='store_true', help="PAYMENT tokenisiz xabarlarni ham parse qilish")
+    parser.add_argument('--tolerance', type=int, default=0, help='tiyin')
+    parser.add_argument('--window-minutes', type=float,
+                        help="oyna umri (default: config.PENDING_PAYMENT_TTL_MINUTES yoki 30)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk', type=int, default=5000)
+    parser.add_argument('--csv', help='hisobotni CSV faylga yozish')
+    args = parser.parse_args()
+
+    records = read_export(args.source) if args.source.endswith('.json') else read_log(args.source)
+    since = args.since.timestamp() if args.since else None
+    until = args.until.timestamp() if args.until else None
+    chats = set(args.chat or ())
+    records = (r for r in records
+               if (since is None or r[0] >= since) and (until is None or r[0] < until)
+               and (not chats or r[1] in chats))
+
+    parsed = parse_parallel(records, args.workers, args.chunk, args.all_formats)
+    print(f"Parsed payment messages: {len(parsed)}")
+
+    import config
+    from database.database import Database
+    db = Database(args.db)
+    statuses = ('pending', 'expired') if args.include_expired else ('pending',)
+    window = args.window_minutes or getattr(config, 'PENDING_PAYMENT_TTL_MINUTES', 30)
+    matches = match(parsed, db, statuses, args.tolerance, window * 60)
+
+    outcomes = apply(matches, db, statuses) if args.apply else ['dry-run'] * len(matches)
+
+    header = ('payment_id', 'status', 'user_id', 'bukmeker', 'player_id', 'amount_tiyin',
+              'card_last4', 'window_created_utc', 'message_time', 'chat_id', 'result')
+    rows = [
+        (p.payment_id, p.status, p.user_id, p.bukmeker, p.player_id, p.amount, p.card_last4,
+         p.created_at, datetime.fromtimestamp(rec[0]).isoformat(sep=' ', timespec='seconds'), rec[1], outcome)
+        for (rec, p), outcome in zip(matches, outcomes)
+    ]
+    for row in rows:
+        print(' | '.join(str(v) for v in row))
+    print(f"Windows that would be completed: {len(rows)}"
+          + (f" (deposited: {outcomes.count('deposited')}, failed: {outcomes.count('failed')}, "
+             f"uncertain: {outcomes.count('uncertain')}, retry-queued: {outcomes.count('retry-queued')}, "
+             f"skipped: {outcomes.count('skipped')})" if args.apply else ''))
+
+    if args.csv:
+        with open(args.csv, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    main()
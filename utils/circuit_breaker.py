@@ -0,0 +1,173 @@
+"""Bukmeker API chaqiruvlari uchun circuit breaker (har provayderga bittadan).
+
+Holatlar:
+ - closed: chaqiruvlar o'tadi; oxirgi ``window`` ta natija kuzatiladi. Kamida ``min_calls``
+   bo'lib, xato ulushi ``failure_rate`` dan oshsa - open
+ - open: chaqiruvlar API'ga bormaydi, darhol ``CircuitOpenError`` (oqim timeout kutib band
+   bo'lmaydi). ``open_seconds`` o'tgach - half-open
+ - half-open: ``half_open_calls`` ta sinov chaqiruvi o'tkaziladi; muvaffaqiyatli bo'lsa - closed,
+   xato bo'lsa - yana open
+
+Xato deb hisoblanadi: istisno (timeout, ulanish xatosi) yoki ``slow_call_seconds`` dan uzoq
+davom etgan chaqiruv. API'ning biznes javobi (Success: False) xato emas.
+
+Sozlamalar (config, ixtiyoriy): CIRCUIT_FAILURE_RATE, CIRCUIT_MIN_CALLS, CIRCUIT_WINDOW,
+CIRCUIT_SLOW_CALL_SECONDS, CIRCUIT_OPEN_SECONDS.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+try:
+    import config
+except ImportError:  # benchmark/tool'lar config'siz ishlaydi
+    config = None
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def _setting(name: str, default):
+    return getattr(config, name, default) if config is not None else default
+
+
+class CircuitOpenError(Exception):
+    """Provayder circuit'i ochiq - chaqiruv API'ga yuborilmadi"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} vaqtincha ishlamayapti ({retry_in:.0f} s dan keyin qayta uriniladi)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker
+
+    Attributes:
+        name: provayder nomi
+        failure_rate: open holatiga o'tish uchun xato ulushi (0..1)
+        min_calls: baholashdan oldin kerakli minimal chaqiruvlar soni
+        slow_call_seconds: bundan uzoq chaqiruv xato hisoblanadi
+        open_seconds: open holatida turish vaqti
+    """
+
+    def __init__(self, name: str, failure_rate: float = 0.5, min_calls: int = 5, window: int = 20,
+                 slow_call_seconds: float = 8.0, open_seconds: float = 30.0, half_open_calls: int = 1):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window)  # True - muvaffaqiyatli
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trials = 0
+        self.rejected = 0
+        self.opened_count = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._advance_locked(time.monotonic())
+            return self._state
+
+    def _advance_locked(self, now: float) -> None:
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._trials = 0
+
+    def _open_locked(self, now: float) -> None:
+        self._state = OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        self.opened_count += 1
+
+    def _acquire(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._advance_locked(now)
+            if self._state == OPEN or (self._state == HALF_OPEN and self._trials >= self.half_open_calls):
+                self.rejected += 1
+                retry_in = max(0.0, self._opened_at + self.open_seconds - now)
+                raise CircuitOpenError(self.name, retry_in)
+            if self._state == HALF_OPEN:
+                self._trials += 1
+
+    def _record(self, ok: bool) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if self._state == HALF_OPEN:
+                if ok:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open_locked(now)
+                return
+            if self._state == OPEN:
+                return
+            self._outcomes.append(ok)
+            calls = len(self._outcomes)
+            if calls >= self.min_calls and self._outcomes.count(False) / calls >= self.failure_rate:
+                self._open_locked(now)
+
+    def call(self, fn, *args, **kwargs):
+        """fn ni breaker orqali chaqirish; open bo'lsa CircuitOpenError"""
+        self._acquire()
+        started = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self._record(False)
+            raise
+        self._record(time.monotonic() - started <= self.slow_call_seconds)
+        return result
+
+    def snapshot(self) -> dict:
+        """Holat va metrikalar (admin ekrani uchun)"""
+        now = time.monotonic()
+        with self._lock:
+            self._advance_locked(now)
+            calls = len(self._outcomes)
+            return {
+                'state': self._state,
+                'calls': calls,
+                'failure_rate': round(self._outcomes.count(False) / calls, 2) if calls else 0.0,
+                'rejected': self.rejected,
+                'opened_count': self.opened_count,
+                'retry_in': round(max(0.0, self._opened_at + self.open_seconds - now), 1)
+                if self._state == OPEN else 0.0,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Provayder uchun umumiy breaker (birinchi chaqiruvda config'dan yaratiladi)"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                name,
+                failure_rate=_setting('CIRCUIT_FAILURE_RATE', 0.5),
+                min_calls=_setting('CIRCUIT_MIN_CALLS', 5),
+                window=_setting('CIRCUIT_WINDOW', 20),
+                slow_call_seconds=_setting('CIRCUIT_SLOW_CALL_SECONDS', 8.0),
+                open_seconds=_setting('CIRCUIT_OPEN_SECONDS', 30.0),
+            )
+            _breakers[name] = breaker
+        return breaker
+
+
+def breaker_states() -> Dict[str, dict]:
+    """Barcha breaker'lar holati"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.snapshot() for b in breakers}
@@ -0,0 +1,183 @@
+"""Foydalanuvchi operatsiyasi uchun end-to-end deadline va hedged o'qish so'rovlari.
+
+Deadline contextvars orqali uzatiladi: handler ``with deadline(8):`` ichida fon vazifasini
+topshirsa (utils.task_executor kontekstni ko'chiradi), shu vazifadagi barcha provayder
+chaqiruvlari bitta umumiy muddatga bo'ysunadi:
+ - Provider chaqiruvdan oldin ``check_deadline()`` - muddat o'tgan bo'lsa API'ga bormaydi
+ - PooledSession HTTP (connect, read) timeout'ini qolgan vaqt bilan cheklaydi
+
+Hedged so'rov (faqat idempotent o'qishlar: find_player, get_balance):
+ birinchi urinish p95 kechikishdan oshsa ikkinchisi yuboriladi, birinchi kelgan javob olinadi.
+ p95 har (provayder, operatsiya) uchun oxirgi ``window`` ta muvaffaqiyatli chaqiruvdan olinadi;
+ ``min_samples`` yig'ilmaguncha hedging qilinmaydi.
+
+Sozlamalar (config, ixtiyoriy): HEDGED_READS (default True), HEDGE_MIN_DELAY_SECONDS.
+"""
+
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+try:
+    import config
+except ImportError:  # benchmark/tool'lar config'siz ishlaydi
+    config = None
+
+_deadline: contextvars.ContextVar = contextvars.ContextVar('deadline', default=None)
+
+
+def _setting(name: str, default):
+    return getattr(config, name, default) if config is not None else default
+
+
+class DeadlineExceeded(TimeoutError):
+    """Operatsiya muddati tugadi - provayder chaqiruvi bajarilmadi/kutilmadi"""
+
+
+@contextmanager
+def deadline(seconds: float):
+    """Joriy kontekstga deadline qo'yish (tashqi deadline qisqaroq bo'lsa o'sha qoladi)"""
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(at if current is None else min(current, at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Qolgan vaqt (soniya); deadline yo'q bo'lsa None"""
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def check_deadline(what: str = 'operation') -> None:
+    """Muddat o'tgan bo'lsa DeadlineExceeded"""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"{what}: deadline exceeded")
+
+
+def cap_timeout(timeout):
+    """requests timeout'ini (son yoki (connect, read)) qolgan vaqt bilan cheklash"""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded('http request: deadline exceeded')
+    if isinstance(timeout, tuple):
+        return tuple(left if t is None else min(t, left) for t in timeout)
+    return left if timeout is None else min(timeout, left)
+
+
+class LatencyTracker:
+    """Oxirgi ``window`` ta chaqiruv kechikishi bo'yicha p95"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._p95: Optional[float] = None
+        self._dirty = 0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self._dirty += 1
+
+    def p95(self) -> Optional[float]:
+        """p95 (soniya); namunalar yetarli bo'lmasa None"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            # Har chaqiruvda saralamaslik uchun 10 ta yangi namunada bir qayta hisoblanadi
+            if self._p95 is None or self._dirty >= 10:
+                values = sorted(self._samples)
+                self._p95 = values[min(len(values) - 1, int(0.95 * len(values)))]
+                self._dirty = 0
+            return self._p95
+
+
+_trackers: Dict[Tuple[str, str], LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+hedge_stats = {'calls': 0, 'hedged': 0, 'hedge_won': 0}
+# hedged_call ko'p oqimdan chaqiriladi - ``+=`` atomik emas
+_hedge_lock = threading.Lock()
+
+
+def _count(name: str) -> None:
+    with _hedge_lock:
+        hedge_stats[name] += 1
+
+
+def hedge_metrics() -> Dict[str, int]:
+    """hedge_stats nusxasi (izchil o'qish)"""
+    with _hedge_lock:
+        return dict(hedge_stats)
+
+
+def get_tracker(provider: str, op: str) -> LatencyTracker:
+    with _trackers_lock:
+        tracker = _trackers.get((provider, op))
+        if tracker is None:
+            tracker = _trackers[(provider, op)] = LatencyTracker()
+        return tracker
+
+
+def _timed(tracker: LatencyTracker, fn, args):
+    started = time.monotonic()
+    result = fn(*args)
+    tracker.record(time.monotonic() - started)
+    return result
+
+
+def hedged_call(provider: str, op: str, fn, *args):
+    """
+    Idempotent o'qishni hedging bilan bajarish
+
+    Birinchi urinish p95 ichida tugamasa ikkinchisi yuboriladi; qaysi biri birinchi muvaffaqiyatli
+    tugasa o'sha javob. Ikkalasi ham xato bo'lsa birinchi xato ko'tariladi. Deadline bo'lsa
+    kutish qolgan vaqt bilan cheklanadi (DeadlineExceeded).
+    """
+    from utils.task_executor import submit
+
+    check_deadline(f"{provider}.{op}")
+    tracker = get_tracker(provider, op)
+    p95 = tracker.p95()
+    _count('calls')
+    if not _setting('HEDGED_READS', True) or p95 is None:
+        return _timed(tracker, fn, args)
+
+    first = submit('hedge', _timed, tracker, fn, args)
+    if first is None:
+        return _timed(tracker, fn, args)
+    attempts = [first]
+    hedge_after = max(p95, _setting('HEDGE_MIN_DELAY_SECONDS', 0.05))
+    left = remaining()
+    done, _ = wait(attempts, timeout=hedge_after if left is None else min(hedge_after, max(0.0, left)))
+    if not done:
+        check_deadline(f"{provider}.{op}")
+        second = submit('hedge', _timed, tracker, fn, args)
+        if second is not None:
+            attempts.append(second)
+            _count('hedged')
+
+    pending = set(attempts)
+    error = None
+    while pending:
+        done, pending = wait(pending, timeout=remaining(), return_when=FIRST_COMPLETED)
+        if not done:
+            raise DeadlineExceeded(f"{provider}.{op}: deadline exceeded")
+        for future in done:
+            if future.exception() is None:
+                if future is not first:
+                    _count('hedge_won')
+                return future.result()
+            if error is None or future is first:
+                error = future.exception()
+    raise error
@@ -2,6 +2,7 @@ import random
 from datetime import datetime
 from typing import List, Optional
 from database.models import Card
+from utils.money import format_som
 
 def generate_payment_id() -> str:
     """To'lov ID generatsiya qilish"""
@@ -46,8 +47,8 @@ def create_payment_message_html(bukmeker: str, player_id: str, card_number: str,
         f"<b>Bukmeker:</b> {bukmeker}\n"
         f"<b>ID:</b> <code>{player_id}</code>\n"
         f"<b>Karta:</b> <code>{formatted_card}</code>\n\n"
-        f"<b>To'lash kerak:</b> <code>{final_amount:,.0f}</code> so'm\n"
-        f"✅ <b>Bu summani yubormang:</b> <code>{user_amount:,.0f}</code> so'm ❌\n\n"
+        f"<b>To'lash kerak:</b> <code>{format_som(final_amount)}</code> so'm\n"
+        f"✅ <b>Bu summani yubormang:</b> <code>{format_som(user_amount)}</code> so'm ❌\n\n"
         f"🕒 To'lov muddati: 5 daqiqa\n"
         f"TG ID: <code>{user_id}</code>\n"
         f"To'lov ID: <code>{payment_id}</code>"
@@ -66,8 +67,8 @@ Bukmeker: {bukmeker}
 ID: {player_id}
 Karta: {card_number}
 
-To'lash kerak: {final_amount:,.0f} so'm
-✅ Bu summani yubormang: {user_amount:,.0f} so'm ❌
+To'lash kerak: {format_som(final_amount)} so'm
+✅ Bu summani yubormang: {format_som(user_amount)} so'm ❌
 
 {get_payment_timeout_message()}
 TG ID: {user_id}
@@ -81,7 +82,7 @@ def create_success_message(bukmeker: str, player_id: str, amount: float) -> str:
         f"✅ <b>Operatsiya muvaffaqiyatli o'tdi!</b>\n\n"
         f"<b>Bukmeker:</b> {bukmeker}\n"
         f"<b>ID:</b> <code>{player_id}</code>\n"
-        f"💵 <b>Summa:</b> <code>{amount:,.0f}</code> so'm\n"
+        f"💵 <b>Summa:</b> <code>{format_som(amount)}</code> so'm\n"
         f"<b>To'lov tizimi komissiyasi:</b> 0%\n\n"
         f"Bot: @uzpaykassa_bot"
     )
@@ -111,7 +112,7 @@ def create_withdrawal_admin_message(username: str, bukmeker: str, player_id: str
         amount_display = "—"
     else:
         try:
-            amount_display = f"{amount:,.0f}"
+            amount_display = format_som(amount)
         except Exception:
             amount_display = str(amount)
 
@@ -133,12 +134,12 @@ def create_channel_payment_message(payment_id: str, amount: float, username: str
     
     return (
         f"📋 <b>To'lov #{payment_id}</b>\n"
-        f"💰 <b>Summa:</b> <code>{amount:,.0f}</code> so'm\n"
+        f"💰 <b>Summa:</b> <code>{format_som(amount)}</code> so'm\n"
         f"👤 <b>Mijoz:</b> @{username}\n"
         f"📞 <b>Tel:</b> <code>{phone}</code>\n"
         f"🏦 <b>Kassa:</b>\n"
-        f"   • <b>Balans:</b> <code>{balance:,.0f}</code>\n"
-        f"   • <b>Limit:</b> <code>{limit:,.0f}</code>\n"
+        f"   • <b>Balans:</b> <code>{format_som(balance)}</code>\n"
+        f"   • <b>Limit:</b> <code>{format_som(limit)}</code>\n"
         f"{status} | <b>{bukmeker}</b>"
     )
 
@@ -153,12 +154,12 @@ def create_balance_message(balances: dict) -> str:
             imperium_balance = data.get('ImperiumBalance', 0)
             
             message += f"🎯 {bukmeker}:\n"
-            message += f"   💵 Balans: {balance:,.0f} so'm\n"
-            message += f"   📊 Limit: {limit:,.0f} so'm\n"
+            message += f"   💵 Balans: {format_som(balance)} so'm\n"
+            message += f"   📊 Limit: {format_som(limit)} so'm\n"
             
             # ImperiumBalance borligini tekshirish va ko'rsatish
             if imperium_balance > 0:
-                message += f"   💎 Imperium: {imperium_balance:,.0f} so'm\n"
+                message += f"   💎 Imperium: {format_som(imperium_balance)} so'm\n"
             
             message += "\n"
         else:
@@ -183,13 +184,28 @@ def create_balance_message(balances: dict) -> str:
     
     return message
 
+def create_breaker_status_message(states: dict) -> str:
+    """Provayder circuit breaker holatlari (balans xabari ostida)"""
+    if not states:
+        return ""
+    icons = {'closed': '🟢', 'half_open': '🟡', 'open': '🔴'}
+    message = "🛡 API holati:\n"
+    for name, st in states.items():
+        line = f"{icons.get(st['state'], '⚪')} {name}: {st['state']}"
+        if st['state'] == 'open':
+            line += f" (qayta urinish {st['retry_in']:.0f} s, rad etildi: {st['rejected']})"
+        elif st['calls']:
+            line += f" (xato {st['failure_rate'] * 100:.0f}%)"
+        message += line + "\n"
+    return message
+
 def create_stats_message(users_count: int, today_payments: int, today_amount: float) -> str:
     """Statistika xabari (HTML format)"""
     return (
         f"📊BOT STATISTIKASI\n\n"
         f"👥Foydalanuvchilar:{users_count}\n"
         f"💰Bugungi to'lovlar:{today_payments}\n"
-        f"Bugungi summa:{today_amount:,.0f} so'm"
+        f"Bugungi summa:{format_som(today_amount)} so'm"
     )
 
 def create_admin_notification(payment_id: str, bukmeker: str, player_id: str, 
@@ -199,7 +215,7 @@ def create_admin_notification(payment_id: str, bukmeker: str, player_id: str,
         f"🔔 Yangi to'lov so'rovi\n\n"
         f"Bukmeker: {bukmeker}\n"
         f"O'yinchi ID: {player_id}\n"
-        f"Summa: {amount:,.0f} so'm\n\n"
+        f"Summa: {format_som(amount)} so'm\n\n"
         f"Foydalanuvchi: @{username}\n"
         f"TG ID: {user_id}\n"
         f"To'lov ID: {payment_id}"
@@ -270,7 +286,7 @@ def mask_sensitive_data(text: str, show_last: int = 4) -> str:
 
 def format_amount(amount: float, currency: str = "so'm") -> str:
     """Summani formatlash"""
-    return f"{amount:,.0f} {currency}"
+    return f"{format_som(amount)} {currency}"
 
 def get_current_timestamp() -> str:
     """Joriy vaqt tamg'asi"""
@@ -284,7 +300,7 @@ def create_receipt_message(payment_id: str, bukmeker: str, player_id: str,
         f"📄 ID: {payment_id}\n"
         f"🎲 Bukmeker: {bukmeker}\n"
         f"👤 O'yinchi ID: {player_id}\n"
-        f"💰 Summa: {amount:,.0f} so'm\n"
+        f"💰 Summa: {format_som(amount)} so'm\n"
         f"💳 Karta: **** **** **** {card_last4}\n"
         f"📅 Sana: {format_datetime()}\n"
         f"✅ <b>Status:</b> Muvaffaqiyatli"
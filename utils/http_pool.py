@@ -0,0 +1,167 @@
+"""Bukmeker API klientlari uchun umumiy HTTP transport qatlami.
+
+Har bir provayderga bitta ``requests.Session`` (keep-alive ulanishlar pool'i bilan):
+ - Qisqa umrli oqimlardan kelgan chaqiruvlar TCP/TLS ulanishni qayta ishlatadi
+ - Pool hajmi bir vaqtdagi chaqiruvlar soniga mos (``config.HTTP_POOL_SIZE``)
+ - Aniq (connect, read) timeout - chaqiruvchi bermasa default qo'yiladi; joriy operatsiya
+   deadline'i (utils.deadline) bo'lsa timeout qolgan vaqt bilan cheklanadi
+ - Metrikalar: so'rovlar, xatolar, o'rtacha kechikish, ochilgan ulanishlar (pool'dan
+   qayta foydalanish darajasi shundan ko'rinadi)
+
+Ishlatish:
+    from utils.http_pool import attach_session
+    attach_session(xbet_api, '1xBet')   # klientda .session bo'lsa almashtiriladi
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.deadline import cap_timeout
+
+try:
+    import config
+except ImportError:  # benchmark/tool'lar config'siz ishlaydi
+    config = None
+
+DEFAULT_POOL_SIZE = 16
+DEFAULT_TIMEOUT: Tuple[float, float] = (3.05, 15.0)
+
+
+def _setting(name: str, default):
+    return getattr(config, name, default) if config is not None else default
+
+
+class PooledSession(requests.Session):
+    """Default timeout va metrikali Session
+
+    Attributes:
+        provider: provayder nomi (metrikalar uchun)
+        timeout: (connect, read) default timeout
+    """
+
+    def __init__(self, provider: str, pool_size: int, timeout: Tuple[float, float]):
+        super().__init__()
+        self.provider = provider
+        self.timeout = timeout
+        self._adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=False)
+        self.mount('https://', self._adapter)
+        self.mount('http://', self._adapter)
+        self._lock = threading.Lock()
+        self.requests_total = 0
+        self.errors_total = 0
+        self.latency_total = 0.0
+        self.in_flight = 0
+        self.in_flight_peak = 0
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        kwargs['timeout'] = cap_timeout(kwargs['timeout'])
+        with self._lock:
+            self.in_flight += 1
+            self.in_flight_peak = max(self.in_flight_peak, self.in_flight)
+        started = time.perf_counter()
+        try:
+            return super().request(method, url, **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                self.errors_total += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.in_flight -= 1
+                self.requests_total += 1
+                self.latency_total += elapsed
+
+    def metrics(self) -> dict:
+        """Pool va so'rov metrikalari"""
+        connections = 0
+        pooled_requests = 0
+        idle = 0
+        pools = getattr(self._adapter.poolmanager, 'pools', None)
+        if pools is not None:
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                connections += getattr(pool, 'num_connections', 0)
+                pooled_requests += getattr(pool, 'num_requests', 0)
+                idle += pool.pool.qsize() if getattr(pool, 'pool', None) is not None else 0
+        with self._lock:
+            requests_total = self.requests_total
+            return {
+                'provider': self.provider,
+                'requests': requests_total,
+                'errors': self.errors_total,
+                'avg_ms': round(self.latency_total / requests_total * 1000, 2) if requests_total else 0.0,
+                'in_flight': self.in_flight,
+                'in_flight_peak': self.in_flight_peak,
+                'connections_opened': connections,
+                'idle_pool_slots': idle,
+                # 1.0 ga yaqin - deyarli har so'rov mavjud ulanishdan foydalangan
+                'reuse_ratio': round(1 - connections / pooled_requests, 3) if pooled_requests else 0.0,
+            }
+
+
+_sessions: Dict[str, PooledSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(provider: str, pool_size: Optional[int] = None,
+                timeout: Optional[Tuple[float, float]] = None) -> PooledSession:
+    """Provayder uchun umumiy Session (birinchi chaqiruvda yaratiladi)"""
+    with _sessions_lock:
+        session = _sessions.get(provider)
+        if session is None:
+            session = PooledSession(
+                provider,
+                pool_size or _setting('HTTP_POOL_SIZE', DEFAULT_POOL_SIZE),
+                timeout or (_setting('HTTP_CONNECT_TIMEOUT', DEFAULT_TIMEOUT[0]),
+                            _setting('HTTP_READ_TIMEOUT', DEFAULT_TIMEOUT[1])),
+            )
+            _sessions[provider] = session
+        return session
+
+
+def attach_session(client, provider: str) -> bool:
+    """API klientiga umumiy Session ulash (``.session`` atributi bo'lsa).
+
+    Eski Session'dagi headers/auth/cookies yangi Session'ga ko'chiriladi.
+
+    Returns:
+        True - ulandi; False - klient yo'q yoki Session ishlatmaydi
+    """
+    if client is None or not hasattr(client, 'session'):
+        return False
+    session = get_session(provider)
+    old = getattr(client, 'session', None)
+    if old is session:
+        return True
+    if isinstance(old, requests.Session):
+        session.headers.update(old.headers)
+        session.cookies.update(old.cookies)
+        if old.auth is not None:
+            session.auth = old.auth
+        if old.params:
+            session.params.update(old.params)
+        session.verify = old.verify
+        session.cert = old.cert
+        session.proxies.update(old.proxies)
+        try:
+            old.close()
+        except Exception:
+            pass
+    client.session = session
+    return True
+
+
+def pool_metrics() -> Dict[str, dict]:
+    """Barcha provayder Session'lari metrikalari"""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+    return {s.provider: s.metrics() for s in sessions}
@@ -38,13 +38,14 @@ def get_admin_menu_keyboard():
     """Admin panel klaviaturasi.
 
     Qamrab oladi: depozit/yechish (tezkor), qo'lda to'ldirish, statistika,
-    xabar yuborish, bot holati, karta boshqaruvi va kassa balans.
+    xabar yuborish, bot holati, karta boshqaruvi, kassa balans, eksport va yechish navbati.
     """
     keyboard = ReplyKeyboardMarkup(resize_keyboard=True)
     keyboard.row("💰 Hisob to'ldirish", "💸 Pul yechish")
     keyboard.row("✋ Qo'lda to'ldirish", "📊 Statistika")
     keyboard.row("📢 Xabar yuborish", "🔧 Bot o'chirish")
     keyboard.row("💳 Karta qo'shish", "💰 Kasa balansi")
+    keyboard.row("📤 Eksport", "📋 Yechish arizalari")
     return keyboard
 
 def get_bookmakers_keyboard():
@@ -0,0 +1,133 @@
+"""Pul birliklari moduli.
+
+Barcha summalar ichkarida butun sonli tiyin (1 so'm = 100 tiyin) sifatida saqlanadi:
+ - Float xatoliklari yo'q: detektor aniq tenglik bilan solishtiradi (ABS/tolerance kerak emas).
+ - DB'da INTEGER ustun (amount_tiyin) - indeks bo'yicha to'g'ridan-to'g'ri qidiruv.
+ - Formatlash int yo'li orqali (float ``:,.0f`` dan tezroq).
+
+Bukmeker API'lari so'm qabul qiladi - chegarada ``tiyin_to_som`` bilan o'giriladi.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+from typing import Optional, Union
+
+TIYIN_PER_SOM = 100
+
+_STRIP_TABLE = str.maketrans('', '', ' \u00a0\u202f\u2009\'_')
+
+
+def parse_som(text: str) -> Optional[int]:
+    """Matndagi so'm summasini tiyin ga aylantirish.
+
+    Ajratgichlar qoidasi:
+     - ',' va '.' ikkalasi bo'lsa - oxirgisi kasr ajratgich ("50,000.50", "50.000,50")
+     - bittasi bir marta va undan keyin 1-2 raqam bo'lsa - kasr ("3613.5", "3613,50")
+     - aks holda mingliklar ajratgichi ("3,630", "1.000.000")
+
+    Returns:
+        int (tiyin) yoki None (raqam bo'lmasa)
+    """
+    if text is None:
+        return None
+    s = str(text)
+    if s.isascii():
+        # Eng ko'p uchraydigan holatlar: "50000", "3613.50", "3613,5" - ajratgichlar qoidasisiz
+        if s.isdigit():
+            return int(s) * TIYIN_PER_SOM
+        whole, sep, frac = s.partition('.') if '.' in s else s.partition(',')
+        if sep and whole.isdigit() and frac.isdigit() and len(frac) <= 2:
+            return int(whole) * TIYIN_PER_SOM + int((frac + '00')[:2])
+        # dict jadvalli translate qisqa satrda ham ~1 mks; ASCII'da o'chiriladigani uchta belgi
+        s = s.replace(' ', '').replace("'", '').replace('_', '')
+    else:
+        s = s.translate(_STRIP_TABLE)
+    if not s:
+        return None
+
+    last_comma = s.rfind(',')
+    last_dot = s.rfind('.')
+    if last_comma >= 0 and last_dot >= 0:
+        sep = ',' if last_comma > last_dot else '.'
+    elif last_comma >= 0 or last_dot >= 0:
+        sep = ',' if last_comma >= 0 else '.'
+        tail = len(s) - s.rfind(sep) - 1
+        if s.count(sep) != 1 or tail > 2:
+            sep = None
+    else:
+        sep = None
+
+    if sep is None:
+        whole, frac = s.replace(',', '').replace('.', ''), ''
+    else:
+        whole, _, frac = s.rpartition(sep)
+        whole = whole.replace(',', '').replace('.', '')
+
+    if not whole.isdigit() and whole != '':
+        return None
+    if frac and not frac.isdigit():
+        return None
+    if not whole and not frac:
+        return None
+
+    if len(frac) > 2:
+        # 2 xonadan ortiq kasr - yaxlitlash
+        return to_tiyin(Decimal(f"{whole or '0'}.{frac}"))
+    return int(whole or '0') * TIYIN_PER_SOM + int((frac + '00')[:2])
+
+
+def to_tiyin(value: Union[int, float, Decimal, str, None]) -> Optional[int]:
+    """so'm qiymatini (int/float/Decimal/str) tiyin ga aylantirish; noto'g'ri bo'lsa None."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value * TIYIN_PER_SOM
+    if isinstance(value, float):
+        if value != value or value in (float('inf'), float('-inf')):
+            return None
+        # repr orqali - 0.1*100 kabi float xatoliklarsiz
+        return to_tiyin(Decimal(repr(value)))
+    if isinstance(value, Decimal):
+        try:
+            return int((value * TIYIN_PER_SOM).to_integral_value(rounding=ROUND_HALF_UP))
+        except (InvalidOperation, ValueError):
+            return None
+    if isinstance(value, str):
+        s = value.strip()
+        negative = s.startswith('-')
+        tiyin = parse_som(s[1:] if negative else s)
+        if tiyin is None:
+            return None
+        return -tiyin if negative else tiyin
+    return None
+
+
+def tiyin_to_som(tiyin: Optional[int]) -> Union[int, float, None]:
+    """Tiyin -> so'm (butun bo'lsa int, aks holda float). API chaqiruvlari uchun."""
+    if tiyin is None:
+        return None
+    whole, rest = divmod(tiyin, TIYIN_PER_SOM)
+    return whole if not rest else tiyin / TIYIN_PER_SOM
+
+
+def format_tiyin(tiyin: Optional[int], empty: str = "—") -> str:
+    """Tiyin summani so'mga yaxlitlab formatlash: 5000000 -> "50,000"."""
+    if tiyin is None:
+        return empty
+    if tiyin < 0:
+        return f"-{(-tiyin + 50) // TIYIN_PER_SOM:,}"
+    return f"{(tiyin + 50) // TIYIN_PER_SOM:,}"
+
+
+def format_som(amount: Union[int, float, Decimal, None], empty: str = "—") -> str:
+    """so'm summani formatlash: 50000 -> "50,000" (``f"{amount:,.0f}"`` o'rniga).
+
+    int uchun tez yo'l; float/Decimal yaxlitlanadi; raqam bo'lmasa ``str`` qaytadi.
+    """
+    if amount is None:
+        return empty
+    if type(amount) is int:
+        return f"{amount:,}"
+    try:
+        return f"{amount:,.0f}"
+    except (TypeError, ValueError):
+        return str(amount)
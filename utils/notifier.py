@@ -0,0 +1,90 @@
+"""Telegram bildirishnomalarini tezlik chegarasi bilan yuborish (ommaviy xabarlar uchun).
+
+Admin o'nlab arizani birdan tasdiqlasa har biri uchun foydalanuvchi xabari va kanal posti
+ketadi. Ularni handler oqimida ketma-ket yuborish uni band qiladi, birdaniga yuborish esa
+Telegram chegaralariga (429 Too Many Requests) uriladi. Endi:
+
+ - Xabarlar ``notify`` executor'iga topshiriladi (handler darhol qaytadi)
+ - Umumiy bucket - bot bo'yicha soniyasiga ``TELEGRAM_SEND_RATE`` ta xabar
+ - Guruh/kanal (manfiy chat_id) uchun alohida bucket - daqiqasiga ``TELEGRAM_GROUP_PER_MINUTE``
+ - Navbatdagi xabar token bo'shashini kutadi (FIFO, utils.rate_limiter.TokenBucket)
+
+Sozlamalar (config, ixtiyoriy): TELEGRAM_SEND_RATE (25), TELEGRAM_GROUP_PER_MINUTE (20).
+
+Ishlatish:
+    from utils.notifier import notifier
+    notifier.send(bot, user_id, "✅ Pul kartangizga o'tkazildi!")
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Dict, Optional
+
+try:
+    import config
+except ImportError:  # benchmark/tool'lar config'siz ishlaydi
+    config = None
+
+from utils.bot_helpers import safe_send_message
+from utils.rate_limiter import TokenBucket
+from utils.task_executor import submit
+
+
+def _setting(name: str, default):
+    return getattr(config, name, default) if config is not None else default
+
+
+class RateLimitedSender:
+    """
+    Attributes:
+        rate: bot bo'yicha xabar/soniya
+        group_per_minute: bitta guruh/kanalga xabar/daqiqa
+    """
+
+    def __init__(self, rate: float = 25.0, group_per_minute: float = 20.0):
+        self.rate = rate
+        self.group_per_minute = group_per_minute
+        self._global = TokenBucket('telegram.send', rate, max(1, int(rate)))
+        self._groups: Dict[int, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+
+    def _group_bucket(self, chat_id: int) -> TokenBucket:
+        with self._lock:
+            bucket = self._groups.get(chat_id)
+            if bucket is None:
+                bucket = self._groups[chat_id] = TokenBucket(
+                    f"telegram.{chat_id}", self.group_per_minute / 60.0, max(1, int(self.group_per_minute)))
+            return bucket
+
+    def _send(self, bot, chat_id: int, text: str, kwargs: dict):
+        if int(chat_id) < 0:
+            self._group_bucket(int(chat_id)).acquire()
+        self._global.acquire()
+        message = safe_send_message(bot, chat_id, text, **kwargs)
+        with self._lock:
+            if message is None:
+                self.failed += 1
+            else:
+                self.sent += 1
+        return message
+
+    def send(self, bot, chat_id: int, text: str, **kwargs) -> Optional[Future]:
+        """Xabarni navbatga qo'yish (safe_send_message kalitlari bilan); rad etilsa None"""
+        future = submit('notify', self._send, bot, chat_id, text, kwargs)
+        if future is None:
+            with self._lock:
+                self.failed += 1
+        return future
+
+    def metrics(self) -> dict:
+        with self._lock:
+            sent, failed = self.sent, self.failed
+        return dict(self._global.metrics(), sent=sent, failed=failed)
+
+
+notifier = RateLimitedSender(
+    rate=_setting('TELEGRAM_SEND_RATE', 25.0),
+    group_per_minute=_setting('TELEGRAM_GROUP_PER_MINUTE', 20.0),
+)
@@ -0,0 +1,178 @@
+"""Bukmeker API trafigi uchun token-bucket rate limiter (provayder va operatsiya bo'yicha).
+
+Depozitlar to'lqini bitta bukmeker kassasi API kvotasidan oshib ketsa keyingi barcha
+chaqiruvlar xato qaytaradi. Endi har (provayder, operatsiya) - find_player, deposit, payout,
+balance - o'z bucket'iga ega:
+
+ - ``rate`` token/soniya, ``burst`` - to'plangan tokenlar chegarasi
+ - Token bo'lmasa chaqiruv navbatda kutadi (FIFO: har kutuvchi keyingi bo'sh slotni band qiladi),
+   xato qaytarmaydi. Kutish joriy deadline (utils.deadline) bilan, deadline bo'lmasa
+   ``RATE_LIMIT_MAX_WAIT_SECONDS`` bilan cheklanadi; slot shu vaqtga sig'masa -
+   ``RateLimitTimeout`` (so'rov yuborilmagan - qayta urinish xavfsiz)
+ - Metrikalar: oxirgi daqiqadagi kvotadan foydalanish (utilization), navbatdagilar (joriy/eng
+   ko'p), o'rtacha/maksimal kutish, timeout bilan rad etilganlar
+
+Sozlamalar (config, ixtiyoriy):
+    RATE_LIMITS = {'1xBet': {'deposit': (2, 5)}, '*': {'balance': (1, 2)}}  # (rate, burst) yoki None - cheklovsiz
+    RATE_LIMIT_MAX_WAIT_SECONDS (30)
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+try:
+    import config
+except ImportError:  # benchmark/tool'lar config'siz ishlaydi
+    config = None
+
+from utils.deadline import DeadlineExceeded, remaining
+
+# operatsiya -> (rate token/s, burst)
+DEFAULT_LIMITS = {
+    'find_player': (10.0, 20),
+    'deposit': (5.0, 10),
+    'payout': (5.0, 10),
+    'balance': (2.0, 5),
+}
+
+# utilization hisoblanadigan oyna (soniya)
+UTILIZATION_WINDOW = 60.0
+
+
+def _setting(name: str, default):
+    return getattr(config, name, default) if config is not None else default
+
+
+class RateLimitTimeout(DeadlineExceeded):
+    """Token deadline ichida bo'shamaydi - chaqiruv API'ga yuborilmadi"""
+
+    def __init__(self, name: str, wait: float):
+        super().__init__(f"{name}: rate limit ({wait:.1f} s kutish kerak edi)")
+        self.name = name
+        self.wait = wait
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket (kutish navbati bilan)
+
+    Tokenlar manfiy bo'lishi mumkin: har ``acquire`` keyingi bo'sh slotni band qiladi va
+    o'z vaqtigacha uxlaydi - kutuvchilar kelish tartibida o'tadi.
+
+    Attributes:
+        name: "provayder.operatsiya"
+        rate: token/soniya
+        burst: maksimal to'plangan tokenlar
+    """
+
+    def __init__(self, name: str, rate: float, burst: int):
+        self.name = name
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._recent = deque()
+        self.acquired = 0
+        self.waited = 0
+        self.timeouts = 0
+        self.queued = 0
+        self.queued_peak = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _refill_locked(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout: Optional[float] = None) -> float:
+        """Bitta token olish; kutilgan vaqtni (soniya) qaytaradi.
+
+        timeout ichida slot bo'lmasa token band qilinmaydi va RateLimitTimeout.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._refill_locked(now)
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if timeout is not None and wait > timeout:
+                self.timeouts += 1
+                raise RateLimitTimeout(self.name, wait)
+            self._tokens -= 1
+            self.acquired += 1
+            self._recent.append(now + wait)
+            if wait:
+                self.waited += 1
+                self.queued += 1
+                self.queued_peak = max(self.queued_peak, self.queued)
+                self.wait_total += wait
+                self.wait_max = max(self.wait_max, wait)
+        if wait:
+            try:
+                time.sleep(wait)
+            finally:
+                with self._lock:
+                    self.queued -= 1
+        return wait
+
+    def metrics(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and self._recent[0] < now - UTILIZATION_WINDOW:
+                self._recent.popleft()
+            self._refill_locked(now)
+            return {
+                'rate': self.rate,
+                'burst': self.burst,
+                'tokens': round(self._tokens, 2),
+                # oxirgi daqiqada kvotaning qancha qismi ishlatildi (1.0 - to'liq)
+                'utilization': round(len(self._recent) / (self.rate * UTILIZATION_WINDOW), 3),
+                'queued': self.queued,
+                'queued_peak': self.queued_peak,
+                'acquired': self.acquired,
+                'waited': self.waited,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.wait_total / self.waited * 1000, 2) if self.waited else 0.0,
+                'max_wait_ms': round(self.wait_max * 1000, 2),
+            }
+
+
+_buckets: Dict[Tuple[str, str], Optional[TokenBucket]] = {}
+_buckets_lock = threading.Lock()
+
+
+def _limit_for(provider: str, op: str) -> Optional[Tuple[float, int]]:
+    limits = _setting('RATE_LIMITS', {}) or {}
+    for key in (provider, '*'):
+        ops = limits.get(key) or {}
+        if op in ops:
+            return ops[op]
+    return DEFAULT_LIMITS.get(op)
+
+
+def get_limiter(provider: str, op: str) -> Optional[TokenBucket]:
+    """(provayder, operatsiya) bucket'i; cheklov yo'q bo'lsa None"""
+    key = (provider, op)
+    with _buckets_lock:
+        if key not in _buckets:
+            limit = _limit_for(provider, op)
+            _buckets[key] = TokenBucket(f"{provider}.{op}", *limit) if limit else None
+        return _buckets[key]
+
+
+def acquire(provider: str, op: str) -> float:
+    """Chaqiruvdan oldin token olish (deadline yoki RATE_LIMIT_MAX_WAIT_SECONDS gacha kutadi)"""
+    bucket = get_limiter(provider, op)
+    if bucket is None:
+        return 0.0
+    left = remaining()
+    timeout = _setting('RATE_LIMIT_MAX_WAIT_SECONDS', 30.0) if left is None else max(0.0, left)
+    return bucket.acquire(timeout)
+
+
+def limiter_metrics() -> Dict[str, dict]:
+    """Barcha bucket'lar metrikalari ("provayder.operatsiya" -> metrika)"""
+    with _buckets_lock:
+        buckets = [b for b in _buckets.values() if b is not None]
+    return {b.name: b.metrics() for b in buckets}
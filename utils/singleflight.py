@@ -0,0 +1,116 @@
+"""Bir xil parallel so'rovlarni birlashtirish (singleflight).
+
+Bir nechta foydalanuvchi bir vaqtda bitta o'yinchi ID'sini tekshirsa yoki ko'p depozit birdan
+tugab har biri ``get_balance(bukmeker)`` ni chaqirsa - bukmekerga bir xil so'rovlar bir vaqtda
+ketardi. Endi kalit bo'yicha bitta "yetakchi" chaqiruv bajariladi, shu paytda kelgan qolganlari
+uning natijasini (yoki xatosini) kutib oladi. Chaqiruv tugagach kalit bo'shaydi - bu kesh emas.
+
+Kutuvchilar joriy deadline (utils.deadline) bilan kutadi; yetakchi esa o'z deadline'i bilan
+ishlaydi (uning DeadlineExceeded xatosi kutuvchilarga ham o'tadi).
+
+Ishlatish:
+    flight = get_group('1xBet')
+    result = flight.do(('find_player', player_id), api.find_player, player_id)
+"""
+
+import threading
+from typing import Dict, Hashable
+
+from utils.deadline import DeadlineExceeded, remaining
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error', 'traceback', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.traceback = None
+        self.waiters = 0
+
+
+class Group:
+    """
+    Kalit bo'yicha in-flight chaqiruvlar guruhi
+
+    Attributes:
+        name: guruh nomi (metrikalar uchun, odatda provayder)
+        calls: jami ``do`` chaqiruvlari
+        executed: haqiqatda bajarilgan chaqiruvlar
+        shared: boshqa chaqiruv natijasini olganlar (birlashtirilgan)
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.calls = 0
+        self.executed = 0
+        self.shared = 0
+        self.waiters_peak = 0
+
+    def do(self, key: Hashable, fn, *args, **kwargs):
+        """fn(*args, **kwargs) - shu kalit bilan bajarilayotgan chaqiruv bo'lsa uning natijasi"""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                call.waiters += 1
+                self.shared += 1
+                self.waiters_peak = max(self.waiters_peak, call.waiters)
+
+        if not leader:
+            left = remaining()
+            if not call.event.wait(None if left is None else max(0.0, left)):
+                raise DeadlineExceeded(f"{self.name}: waiting for in-flight call")
+            if call.error is not None:
+                # Bitta istisno obyekti - har kutuvchida traceback yetakchinikidan boshlanadi (o'smaydi)
+                raise call.error.with_traceback(call.traceback)
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error, call.traceback = e, e.__traceback__
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'executed': self.executed,
+                'shared': self.shared,
+                'in_flight': len(self._calls),
+                'waiters_peak': self.waiters_peak,
+                'collapse_rate': round(self.shared / self.calls, 3) if self.calls else 0.0,
+            }
+
+
+_groups: Dict[str, Group] = {}
+_groups_lock = threading.Lock()
+
+
+def get_group(name: str) -> Group:
+    """Nom bo'yicha umumiy guruh"""
+    with _groups_lock:
+        group = _groups.get(name)
+        if group is None:
+            group = _groups[name] = Group(name)
+        return group
+
+
+def singleflight_metrics() -> Dict[str, dict]:
+    """Barcha guruhlar metrikalari"""
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {g.name: g.metrics() for g in groups}
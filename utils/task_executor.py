@@ -0,0 +1,258 @@
+"""Fon vazifalari uchun umumiy, chegaralangan executor (ish turlari bo'yicha).
+
+Handlerlar har so'rovda ``threading.Thread(daemon=True)`` ochardi: burst paytida yuzlab oqim,
+chiqishda esa bajarilayotgan depozitlar jimgina o'ldirilardi. Endi:
+
+ - Har ish turi (work class) o'z oqimlari va chegaralangan navbatiga ega:
+     provider_io - bukmeker API (check_player, payout, depozit)
+     db          - og'ir DB ishlari (eksport)
+     notify      - Telegram bildirishnomalari (kanal xabarlari)
+     hedge       - hedged o'qish urinishlari (utils.deadline.hedged_call)
+     balance     - kassa balansi yangilashlari (handlers.balance_service); alohida - provider_io
+                   vazifasi refresh_and_wait bilan o'z pool'ini kutib qolmasin
+ - Navbat to'lsa - rad etish siyosati:
+     caller_runs - vazifa chaqiruvchi oqimda bajariladi (tabiiy backpressure)
+     block       - navbatda joy bo'shashini ``block_timeout`` gacha kutish, keyin rad etish
+     reject      - darhol rad etish (submit None qaytaradi)
+ - Metrikalar: navbat chuqurligi (joriy/eng yuqori), bajarilgan/xato/rad etilgan,
+   navbatda kutish va bajarilish vaqti (o'rtacha/maksimal)
+ - Vazifa topshirilgan paytdagi contextvars konteksti (masalan deadline) bilan bajariladi
+ - Chiqishda (atexit) navbatdagi va bajarilayotgan vazifalar ``TASK_DRAIN_SECONDS`` gacha
+   tugatiladi
+
+Sozlamalar (config, ixtiyoriy): TASK_WORKERS_<CLASS>, TASK_QUEUE_<CLASS>, TASK_POLICY_<CLASS>,
+TASK_DRAIN_SECONDS.
+
+Ishlatish:
+    from utils.task_executor import submit
+    submit('provider_io', _async_check_player, user_id, bukmeker, player_id, msg)
+"""
+
+import atexit
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Optional
+
+try:
+    import config
+except ImportError:  # benchmark/tool'lar config'siz ishlaydi
+    config = None
+
+CALLER_RUNS = 'caller_runs'
+BLOCK = 'block'
+REJECT = 'reject'
+
+# ish turi -> (oqimlar, navbat hajmi, siyosat)
+WORK_CLASSES = {
+    'provider_io': (16, 500, CALLER_RUNS),
+    'db': (2, 50, CALLER_RUNS),
+    'notify': (4, 1000, REJECT),
+    'hedge': (8, 64, CALLER_RUNS),
+    'balance': (8, 64, CALLER_RUNS),
+}
+
+
+def _setting(name: str, default):
+    return getattr(config, name, default) if config is not None else default
+
+
+class BoundedExecutor:
+    """
+    Chegaralangan navbatli thread pool
+
+    Attributes:
+        name: ish turi nomi (oqim nomlari va metrikalar uchun)
+        workers: oqimlar soni
+        policy: navbat to'lganda siyosat (caller_runs / block / reject)
+        block_timeout: block siyosatida kutish (soniya)
+    """
+
+    def __init__(self, name: str, workers: int, queue_size: int, policy: str = CALLER_RUNS,
+                 block_timeout: float = 5.0):
+        self.name = name
+        self.workers = workers
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._closed = False
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.caller_ran = 0
+        self.active = 0
+        self.depth_peak = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_total = 0.0
+        self.run_max = 0.0
+
+    def _ensure_workers(self) -> None:
+        # Oqimlar birinchi vazifada ochiladi (import paytida emas)
+        if len(self._threads) >= self.workers:
+            return
+        with self._lock:
+            while len(self._threads) < self.workers:
+                t = threading.Thread(target=self._worker, name=f"{self.name}-{len(self._threads)}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _run(self, future: Future, ctx, fn, args, kwargs, enqueued: float) -> None:
+        started = time.monotonic()
+        waited = started - enqueued
+        with self._lock:
+            self.active += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        ok = True
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(ctx.run(fn, *args, **kwargs))
+                except BaseException as e:
+                    ok = False
+                    future.set_exception(e)
+                    print(f"Background task error ({self.name}, {getattr(fn, '__name__', fn)}): {e}")
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+                self.failed += not ok
+                self.run_total += elapsed
+                self.run_max = max(self.run_max, elapsed)
+
+    def _worker(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._run(*item)
+            finally:
+                self._queue.task_done()
+
+    def submit(self, fn, *args, **kwargs) -> Optional[Future]:
+        """Vazifani navbatga qo'yish; rad etilsa None"""
+        future: Future = Future()
+        item = (future, contextvars.copy_context(), fn, args, kwargs, time.monotonic())
+        with self._lock:
+            closed = self._closed
+            self.submitted += 1
+        if closed:
+            # Yopilish jarayonida - yo'qotmaslik uchun chaqiruvchida bajariladi
+            self._run(*item)
+            return future
+        self._ensure_workers()
+        try:
+            if self.policy == BLOCK:
+                self._queue.put(item, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            if self.policy == CALLER_RUNS:
+                with self._lock:
+                    self.caller_ran += 1
+                self._run(*item)
+                return future
+            with self._lock:
+                self.rejected += 1
+            print(f"Background task rejected ({self.name}): queue full")
+            return None
+        depth = self._queue.qsize()
+        if depth > self.depth_peak:
+            with self._lock:
+                self.depth_peak = max(self.depth_peak, depth)
+        return future
+
+    def shutdown(self, timeout: float) -> bool:
+        """Yangi vazifalarni to'xtatib navbatni tugatish; timeout ichida tugasa True"""
+        with self._lock:
+            if self._closed:
+                return True
+            self._closed = True
+            threads = list(self._threads)
+        deadline = time.monotonic() + timeout
+        for _ in threads:
+            try:
+                self._queue.put(None, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+        for t in threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+        return not any(t.is_alive() for t in threads)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            done = self.completed
+            return {
+                'workers': self.workers,
+                'policy': self.policy,
+                'queue_depth': self._queue.qsize(),
+                'queue_peak': self.depth_peak,
+                'active': self.active,
+                'submitted': self.submitted,
+                'completed': done,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'caller_ran': self.caller_ran,
+                'avg_wait_ms': round(self.wait_total / done * 1000, 2) if done else 0.0,
+                'max_wait_ms': round(self.wait_max * 1000, 2),
+                'avg_run_ms': round(self.run_total / done * 1000, 2) if done else 0.0,
+                'max_run_ms': round(self.run_max * 1000, 2),
+            }
+
+
+_executors: Dict[str, BoundedExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(work_class: str) -> BoundedExecutor:
+    """Ish turi uchun umumiy executor (WORK_CLASSES dan + config override)"""
+    with _executors_lock:
+        executor = _executors.get(work_class)
+        if executor is None:
+            workers, size, policy = WORK_CLASSES[work_class]
+            key = work_class.upper()
+            executor = BoundedExecutor(
+                work_class,
+                _setting(f'TASK_WORKERS_{key}', workers),
+                _setting(f'TASK_QUEUE_{key}', size),
+                _setting(f'TASK_POLICY_{key}', policy),
+            )
+            _executors[work_class] = executor
+        return executor
+
+
+def submit(work_class: str, fn, *args, **kwargs) -> Optional[Future]:
+    """fn(*args, **kwargs) ni ish turi executor'ida bajarish; rad etilsa None"""
+    return get_executor(work_class).submit(fn, *args, **kwargs)
+
+
+def executor_metrics() -> Dict[str, dict]:
+    with _executors_lock:
+        executors = list(_executors.values())
+    return {e.name: e.metrics() for e in executors}
+
+
+def shutdown_all(timeout: Optional[float] = None) -> bool:
+    """Barcha executor'larni tugatish (atexit'da chaqiriladi)"""
+    if timeout is None:
+        timeout = _setting('TASK_DRAIN_SECONDS', 30)
+    deadline = time.monotonic() + timeout
+    with _executors_lock:
+        executors = list(_executors.values())
+    ok = True
+    for executor in executors:
+        ok = executor.shutdown(max(0.0, deadline - time.monotonic())) and ok
+    if not ok:
+        print("⚠️ Background tasks did not finish before shutdown timeout")
+    return ok
+
+
+atexit.register(shutdown_all)
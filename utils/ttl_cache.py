@@ -0,0 +1,102 @@
+"""Chegaralangan, thread-safe TTL kesh (musbat/manfiy natijalar uchun alohida TTL).
+
+Har bir yozuv uchun:
+ - fresh_until - shu vaqtgacha yozuv to'g'ridan-to'g'ri qaytariladi
+ - stale_until - undan keyin ham ``get_stale`` orqali olish mumkin (manba ishlamay qolganda
+   eski natijani berish - stale-on-error)
+
+OrderedDict (eng eski ishlatilgani boshida) - max_entries dan oshsa LRU chiqariladi.
+
+Ishlatish:
+    cache = TTLCache(ttl_seconds=300, negative_ttl_seconds=30)
+    value = cache.get(key)
+    if value is None:
+        value = load(key)
+        cache.set(key, value, negative=not value.get('Success'))
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Attributes:
+        ttl: musbat natija amal qilish muddati (soniya)
+        negative_ttl: manfiy natija (topilmadi) muddati (soniya)
+        stale_ttl: muddati o'tgan yozuv stale-on-error uchun saqlanadigan qo'shimcha vaqt
+        max_entries: maksimal yozuvlar soni
+    """
+
+    def __init__(self, ttl_seconds: float = 300, negative_ttl_seconds: float = 30,
+                 stale_ttl_seconds: float = 3600, max_entries: int = 10000):
+        self.ttl = ttl_seconds
+        self.negative_ttl = negative_ttl_seconds
+        self.stale_ttl = stale_ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> (value, fresh_until, stale_until)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Yangi (fresh) qiymat yoki None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def get_stale(self, key: Hashable) -> Optional[Any]:
+        """Muddati o'tgan bo'lsa ham stale oynasidagi qiymat (manba xatoligida)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] <= now:
+                return None
+            self.stale_hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any, negative: bool = False) -> None:
+        """Qiymatni yozish; negative=True bo'lsa qisqa TTL bilan"""
+        now = time.monotonic()
+        fresh_until = now + (self.negative_ttl if negative else self.ttl)
+        with self._lock:
+            self._entries[key] = (value, fresh_until, fresh_until + self.stale_ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Hit-rate metrikalari"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale_hits': self.stale_hits,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }